@@ -0,0 +1,4 @@
+"""Offline benchmarks. Run them from the repository root, e.g.:
+
+    python -m benchmarks.logging_latency
+"""
@@ -0,0 +1,87 @@
+"""Run several clusters (see utils.cluster) through the real launcher, each a
+ShardedBot connected to a FakeGateway in its own process, all saving changes
+to the same database, and count the changes that are lost.
+
+Every cluster sets keys of its own, saving the database after each one, while
+the launcher relays the 'db_saved' broadcasts between them (see DB.merge()).
+With --reload, the clusters instead reload the whole database whenever another
+one saves it, which throws away their unsaved changes.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_discord import FakeGateway
+from constants import info
+import utils
+
+
+DB_NAME = 'cluster'
+# Seconds to wait after the last change for broadcasts from the other clusters.
+SETTLE = 0.5
+
+
+def run_cluster(cluster_id, cluster_count, shard_count, conn, directory: str, rounds: int, reload: bool):
+    asyncio.run(cluster_main(cluster_id, cluster_count, shard_count, conn, directory, rounds, reload))
+
+
+async def cluster_main(cluster_id, cluster_count, shard_count, conn, directory, rounds, reload):
+    from main import ShardedBot
+    cluster = utils.cluster.Cluster(cluster_id, cluster_count, conn)
+    bot = ShardedBot(
+        description=info.DESCRIPTION,
+        shard_ids=utils.cluster.cluster_shard_ids(cluster_id, cluster_count, shard_count),
+        shard_count=shard_count,
+        cluster=cluster,
+    )
+    FakeGateway(bot, member_count=10)
+    db = utils.get_db(DB_NAME, directory)
+    if reload:
+        async def on_cluster_message(action, *args):
+            if action == 'reload_db':
+                db.reload()
+        bot.add_listener(on_cluster_message)
+        utils.database.SAVE_HOOKS.append(lambda db_name, changes: cluster.broadcast('reload_db', db_name))
+    else:
+        utils.database.SAVE_HOOKS.append(lambda db_name, changes: cluster.broadcast('db_saved', db_name, changes))
+    cluster.start(bot)
+
+    rng = random.Random(cluster_id)
+    for i in range(rounds):
+        db[f'{cluster_id}-{i}'] = {'round': i, 'items': [cluster_id] * 3}
+        await db.save_async()
+        await asyncio.sleep(rng.random() * 0.01)
+    while True:
+        await asyncio.sleep(SETTLE)
+        if not db.dirty:
+            break
+        await db.save_async()
+    print(f"Cluster {cluster_id}: {len(db)} keys in memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clusters', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=50, help="number of keys each cluster sets and saves")
+    parser.add_argument('--reload', action='store_true', help="reload the database instead of merging changes")
+    args = parser.parse_args()
+    # There is no gateway to identify with.
+    utils.cluster.IDENTIFY_INTERVAL = 0
+    with tempfile.TemporaryDirectory() as directory:
+        target = functools.partial(run_cluster, directory=directory, rounds=args.rounds, reload=args.reload)
+        start = time.perf_counter()
+        utils.cluster.launch(target, args.clusters, args.clusters)
+        elapsed = time.perf_counter() - start
+        with open(os.path.join(directory, DB_NAME + '.json')) as f:
+            saved = json.load(f)
+    expected = args.clusters * args.rounds
+    print(f"{len(saved)} of {expected} keys saved ({expected - len(saved)} lost) in {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
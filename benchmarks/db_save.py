@@ -0,0 +1,89 @@
+"""Measure how long it takes to save a DB with 100,000 top-level keys after
+changing one of them, compared with serializing the whole DB as before.
+"""
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+
+from utils.database import DB, save_data_async, write_data
+
+
+KEYS = 100000
+SAVES = 20
+
+
+def make_db(directory: str) -> DB:
+    db = DB('bench', directory, 'ok')
+    for i in range(KEYS):
+        db[str(i)] = {'name': f"user{i}", 'points': i, 'history': [i, i + 1, i + 2]}
+    return db
+
+
+def time_saves(save) -> float:
+    """Return the average time of a save after changing one key."""
+    times = []
+    for i in range(SAVES):
+        start = time.perf_counter()
+        save(i)
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times)
+
+
+async def max_loop_block(db: DB, save) -> float:
+    """Return the longest time that the event loop was blocked during saves
+    after changing one key.
+    """
+    longest = 0
+    done = False
+
+    async def ticker():
+        nonlocal longest
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    task = asyncio.get_event_loop().create_task(ticker())
+    await asyncio.sleep(0)
+    for i in range(SAVES):
+        db[str(i)]['points'] += 1
+        await save()
+    done = True
+    await task
+    return longest
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        db = make_db(directory)
+        db.save()
+
+        def full_save(i):
+            db[str(i)]['points'] += 1
+            write_data(db.filepath, json.dumps(db, indent='\t'))
+
+        def incremental_save(i):
+            db[str(i)]['points'] += 1
+            db.save()
+
+        full = time_saves(full_save)
+        incremental = time_saves(incremental_save)
+        print(f"save() after changing 1 of {KEYS} keys: {full * 1000:.1f} ms -> {incremental * 1000:.1f} ms "
+              f"({(incremental - full) / full:+.1%})")
+        with open(db.filepath) as f:
+            assert f.read() == json.dumps(db, indent='\t')
+
+        full = asyncio.run(max_loop_block(db, lambda: save_data_async(db.filepath, db)))
+        incremental = asyncio.run(max_loop_block(db, db.save_async))
+        print(f"Longest event loop block during save_async(): {full * 1000:.1f} ms -> {incremental * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measure the mention reply in Bot.on_message and the error reply in
+utils.error_handling.on_command_error with and without the embed cache.
+
+Both paths run against FakeGateway/FakeHTTP; "uncached" rebuilds the embed and
+its dictionary for every message, which is what the bot did before the cache.
+Logging is disabled so that only the bot's own work is measured.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from discord.ext import commands
+
+from benchmarks.fake_discord import FakeGateway, FakeHTTP, drain
+from constants import info
+import utils
+
+
+MESSAGES = 5000
+
+
+def uncached_get(name, *args):
+    return utils.embed_cache._BUILDERS[name](*args)
+
+
+async def time_mentions(bot, gateway) -> float:
+    content = f"{bot.user.mention} hello"
+    start = time.perf_counter()
+    for i in range(MESSAGES):
+        gateway.message(content)
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    await drain()
+    return time.perf_counter() - start
+
+
+async def time_errors(bot, gateway) -> float:
+    message = bot._connection._get_message(int(gateway.message(f"{info.COMMAND_PREFIX}ping")['id']))
+    await drain()
+    ctx = await bot.get_context(message)
+    exc = commands.DisabledCommand()
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        await utils.error_handling.on_command_error(ctx, exc)
+    return time.perf_counter() - start
+
+
+async def run(cached: bool) -> dict:
+    from main import Bot
+    utils.embed_cache.invalidate()
+    bot = Bot(description=info.DESCRIPTION)
+    gateway = FakeGateway(bot, http=FakeHTTP())
+    original_get = utils.embed_cache.get
+    if not cached:
+        utils.embed_cache.get = uncached_get
+    try:
+        return {
+            'mention': await time_mentions(bot, gateway),
+            'error': await time_errors(bot, gateway),
+        }
+    finally:
+        utils.embed_cache.get = original_get
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7, help="number of runs of each variant")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    results = {False: [], True: []}
+    # Alternate which variant runs first so that neither always gets a cold
+    # or warm process.
+    for i in range(args.repeat):
+        for cached in ((False, True) if i % 2 == 0 else (True, False)):
+            results[cached].append(asyncio.run(run(cached)))
+    for path in ('mention', 'error'):
+        before = statistics.median(result[path] for result in results[False])
+        after = statistics.median(result[path] for result in results[True])
+        print(f"{path:>8}: {before / MESSAGES * 1e6:6.1f} us -> {after / MESSAGES * 1e6:6.1f} us "
+              f"per reply ({(after - before) / before:+.1%}, median of {args.repeat})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare message throughput and command latency on each available event loop.
+
+Each run is `python -m benchmarks.throughput --event-loop <loop>` in a separate
+process, since the event loop policy can only be chosen once per process. The
+median of several runs is reported.
+"""
+from os import path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+LOOPS = ('asyncio', 'uvloop')
+
+
+def available(loop: str) -> bool:
+    if loop == 'asyncio':
+        return True
+    try:
+        __import__(loop)
+    except ImportError:
+        return False
+    return True
+
+
+def run(loop: str, messages: int, http_latency: float) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        output = path.join(directory, 'results.json')
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.throughput', '--event-loop', loop,
+             '--messages', str(messages), '--http-latency', str(http_latency), '--output', output],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        with open(output) as f:
+            return json.load(f)
+
+
+def p95(results: dict) -> float:
+    """Return the median p95 latency across all commands, in milliseconds."""
+    return statistics.median(metric['p95_ms'] for metric in results['commands'].values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--http-latency', type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    summary = {}
+    for loop in LOOPS:
+        if not available(loop):
+            print(f"{loop:>8}: not installed")
+            continue
+        runs = [run(loop, args.messages, args.http_latency) for _ in range(args.runs)]
+        assert all(r['event_loop'] == loop for r in runs), f"{loop} was not used"
+        summary[loop] = {
+            'messages_per_s': statistics.median(r['messages_per_s'] for r in runs),
+            'p95_ms': statistics.median(p95(r) for r in runs),
+        }
+        print(f"{loop:>8}: {summary[loop]['messages_per_s']:8.0f} events/s, "
+              f"median command p95 {summary[loop]['p95_ms']:.2f} ms")
+    if len(summary) > 1:
+        base = summary['asyncio']
+        for loop, result in summary.items():
+            if loop != 'asyncio':
+                change = (result['messages_per_s'] - base['messages_per_s']) / base['messages_per_s']
+                print(f"{loop} vs asyncio: {change:+.1%} throughput")
+
+
+if __name__ == '__main__':
+    main()
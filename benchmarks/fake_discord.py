@@ -0,0 +1,394 @@
+"""In-process stand-ins for the Discord gateway and REST API.
+
+FakeGateway feeds synthetic gateway events (built from the same JSON payloads
+Discord sends) straight into a bot's connection state, and FakeHTTP replaces the
+bot's HTTP client so that every outbound request is counted and answered
+locally instead of being sent to Discord.
+"""
+from collections import Counter
+from itertools import count
+import asyncio
+import time
+
+import discord
+
+
+BOT_ID = 1000
+OWNER_ID = 1001
+GUILD_ID = 2000
+CHANNEL_ID = 3000
+
+_snowflakes = count(10 ** 17)
+
+
+def snowflake() -> int:
+    return next(_snowflakes)
+
+
+def user_payload(user_id: int, name: str = None, *, bot: bool = False) -> dict:
+    return {
+        'id': str(user_id),
+        'username': name or f"user{user_id}",
+        'discriminator': f"{user_id % 10000:04}",
+        'avatar': None,
+        'bot': bot,
+    }
+
+
+def member_payload(user_id: int, name: str = None, roles=()) -> dict:
+    return {
+        'user': user_payload(user_id, name),
+        'roles': [str(role_id) for role_id in roles],
+        'joined_at': '2020-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+    }
+
+
+def guild_payload(guild_id: int, member_ids, channel_ids=(CHANNEL_ID,)) -> dict:
+    member_ids = list(member_ids)
+    return {
+        'id': str(guild_id),
+        'name': f"guild{guild_id}",
+        'owner_id': str(OWNER_ID),
+        'region': 'us-east',
+        'afk_timeout': 300,
+        'verification_level': 0,
+        'default_message_notifications': 0,
+        'explicit_content_filter': 0,
+        'mfa_level': 0,
+        'features': [],
+        'emojis': [],
+        'roles': [{
+            'id': str(guild_id),
+            'name': '@everyone',
+            'permissions': str(discord.Permissions.all().value),
+            'position': 0,
+            'color': 0,
+            'hoist': False,
+            'managed': False,
+            'mentionable': False,
+        }, {
+            'id': str(guild_id + 1),
+            'name': 'Bot',
+            # discord.py 1.7 reads permissions from here.
+            'permissions_new': str(discord.Permissions.all().value),
+            'position': 1,
+            'color': 0,
+            'hoist': False,
+            'managed': True,
+            'mentionable': False,
+        }],
+        'channels': [{
+            'id': str(channel_id),
+            'type': 0,
+            'name': f"channel{channel_id}",
+            'position': i,
+            'permission_overwrites': [],
+        } for i, channel_id in enumerate(channel_ids)],
+        'members': [member_payload(member_id, roles=[guild_id + 1] if member_id == BOT_ID else ()) for member_id in member_ids],
+        'member_count': len(member_ids),
+    }
+
+
+class FakeResponse:
+    """Just enough of aiohttp.ClientResponse for discord.HTTPException."""
+
+    def __init__(self, status: int, reason: str = ''):
+        self.status = status
+        self.reason = reason
+
+
+class FakeHTTP:
+    """A replacement for discord.http.HTTPClient.
+    Every request is counted in `requests` (by method name) and answered after
+    `latency` seconds. `ratelimits` maps request names to (rate, per) pairs;
+    requests beyond `rate` in `per` seconds wait for the next window, as
+    discord.py does when Discord rate limits it. Methods that are not
+    explicitly implemented return an empty payload.
+    """
+
+    def __init__(self, latency: float = 0.0, ratelimits: dict = None):
+        self.latency = latency
+        self.ratelimits = ratelimits or {}
+        # Maps rate-limited request names to [window start, requests in window].
+        self._windows = {}
+        self.requests = Counter()
+        self.sent = []
+        self.gateway = None
+        # Guild payloads by ID, for the guild endpoints.
+        self.guilds = {}
+        # Deferred interaction responses by interaction token.
+        self.responses = {}
+
+    async def _request(self, name: str):
+        self.requests[name] += 1
+        if name in self.ratelimits:
+            rate, per = self.ratelimits[name]
+            loop = asyncio.get_event_loop()
+            window = self._windows.setdefault(name, [loop.time(), 0])
+            while True:
+                if loop.time() >= window[0] + per:
+                    window[:] = [loop.time(), 0]
+                if window[1] < rate:
+                    window[1] += 1
+                    break
+                await asyncio.sleep(window[0] + per - loop.time())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def message_payload(self, channel_id, content=None, embed=None, embeds=None, author=None) -> dict:
+        return {
+            'id': str(snowflake()),
+            'channel_id': str(channel_id),
+            'author': author or user_payload(BOT_ID, 'Bot', bot=True),
+            'content': content or '',
+            'timestamp': '2020-01-01T00:00:00+00:00',
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': embeds or ([embed] if embed else []),
+            'pinned': False,
+            'type': 0,
+        }
+
+    async def send_message(self, channel_id, content, *, embed=None, **kwargs):
+        await self._request('send_message')
+        self.sent.append((channel_id, content, embed))
+        payload = self.message_payload(channel_id, content, embed)
+        if self.gateway is not None:
+            # Discord echoes the bot's own messages back over the gateway.
+            self.gateway.echo(payload)
+        return payload
+
+    async def edit_message(self, channel_id, message_id, **fields):
+        await self._request('edit_message')
+        payload = self.message_payload(channel_id, fields.get('content'), fields.get('embed'))
+        payload['id'] = str(message_id)
+        return payload
+
+    async def request(self, route, **kwargs):
+        """Answer a request made with a Route directly, as for application
+        commands and webhooks. Requests are counted by method and path.
+        """
+        await self._request(f'{route.method} {route.path}')
+        token = getattr(route, 'token', None)
+        if route.path.endswith('/callback'):
+            # A deferred response is a message saying that the bot is thinking.
+            payload = self.responses[token] = self.message_payload(CHANNEL_ID)
+        elif route.method in ('PATCH', 'POST') and route.path.startswith('/webhooks/'):
+            fields = kwargs.get('json', {})
+            payload = self.message_payload(CHANNEL_ID, fields.get('content'), embeds=fields.get('embeds'))
+            if route.method == 'PATCH':
+                payload['id'] = self.responses[token]['id']
+                if self.gateway is not None:
+                    self.gateway.echo(payload, 'MESSAGE_UPDATE')
+                return payload
+        else:
+            return kwargs.get('json')
+        if self.gateway is not None:
+            self.gateway.echo(payload)
+        return payload
+
+    async def channel_webhooks(self, channel_id):
+        await self._request('channel_webhooks')
+        return []
+
+    async def create_webhook(self, channel_id, *, name, avatar=None, reason=None):
+        await self._request('create_webhook')
+        return {
+            'id': str(snowflake()),
+            'type': 1,
+            'channel_id': str(channel_id),
+            'name': name,
+            'token': 'webhook-token',
+            'user': user_payload(BOT_ID, 'Bot', bot=True),
+        }
+
+    async def application_info(self):
+        await self._request('application_info')
+        return {
+            'id': str(BOT_ID),
+            'name': 'Bot',
+            'icon': None,
+            'description': '',
+            'rpc_origins': [],
+            'bot_public': True,
+            'bot_require_code_grant': False,
+            'owner': user_payload(OWNER_ID, 'Owner'),
+            'summary': '',
+            'verify_key': '',
+        }
+
+    async def get_user(self, user_id):
+        await self._request('get_user')
+        if user_id == '@me':
+            return user_payload(BOT_ID, 'Bot', bot=True)
+        return user_payload(int(user_id))
+
+    async def get_guilds(self, limit, before=None, after=None):
+        await self._request('get_guilds')
+        ids = sorted(self.guilds)
+        if after is not None:
+            ids = [guild_id for guild_id in ids if guild_id > int(after)]
+        return [{'id': str(guild_id), 'name': self.guilds[guild_id]['name']} for guild_id in ids[:limit]]
+
+    async def get_guild(self, guild_id):
+        await self._request('get_guild')
+        data = dict(self.guilds[int(guild_id)])
+        del data['channels'], data['members']
+        return data
+
+    async def get_member(self, guild_id, member_id):
+        await self._request('get_member')
+        for data in self.guilds[int(guild_id)]['members']:
+            if data['user']['id'] == str(member_id):
+                return data
+        raise discord.NotFound(FakeResponse(404), 'Unknown Member')
+
+    async def get_all_guild_channels(self, guild_id):
+        await self._request('get_all_guild_channels')
+        return list(self.guilds[int(guild_id)]['channels'])
+
+    def __getattr__(self, name):
+        async def request(*args, **kwargs):
+            await self._request(name)
+            return {}
+        return request
+
+
+class FakeGateway:
+    """Feed synthetic gateway events into a bot.
+    Creating a FakeGateway replaces the bot's HTTP client with `http`, logs the
+    bot in as a fake user, and adds one guild with the given members.
+    """
+
+    def __init__(self, bot, *, http: FakeHTTP = None, member_count: int = 100):
+        self.bot = bot
+        self.http = http or FakeHTTP()
+        self.http.gateway = self
+        self.events = Counter()
+        # Events that aren't delivered, as when their intents are disabled.
+        self.disabled_events = set()
+        state = bot._connection
+        bot.http = state.http = self.http
+        state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID, 'Bot', bot=True))
+        state.is_bot = True
+        bot.owner_id = OWNER_ID
+        self.member_ids = [OWNER_ID] + [snowflake() for _ in range(member_count - 1)]
+        self.add_guild(GUILD_ID, self.member_ids)
+        self.guild = bot.get_guild(GUILD_ID)
+        self.channel = self.guild.get_channel(CHANNEL_ID)
+
+    def add_guild(self, guild_id: int, member_ids, channel_ids=(CHANNEL_ID,)):
+        # Discord always includes the bot's own member, which has the Bot role.
+        data = guild_payload(guild_id, [*member_ids, BOT_ID], channel_ids)
+        self.http.guilds[guild_id] = data
+        self.bot._connection._add_guild_from_data(data)
+
+    def ready(self) -> None:
+        """Dispatch READY followed by GUILD_CREATE for every guild, as when the
+        bot identifies.
+        """
+        self.bot.ws = FakeWebSocket()
+        self.dispatch('READY', {
+            'v': 8,
+            'user': user_payload(BOT_ID, 'Bot', bot=True),
+            'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in self.http.guilds],
+            'session_id': 'session',
+            'private_channels': [],
+            'relationships': [],
+            'application': {'id': str(BOT_ID), 'flags': 0},
+        })
+        for data in self.http.guilds.values():
+            self.dispatch('GUILD_CREATE', dict(data, unavailable=False))
+
+    def dispatch(self, event: str, data: dict) -> None:
+        """Handle a gateway event as if it had just been received."""
+        if event in self.disabled_events:
+            return
+        self.events[event] += 1
+        self.bot._connection.parsers[event](data)
+
+    def echo(self, payload: dict, event: str = 'MESSAGE_CREATE') -> None:
+        """Dispatch MESSAGE_CREATE (or `event`) for a message the bot sent."""
+        channel = self.bot.get_channel(int(payload['channel_id']))
+        payload = dict(payload)
+        if getattr(channel, 'guild', None) is not None:
+            payload['guild_id'] = str(channel.guild.id)
+        asyncio.get_event_loop().call_soon(self.dispatch, event, payload)
+
+    def message(self, content: str, author_id: int = None, channel_id: int = CHANNEL_ID, guild_id: int = GUILD_ID) -> dict:
+        author_id = author_id or self.member_ids[0]
+        data = self.http.message_payload(channel_id, content, author=user_payload(author_id))
+        data['guild_id'] = str(guild_id)
+        data['member'] = {'roles': [], 'joined_at': '2020-01-01T00:00:00+00:00', 'deaf': False, 'mute': False}
+        self.dispatch('MESSAGE_CREATE', data)
+        return data
+
+    def interaction(self, name: str, options=(), author_id: int = None, channel_id: int = CHANNEL_ID,
+                    guild_id: int = GUILD_ID) -> dict:
+        """Dispatch INTERACTION_CREATE for an application command, where
+        `options` are option payloads such as {'name': ..., 'type': ...,
+        'value': ...}.
+        """
+        interaction_id = snowflake()
+        data = {
+            'id': str(interaction_id),
+            'application_id': str(BOT_ID),
+            'type': 2,
+            'token': f'token{interaction_id}',
+            'version': 1,
+            'guild_id': str(guild_id),
+            'channel_id': str(channel_id),
+            'member': member_payload(author_id or self.member_ids[0]),
+            'data': {'id': str(snowflake()), 'name': name, 'options': list(options)},
+        }
+        self.dispatch('INTERACTION_CREATE', data)
+        return data
+
+    def reaction(self, message_id: int, emoji: str, user_id: int = None, *, remove: bool = False,
+                 channel_id: int = CHANNEL_ID, guild_id: int = GUILD_ID) -> None:
+        data = {
+            'user_id': str(user_id or self.member_ids[0]),
+            'channel_id': str(channel_id),
+            'message_id': str(message_id),
+            'guild_id': str(guild_id),
+            'emoji': {'id': None, 'name': emoji},
+        }
+        if not remove:
+            # Discord includes the member with guild reaction adds (but not
+            # removes).
+            data['member'] = member_payload(int(data['user_id']))
+        self.dispatch('MESSAGE_REACTION_REMOVE' if remove else 'MESSAGE_REACTION_ADD', data)
+
+
+class FakeWebSocket:
+    """Just enough of discord.gateway.DiscordWebSocket for presence updates."""
+
+    session_id = 'session'
+    sequence = 0
+    latency = 0.0
+    open = True
+
+    async def change_presence(self, **kwargs):
+        pass
+
+    async def close(self, code=1000):
+        self.open = False
+
+
+async def drain(timeout: float = 30.0, *, exclude=()) -> None:
+    """Wait until every other task on the event loop, except those in
+    `exclude`, has finished.
+    """
+    deadline = time.perf_counter() + timeout
+    current = asyncio.current_task()
+    while time.perf_counter() < deadline:
+        tasks = [t for t in asyncio.all_tasks() if t is not current and t not in exclude and not t.done()]
+        if not tasks:
+            return
+        await asyncio.wait(tasks, timeout=deadline - time.perf_counter())
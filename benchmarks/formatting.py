@@ -0,0 +1,94 @@
+"""Time the formatting helpers in utils against their previous implementations,
+on small inputs and on large ones such as 100,000 users.
+"""
+import random
+import timeit
+
+import discord
+
+from benchmarks.fake_discord import user_payload
+import utils
+from utils.discord import sort_users
+
+
+USERS = 100000
+
+
+def old_human_list(words, oxford_comma=True):
+    words = list(words)
+    if len(words) == 0:
+        return "(none)"
+    elif len(words) == 1:
+        return words[0]
+    s = ", ".join(words[:-1])
+    if oxford_comma and len(words) > 2:
+        s += ","
+    s += " and " + words[-1]
+    return s
+
+
+def old_format_time_interval(timestamp1, timestamp2=0, *, include_seconds=True):
+    dt = int(abs(timestamp1 - timestamp2))
+    dt, seconds = dt // 60, dt % 60
+    dt, minutes = dt // 60, dt % 60
+    dt, hours = dt // 24, dt % 24
+    days = dt
+    s = ''
+    if days:
+        s += f'{days}d'
+    if days or hours:
+        s += f'{hours}h'
+    if days or hours or minutes or not include_seconds:
+        s += f'{minutes}m'
+    if include_seconds:
+        s += f'{seconds}s'
+    return s
+
+
+def old_sort_users(user_list):
+    def key(user):
+        if isinstance(user, discord.abc.User):
+            return user.display_name.lower()
+        else:
+            return user
+    return sorted(user_list, key=key)
+
+
+def make_users(count: int):
+    rng = random.Random(0)
+    users = []
+    for i in range(count):
+        name = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÜßé') for _ in range(10))
+        users.append(discord.User(state=None, data=user_payload(i, name)))
+    return users
+
+
+def bench(name: str, old, new, number: int) -> None:
+    old_time = min(timeit.repeat(old, number=number, repeat=3)) / number
+    new_time = min(timeit.repeat(new, number=number, repeat=3)) / number
+    print(f"{name:>36}: {old_time * 1e6:10.2f} us -> {new_time * 1e6:10.2f} us ({(new_time - old_time) / old_time:+.1%})")
+
+
+def main():
+    words = [f"word{i}" for i in range(10)]
+    many_words = [f"word{i}" for i in range(USERS)]
+    bench("human_list (10-item list)", lambda: old_human_list(words), lambda: utils.human_list(words), 100000)
+    bench(f"human_list ({USERS}-item list)", lambda: old_human_list(many_words), lambda: utils.human_list(many_words), 20)
+    bench(f"human_list ({USERS}-item generator)",
+          lambda: old_human_list(w for w in many_words), lambda: utils.human_list(w for w in many_words), 20)
+
+    rng = random.Random(0)
+    # Mostly short intervals, as for cooldowns and timeouts.
+    intervals = [rng.randrange(600) for _ in range(1000)] + [rng.randrange(10 ** 7) for _ in range(100)]
+    bench("format_time_interval (1100 calls)",
+          lambda: [old_format_time_interval(dt) for dt in intervals],
+          lambda: [utils.format_time_interval(dt) for dt in intervals], 200)
+
+    users = make_users(100)
+    bench("sort_users (100 users)", lambda: old_sort_users(users), lambda: sort_users(users), 2000)
+    users = make_users(USERS)
+    bench(f"sort_users ({USERS} users)", lambda: old_sort_users(users), lambda: sort_users(users), 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Compare keeping per-guild data for 100,000 guilds in one DB with a GuildDB
+that keeps only recently used guilds in memory.
+
+The workload is skewed, as in practice: most accesses go to a few busy guilds
+and most guilds are idle. Each access increments a user's points in a guild.
+Each configuration is run twice, once to time it and once to measure its
+memory use with tracemalloc. The GuildDB is run both on an event loop, where
+changed partitions are written back on a worker thread when they are evicted,
+and without one, where they are written straight away; the longest single
+access shows how long an eviction can block the event loop. Afterwards the
+partitions are read back from disk to check that no update was lost.
+"""
+import asyncio
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+
+from utils.database import DB, GuildDB
+
+
+GUILDS = 100000
+USERS_PER_GUILD = 20
+ACCESSES = 100000
+PARTITION_BUDGETS = (1000, 10000)
+
+# Maps each GuildDB configuration to the longest single access in its last run,
+# in seconds.
+LONGEST_ACCESS = {}
+
+
+def guild_data(guild_id: int) -> dict:
+    return {
+        'settings': {'prefix': '!', 'welcome_channel': guild_id, 'disabled_commands': []},
+        'points': {str(guild_id * 100 + i): i for i in range(USERS_PER_GUILD)},
+    }
+
+
+def workload(seed: int = 0):
+    """Yield (guild_id, user_id) pairs, with 90% of accesses going to 1% of
+    guilds.
+    """
+    rng = random.Random(seed)
+    busy = GUILDS // 100
+    for _ in range(ACCESSES):
+        guild_id = rng.randrange(busy) if rng.random() < 0.9 else rng.randrange(GUILDS)
+        yield guild_id, str(guild_id * 100 + rng.randrange(USERS_PER_GUILD))
+
+
+def populate(directory: str) -> None:
+    db = GuildDB('guilds', directory, 1000, 'ok')
+    for guild_id in range(GUILDS):
+        db[guild_id].update(guild_data(guild_id))
+    db.save()
+
+
+def run_single(directory: str) -> DB:
+    """Every guild in one DB, as with get_db()."""
+    db = DB('guilds', directory, 'ok', data={str(guild_id): guild_data(guild_id) for guild_id in range(GUILDS)})
+    for guild_id, user_id in workload():
+        db[str(guild_id)]['points'][user_id] += 1
+    return db
+
+
+def run_partitioned(directory: str, max_partitions: int, event_loop: bool) -> GuildDB:
+    if event_loop:
+        return asyncio.run(run_partitioned_async(directory, max_partitions))
+    db = GuildDB('guilds', directory, max_partitions, 'ok')
+    longest = 0.0
+    for guild_id, user_id in workload():
+        start = time.perf_counter()
+        db[guild_id]['points'][user_id] += 1
+        longest = max(longest, time.perf_counter() - start)
+    LONGEST_ACCESS[max_partitions, event_loop] = longest
+    return db
+
+
+async def run_partitioned_async(directory: str, max_partitions: int) -> GuildDB:
+    db = GuildDB('guilds', directory, max_partitions, 'ok')
+    longest = 0.0
+    for i, (guild_id, user_id) in enumerate(workload()):
+        start = time.perf_counter()
+        db[guild_id]['points'][user_id] += 1
+        longest = max(longest, time.perf_counter() - start)
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    # Wait for the evicted partitions to be written.
+    while db._writer is not None:
+        await db._writer
+    LONGEST_ACCESS[max_partitions, True] = longest
+    return db
+
+
+def measure(run, *args, save: bool = False):
+    """Run the workload twice, once timed and once tracing memory allocations,
+    saving the database after the first run if `save` is true. Returns the
+    time taken, the memory in use at the end and the database.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    db = run(*args)
+    elapsed = time.perf_counter() - start
+    if save:
+        db.save()
+    gc.collect()
+    tracemalloc.start()
+    db = run(*args)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, memory, db
+
+
+def check(directory: str, runs: int) -> None:
+    """Check that every increment made by `runs` runs of the workload was
+    saved.
+    """
+    expected = {}
+    for key in workload():
+        expected[key] = expected.get(key, 0) + runs
+    db = GuildDB('guilds', directory, GUILDS, 'ok')
+    for (guild_id, user_id), count in expected.items():
+        actual = db[guild_id]['points'][user_id] - int(user_id) % 100
+        assert actual == count, (guild_id, user_id, actual, count)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed, memory, _ = measure(run_single, directory)
+        print(f"{'single DB':>29}: {ACCESSES} accesses in {elapsed:5.2f} s, {memory / 1024 ** 2:6.1f} MB")
+        start = time.perf_counter()
+        populate(directory)
+        print(f"(wrote {GUILDS} partitions in {time.perf_counter() - start:.1f} s)")
+        for max_partitions in PARTITION_BUDGETS:
+            for event_loop in (False, True):
+                elapsed, memory, db = measure(run_partitioned, directory, max_partitions, event_loop, save=True)
+                start = time.perf_counter()
+                db.save()
+                save = time.perf_counter() - start
+                name = f"GuildDB ({max_partitions} loaded{', async' if event_loop else ''})"
+                print(f"{name:>29}: {ACCESSES} accesses in {elapsed:5.2f} s, "
+                      f"{memory / 1024 ** 2:6.1f} MB, hit rate {db.hits / (db.hits + db.misses):.1%}, "
+                      f"{db.evictions} evictions, {db.writebacks} writebacks (final save {save * 1e3:.0f} ms), "
+                      f"longest access {LONGEST_ACCESS[max_partitions, event_loop] * 1e3:.1f} ms")
+        check(directory, 4 * len(PARTITION_BUDGETS))
+        print("All updates were saved")
+
+
+if __name__ == '__main__':
+    main()
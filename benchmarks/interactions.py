@@ -0,0 +1,106 @@
+"""Compare how many gateway events the bot handles per command with prefix
+commands and with application (slash) commands (see utils/interactions.py).
+
+The same chat-heavy workload as benchmarks/throughput.py (without reactions)
+is replayed three ways:
+
+- prefix commands: every message, including the bot's own, arrives as
+  MESSAGE_CREATE and is checked for a prefix
+- slash commands: commands arrive as INTERACTION_CREATE in an opted-in guild,
+  where ordinary messages are still received but ignored
+- slash commands without the guild_messages intent: Discord doesn't send
+  messages at all
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_discord import FakeGateway, FakeHTTP, GUILD_ID, drain
+from benchmarks.throughput import DEFAULT_MIX
+from constants import info
+import utils
+
+
+MIX = tuple((weight, content) for weight, content in DEFAULT_MIX if content is not None)
+
+
+def interaction_options(bot, text: str):
+    """Return the application command name and options for the text of a
+    prefix command, using the options that would be registered for it.
+    """
+    name, *words = text.split()
+    command = bot.get_command(name)
+    schema = utils.interactions.command_options(command)
+    options = []
+    for (param_name, param), option in zip(command.clean_params.items(), schema):
+        if not words:
+            break
+        if param.kind == param.KEYWORD_ONLY:
+            value, words = ' '.join(words), []
+        else:
+            value = words.pop(0)
+        if option['type'] == utils.interactions.INTEGER:
+            value = int(value)
+        options.append({'name': option['name'], 'type': option['type'], 'value': value})
+    return command.name, options
+
+
+async def run(mode: str, events: int, seed: int = 0):
+    from main import Bot
+    import random
+    info.SLASH_COMMAND_GUILDS = [] if mode == 'prefix' else [GUILD_ID]
+    bot = Bot(description=info.DESCRIPTION)
+    gateway = FakeGateway(bot, http=FakeHTTP())
+    await bot.load_all_extensions()
+    bot.app_info = await bot.application_info()
+    await bot.slash_commands.sync()
+    if mode == 'slash-no-messages':
+        gateway.disabled_events.update(('MESSAGE_CREATE', 'MESSAGE_UPDATE'))
+    gateway.events.clear()
+    gateway.http.requests.clear()
+
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in MIX]
+    contents = [content for _, content in MIX]
+    start = time.process_time()
+    for i in range(events):
+        content = rng.choices(contents, weights)[0].format(prefix=info.COMMAND_PREFIX)
+        author = rng.choice(gateway.member_ids)
+        if mode != 'prefix' and content.startswith(info.COMMAND_PREFIX):
+            gateway.interaction(*interaction_options(bot, content[len(info.COMMAND_PREFIX):]), author)
+        else:
+            gateway.message(content, author)
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    await drain()
+    cpu = time.process_time() - start
+    commands = sum(metric.count for metric in bot.stats.commands.values())
+    errors = sum(metric.errors for metric in bot.stats.commands.values())
+    return {
+        'events': sum(gateway.events.values()),
+        'by_event': dict(gateway.events),
+        'commands': commands,
+        'errors': errors,
+        'requests': sum(gateway.http.requests.values()),
+        'cpu': cpu,
+        'counts': {name: metric.count for name, metric in sorted(bot.stats.commands.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=5000, help="number of incoming messages and commands")
+    args = parser.parse_args()
+    results = {}
+    for mode in ('prefix', 'slash', 'slash-no-messages'):
+        results[mode] = r = asyncio.run(run(mode, args.events))
+        print(f"{mode:>17}: {r['commands']} commands ({r['errors']} errors), {r['events']} gateway events "
+              f"({r['events'] / r['commands']:.2f} per command), {r['requests']} requests "
+              f"({r['requests'] / r['commands']:.2f} per command), CPU {r['cpu']:.2f} s "
+              f"({r['cpu'] / r['commands'] * 1e3:.2f} ms per command)")
+        print(f"{'':>19}{', '.join(f'{event} {n}' for event, n in sorted(r['by_event'].items()))}")
+    assert all(r['counts'] == results['prefix']['counts'] for r in results.values()), "different commands ran"
+
+
+if __name__ == '__main__':
+    main()
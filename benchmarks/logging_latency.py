@@ -0,0 +1,87 @@
+"""Measure event-loop latency while the bot logs heavily.
+
+Compares logging straight to a file handler (the old basicConfig() setup) with
+the queue-based pipeline from utils.log. A sink that occasionally stalls is
+used to simulate a slow disk.
+"""
+from tempfile import TemporaryDirectory
+from os import path
+import asyncio
+import logging
+import statistics
+import time
+
+from utils.log import LOG_FMT, setup_logging
+
+
+RECORDS_PER_TICK = 50
+DURATION = 2.0
+STALL_EVERY = 500
+STALL_SECONDS = 0.01
+
+
+class StallFilter(logging.Filter):
+    """Simulate a slow disk by sleeping every so often in the writing thread."""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def filter(self, record):
+        self.count += 1
+        if self.count % STALL_EVERY == 0:
+            time.sleep(STALL_SECONDS)
+        return True
+
+
+async def measure(logger):
+    lags = []
+    stop = time.perf_counter() + DURATION
+
+    async def spam():
+        i = 0
+        while time.perf_counter() < stop:
+            for _ in range(RECORDS_PER_TICK):
+                logger.info("Loaded extension %r", i)
+                i += 1
+            await asyncio.sleep(0)
+
+    async def probe():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    await asyncio.gather(spam(), probe())
+    return lags
+
+
+def report(name, lags):
+    lags = sorted(lags)
+    ms = [x * 1000 for x in lags]
+    print(f"{name:>8}: mean {statistics.mean(ms):7.3f} ms, "
+          f"p99 {ms[int(len(ms) * 0.99)]:7.3f} ms, max {ms[-1]:7.3f} ms")
+
+
+def main():
+    root = logging.getLogger()
+    logger = logging.getLogger('bench')
+    logger.setLevel(logging.INFO)
+    with TemporaryDirectory() as tmp:
+        handler = logging.FileHandler(path.join(tmp, 'direct.log'))
+        handler.addFilter(StallFilter())
+        handler.setFormatter(logging.Formatter(LOG_FMT))
+        root.addHandler(handler)
+        report('direct', asyncio.run(measure(logger)))
+        root.removeHandler(handler)
+        handler.close()
+
+        listener = setup_logging(filename=path.join(tmp, 'queued.log'))
+        for h in listener.handlers:
+            h.addFilter(StallFilter())
+        report('queued', asyncio.run(measure(logger)))
+        listener.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Compare memory use with and without the memory profile on a synthetic guild
+with 50,000 members.
+
+Each configuration runs in its own subprocess so that their memory use doesn't
+interfere.
+"""
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+
+import discord
+
+from benchmarks.fake_discord import FakeGateway
+from constants import info
+
+
+MEMBER_COUNT = 50000
+
+PROFILES = {
+    # Everything enabled, as with discord.py versions before gateway intents.
+    'full': {
+        'max_messages': 1000,
+        'cache_members': True,
+        'intents': [name for name, _ in discord.Intents.all()],
+    },
+    'memory': {'max_messages': 100, 'cache_members': False},
+}
+
+
+def current_rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+async def measure(profile_name: str) -> dict:
+    import main
+    info.MEMORY_PROFILE = PROFILES[profile_name]
+    bot = main.Bot(description=info.DESCRIPTION, **main.cache_options())
+    gc.collect()
+    before = current_rss_mb()
+    gateway = FakeGateway(bot, member_count=MEMBER_COUNT)
+    gc.collect()
+    after = current_rss_mb()
+    return {
+        'profile': profile_name,
+        'cached_members': len(gateway.guild.members),
+        'rss_mb': after - before,
+    }
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(json.dumps(asyncio.run(measure(sys.argv[1]))))
+        return
+    results = {}
+    for name in PROFILES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.member_cache', name],
+            check=True, stdout=subprocess.PIPE,
+        ).stdout
+        results[name] = json.loads(output.decode().strip().splitlines()[-1])
+        print(f"{name:>8}: {results[name]['cached_members']:6} members cached, "
+              f"+{results[name]['rss_mb']:.1f} MB RSS for a {MEMBER_COUNT}-member guild")
+    saved = results['full']['rss_mb'] - results['memory']['rss_mb']
+    print(f"Memory profile saves {saved:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Compare the memory used by discord.py's message cache with how reliably
+prompts (see utils.discord.wait_for_response()) receive reactions, when
+reactions are matched through the message cache ('reaction_add', as before)
+or by message ID ('raw_reaction_add').
+
+Each prompt waits while CHATTER other messages arrive, as in a busy channel
+during a 120-second secret exchange, and is then answered with a reaction.
+Each configuration runs in its own subprocess so that their memory use doesn't
+interfere.
+"""
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+import discord
+
+from benchmarks.fake_discord import FakeGateway, drain
+from constants import emoji, info
+from utils.discord import wait_for_response
+
+
+PROMPTS = 10
+CHATTER = 5000
+TIMEOUT = 120
+
+CONFIGS = {
+    # The cache has to hold every message sent while the prompt is open.
+    'cached, large cache': ('reaction_add', 2 * CHATTER),
+    'cached, small cache': ('reaction_add', 100),
+    'raw, small cache': ('raw_reaction_add', 100),
+    'raw, no cache': ('raw_reaction_add', None),
+}
+
+
+async def old_wait_for_reaction(ctx, m, *, timeout):
+    """What wait_for_response() used to do for reactions."""
+    reaction, user = await ctx.bot.wait_for(
+        'reaction_add',
+        check=lambda reaction, user: reaction.message.id == m.id and user.id == ctx.author.id,
+        timeout=timeout,
+    )
+    return 'reaction', reaction
+
+
+async def prompt(ctx, m, event: str) -> bool:
+    """Wait for a reaction to m. Returns False if it times out."""
+    try:
+        if event == 'reaction_add':
+            await old_wait_for_reaction(ctx, m, timeout=TIMEOUT)
+        else:
+            await wait_for_response(ctx, m, lambda msg: False, lambda payload: True, timeout=TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def measure(config_name: str) -> dict:
+    import main
+    event, max_messages = CONFIGS[config_name]
+    bot = main.Bot(description=info.DESCRIPTION, max_messages=max_messages)
+    gateway = FakeGateway(bot)
+    author = discord.Object(gateway.member_ids[0])
+    ctx = SimpleNamespace(bot=bot, channel=gateway.channel, author=author)
+    gc.collect()
+    tracemalloc.start()
+    answered = 0
+    for _ in range(PROMPTS):
+        m = await gateway.channel.send("Are you sure?")
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(prompt(ctx, m, event))
+        await asyncio.sleep(0)
+        # The prompt's own tasks won't finish until it is answered.
+        waiting = asyncio.all_tasks()
+        for i in range(CHATTER):
+            gateway.message(f"chatter {i}", author_id=gateway.member_ids[1 + i % 99])
+        await drain(exclude=waiting)
+        gateway.reaction(m.id, emoji.CONFIRM, author.id)
+        # A prompt that missed the reaction would wait until TIMEOUT.
+        done, _ = await asyncio.wait([waiter], timeout=1)
+        answered += bool(done) and waiter.result()
+        waiter.cancel()
+    await drain()
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'config': config_name,
+        'cached_messages': len(bot.cached_messages),
+        'answered': answered,
+        'allocated_mb': allocated / 1024 ** 2,
+    }
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(json.dumps(asyncio.run(measure(sys.argv[1]))))
+        return
+    results = {}
+    for name in CONFIGS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.message_cache', name],
+            check=True, stdout=subprocess.PIPE,
+        ).stdout
+        results[name] = result = json.loads(output.decode().strip().splitlines()[-1])
+        print(f"{name:>20}: {result['cached_messages']:6} messages cached, {result['allocated_mb']:5.1f} MB allocated, "
+              f"{result['answered']}/{PROMPTS} prompts answered")
+    saved = results['cached, large cache']['allocated_mb'] - results['raw, no cache']['allocated_mb']
+    print(f"Raw reaction events save {saved:.1f} MB with every prompt answered")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Measure how long loading the databases takes when each is loaded the first
+time a command uses it, and when they are all preloaded in parallel before
+login (utils.database.preload()). Also time the checksum check on its own, and
+check that it catches corruption that is still valid JSON.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import zlib
+
+from utils import database
+from utils.database import ChecksumError, get_db, preload, read_data, write_data
+
+
+SMALL_FILES = 6
+LARGE_FILES = 2
+LARGE_KEYS = 100000
+
+
+def populate(directory: str) -> None:
+    for i in range(SMALL_FILES):
+        data = {str(k): {'points': k, 'name': f'user{k}'} for k in range(100)}
+        write_data(os.path.join(directory, f'small{i}.json'), json.dumps(data, indent='\t'), quiet=True)
+    for i in range(LARGE_FILES):
+        data = {str(k): {'points': k, 'name': f'user{k}', 'items': [1, 2, 3]} for k in range(LARGE_KEYS)}
+        write_data(os.path.join(directory, f'large{i}.json'), json.dumps(data, indent='\t'), quiet=True)
+
+
+def names(directory: str):
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(directory) if f.endswith('.json'))
+
+
+def lazy(directory: str) -> dict:
+    """Return how long the first access to each database takes."""
+    database._DATABASES.clear()
+    times = {}
+    for name in names(directory):
+        start = time.perf_counter()
+        get_db(name, directory)
+        times[name] = time.perf_counter() - start
+    return times
+
+
+def preloaded(directory: str) -> float:
+    database._DATABASES.clear()
+    start = time.perf_counter()
+    asyncio.run(preload(directory=directory))
+    return time.perf_counter() - start
+
+
+def check_corruption(directory: str) -> None:
+    fullpath = os.path.join(directory, 'small0.json')
+    st = os.stat(fullpath)
+    with open(fullpath, 'r+b') as f:
+        raw = f.read()
+        i = raw.index(b'"points": 5')
+        f.seek(i + len(b'"points": '))
+        f.write(b'6')
+    # Keep the modification time, as when the disk corrupts a file.
+    os.utime(fullpath, ns=(st.st_atime_ns, st.st_mtime_ns))
+    try:
+        read_data(fullpath)
+    except ChecksumError:
+        print("Corrupted file detected by its checksum")
+    else:
+        raise AssertionError("corruption was not detected")
+    database._DATABASES.clear()
+    assert not get_db('small0', directory).keys(), "corrupted file was loaded"
+    assert any(f.startswith('small0.json.') and f.endswith('.bak') for f in os.listdir(directory))
+    print("Corrupted file backed up and replaced with an empty database")
+    # Files edited by hand have a new modification time and are accepted.
+    fullpath = os.path.join(directory, 'small1.json')
+    with open(fullpath, 'r+b') as f:
+        f.seek(f.read().index(b'"points": 5') + len(b'"points": '))
+        f.write(b'6')
+    os.utime(fullpath, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert read_data(fullpath)[0]['5']['points'] == 6
+    print("Edited file accepted")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        populate(directory)
+        times = lazy(directory)
+        for name, seconds in times.items():
+            size = os.path.getsize(os.path.join(directory, name + '.json'))
+            print(f"{name:>8} ({size / 1024 ** 2:5.2f} MB): first use {seconds * 1e3:7.1f} ms "
+                  f"(read and parse {database.LOAD_TIMES[os.path.relpath(os.path.join(directory, name + '.json'))] * 1e3:7.1f} ms)")
+        print(f"Lazy loading: {sum(times.values()) * 1e3:.0f} ms spread over the first commands, "
+              f"up to {max(times.values()) * 1e3:.0f} ms for one")
+        print(f"Preloading: {preloaded(directory) * 1e3:.0f} ms before login, "
+              f"on {os.cpu_count()} CPU(s)")
+
+        with open(os.path.join(directory, 'large0.json'), 'rb') as f:
+            raw = f.read()
+        start = time.perf_counter()
+        zlib.crc32(raw)
+        crc = time.perf_counter() - start
+        start = time.perf_counter()
+        json.loads(raw)
+        parse = time.perf_counter() - start
+        print(f"Checksum of a {len(raw) / 1024 ** 2:.1f} MB file: {crc * 1e3:.1f} ms (parsing: {parse * 1e3:.0f} ms)")
+        check_corruption(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Measure how long the bot takes to become ready again after reconnecting,
+against FakeGateway/FakeHTTP with simulated REST latency.
+
+- cold start: the first READY (fetches application info, loads extensions)
+- reconnect: a later READY in the same process, e.g. after a lost connection
+- resume: a new process resuming the previous session (see utils.session),
+  which fetches its guilds over HTTP instead of waiting for READY, or
+  declines to if there are more than utils.session.MAX_GUILDS
+
+READY times include discord.py's guild_ready_timeout (set to GUILD_READY_TIMEOUT
+here; the default is 2 seconds), which it waits after the last GUILD_CREATE.
+FakeHTTP has no global rate limit, so resuming many guilds looks cheaper here
+than it is against Discord.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from benchmarks.fake_discord import FakeGateway, FakeHTTP, snowflake
+from constants import info
+import utils
+
+
+GUILD_READY_TIMEOUT = 0.1
+
+
+async def make_bot(guilds: int, http_latency: float):
+    from main import Bot
+    bot = Bot(description=info.DESCRIPTION, guild_ready_timeout=GUILD_READY_TIMEOUT)
+    gateway = FakeGateway(bot, http=FakeHTTP(latency=http_latency), member_count=10)
+    for _ in range(guilds - 1):
+        gateway.add_guild(snowflake(), gateway.member_ids)
+    return bot, gateway
+
+
+async def wait_for_ready(bot, trigger) -> float:
+    """Return the time from calling trigger() until the bot's ready handler has
+    finished (which ends by setting its presence).
+    """
+    done = asyncio.Event()
+    ready_status = bot.ready_status
+
+    async def wrapped():
+        await ready_status()
+        done.set()
+
+    bot.ready_status = wrapped
+    start = time.perf_counter()
+    trigger()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    bot.ready_status = ready_status
+    return elapsed
+
+
+async def run(guilds: int, http_latency: float) -> dict:
+    bot, gateway = await make_bot(guilds, http_latency)
+    results = {
+        'cold start': await wait_for_ready(bot, gateway.ready),
+        'reconnect': await wait_for_ready(bot, gateway.ready),
+    }
+    bot.watchdog.stop()
+
+    # A fresh process that has never received READY.
+    new_bot, new_gateway = await make_bot(0, http_latency)
+    new_gateway.http.guilds = gateway.http.guilds
+    new_bot._connection.clear()
+
+    if not await utils.session.rehydrate(new_bot):
+        return results
+    new_gateway.http.requests.clear()
+    new_bot._connection.clear()
+
+    def resume():
+        async def resumed():
+            await utils.session.rehydrate(new_bot)
+            new_bot.ws = gateway.bot.ws
+            new_bot.dispatch('resumed')
+        asyncio.ensure_future(resumed())
+
+    results['resume'] = await wait_for_ready(new_bot, resume)
+    new_bot.watchdog.stop()
+    results['resume requests'] = sum(new_gateway.http.requests.values())
+    results['guilds after resume'] = len(new_bot.guilds)
+    results['guilds with me'] = sum(guild.me is not None for guild in new_bot.guilds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, nargs='+', default=[5, utils.session.MAX_GUILDS, 50])
+    parser.add_argument('--http-latency', type=float, default=0.05, help="simulated REST latency in seconds")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    for guilds in args.guilds:
+        results = asyncio.run(run(guilds, args.http_latency))
+        print(f"{guilds} guilds:")
+        for name in ('cold start', 'reconnect', 'resume'):
+            if name in results:
+                print(f"{name:>12}: {results[name] * 1000:7.1f} ms to ready")
+        if 'resume' in results:
+            print(f"{'':>14}{results['resume requests']} requests; {results['guilds after resume']} guilds cached, "
+                  f"{results['guilds with me']} with the bot's member")
+        else:
+            print(f"{'resume':>12}: declined (more than {utils.session.MAX_GUILDS} guilds)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Measure the memory used by 100,000 live pending-state records, comparing the
+__slots__ record types with the dicts, tuples and closures they replaced.
+"""
+import tracemalloc
+
+from cogs.secrets import SecretEntry
+from utils.discord import FieldChunk, PendingPrompt
+
+
+ENTRIES = 100000
+
+
+def message_check(msg):
+    return True
+
+
+def reaction_check(payload):
+    return True
+
+
+def closure_prompt(i):
+    # What wait_for_response() used to build: two lambdas closing over the
+    # context, the message, and the caller's checks.
+    ctx, m = object(), object()
+    return (
+        lambda msg: (ctx, message_check, msg),
+        lambda reaction, user: (m, ctx, reaction_check, reaction, user),
+    )
+
+
+def slots_prompt(i):
+    prompt = PendingPrompt(i, i, i, message_check, reaction_check)
+    return prompt.check_message, prompt.check_reaction
+
+
+CASES = (
+    ("field chunk (dict)", lambda i: {'name': 'name', 'value': 'value', 'inline': True, 'continued': False}),
+    ("field chunk (FieldChunk)", lambda i: FieldChunk('name', 'value', True, False)),
+    ("secret entry (tuple)", lambda i: (i, 'secret')),
+    ("secret entry (dict)", lambda i: {'member_id': i, 'secret': 'secret'}),
+    ("secret entry (SecretEntry)", lambda i: SecretEntry(i, 'secret')),
+    ("pending prompt (closures)", closure_prompt),
+    ("pending prompt (PendingPrompt)", slots_prompt),
+)
+
+
+def measure(factory) -> float:
+    """Return the average number of bytes allocated per live entry."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    entries = [factory(i) for i in range(ENTRIES)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # Don't count the list holding the entries.
+    total -= entries.__sizeof__()
+    return total / ENTRIES
+
+
+def main():
+    for name, factory in CASES:
+        print(f"{name:>32}: {measure(factory):6.0f} bytes per entry")
+
+
+if __name__ == '__main__':
+    main()
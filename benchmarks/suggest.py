@@ -0,0 +1,78 @@
+"""Time "did you mean" lookups for typos of command names with the suggestion
+index in utils/suggest.py, compared with scanning every name with
+edit_distance() and with difflib.get_close_matches().
+"""
+import difflib
+import random
+import statistics
+import time
+
+from utils.suggest import MAX_DISTANCE, MAX_SUGGESTIONS, SuggestionIndex, edit_distance
+
+
+NAME_COUNTS = (100, 1000, 5000)
+LOOKUPS = 2000
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def make_names(count: int, rng: random.Random):
+    names = set()
+    while len(names) < count:
+        names.add(''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 12))))
+    return sorted(names)
+
+
+def make_typo(name: str, rng: random.Random) -> str:
+    for _ in range(rng.randint(1, MAX_DISTANCE)):
+        i = rng.randrange(len(name))
+        edit = rng.choice(('insert', 'delete', 'substitute', 'transpose'))
+        if edit == 'insert':
+            name = name[:i] + rng.choice(LETTERS) + name[i:]
+        elif edit == 'delete' and len(name) > 1:
+            name = name[:i] + name[i + 1:]
+        elif edit == 'transpose' and i + 1 < len(name):
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+        else:
+            name = name[:i] + rng.choice(LETTERS) + name[i + 1:]
+    return name
+
+
+def linear_scan(names, word):
+    max_distance = min(MAX_DISTANCE, len(word) // 3)
+    if not max_distance:
+        return []
+    scored = sorted((edit_distance(word, name, max_distance), name) for name in names if name != word)
+    return [name for distance, name in scored[:MAX_SUGGESTIONS] if distance <= max_distance]
+
+
+def time_lookups(lookup, words):
+    times = []
+    for word in words:
+        start = time.perf_counter()
+        lookup(word)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)]
+
+
+def main():
+    rng = random.Random(0)
+    for count in NAME_COUNTS:
+        names = make_names(count, rng)
+        words = [make_typo(rng.choice(names), rng) for _ in range(LOOKUPS)]
+        start = time.perf_counter()
+        index = SuggestionIndex(names)
+        build = time.perf_counter() - start
+        print(f"{count} names (index built in {build * 1e3:.1f} ms):")
+        cases = (
+            ("index", index.lookup),
+            ("linear scan", lambda word: linear_scan(names, word)),
+            ("difflib", lambda word: difflib.get_close_matches(word, names, MAX_SUGGESTIONS)),
+        )
+        for name, lookup in cases:
+            p50, p99 = time_lookups(lookup, words if name == 'index' else words[:LOOKUPS // 10])
+            print(f"{name:>16}: p50 {p50 * 1e6:9.1f} us, p99 {p99 * 1e6:9.1f} us")
+
+
+if __name__ == '__main__':
+    main()
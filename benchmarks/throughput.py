@@ -0,0 +1,152 @@
+"""Replay a synthetic message stream through the real Bot class and cogs.
+
+The bot is connected to FakeGateway/FakeHTTP, so nothing is sent to Discord.
+Results are printed and saved as JSON so that they can be compared between
+versions:
+
+    python -m benchmarks.throughput --output before.json
+    python -m benchmarks.throughput --compare before.json
+"""
+from os import makedirs, path
+import argparse
+import asyncio
+import json
+import random
+import resource
+import time
+
+from benchmarks.fake_discord import FakeGateway, FakeHTTP, drain
+from constants import info
+
+
+RESULTS_DIR = path.join(path.dirname(__file__), 'results')
+
+# (weight, message content) pairs; None means a reaction instead of a message.
+DEFAULT_MIX = (
+    (40, "hello everyone, how's it going?"),
+    (10, "lol"),
+    (10, None),
+    (8, "{prefix}ping"),
+    (8, "{prefix}roll d20 2d6+3 4d8*2-1"),
+    (6, "{prefix}random 100 5"),
+    (6, "{prefix}percent 3"),
+    (4, "{prefix}about"),
+    (4, "{prefix}help"),
+    (4, "{prefix}help roll"),
+)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def make_bot(*, http_latency: float = 0.0, member_count: int = 100):
+    # Imported here so that the event loop exists before the bot is created.
+    from main import Bot
+    bot = Bot(description=info.DESCRIPTION)
+    gateway = FakeGateway(bot, http=FakeHTTP(latency=http_latency), member_count=member_count)
+    await bot.load_all_extensions()
+    return bot, gateway
+
+
+async def replay(gateway: FakeGateway, messages: int, mix=DEFAULT_MIX, *, seed: int = 0, batch: int = 100) -> float:
+    """Send `messages` synthetic events through the gateway and wait for the bot
+    to finish handling them. Returns the elapsed time in seconds.
+    """
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in mix]
+    contents = [content for _, content in mix]
+    prefix = info.COMMAND_PREFIX
+    start = time.perf_counter()
+    last_message_id = None
+    for i in range(messages):
+        content = rng.choices(contents, weights)[0]
+        author = rng.choice(gateway.member_ids)
+        if content is None and last_message_id:
+            gateway.reaction(last_message_id, '\N{THUMBS UP SIGN}', author)
+        else:
+            last_message_id = int(gateway.message((content or "hi").format(prefix=prefix), author)['id'])
+        if i % batch == batch - 1:
+            # Let the bot catch up, as it would between gateway frames.
+            await asyncio.sleep(0)
+    await drain()
+    return time.perf_counter() - start
+
+
+def summarize(bot, gateway, messages: int, elapsed: float) -> dict:
+    stats = bot.stats
+    commands = {
+        name: {
+            'count': metric.count,
+            'errors': metric.errors,
+            'p50_ms': metric.latency.percentile(50) * 1000,
+            'p95_ms': metric.latency.percentile(95) * 1000,
+            'p99_ms': metric.latency.percentile(99) * 1000,
+        } for name, metric in sorted(stats.commands.items())
+    }
+    return {
+        'version': info.VERSION,
+        'messages': messages,
+        'elapsed_s': elapsed,
+        'messages_per_s': messages / elapsed,
+        'commands': commands,
+        'gateway_events': dict(gateway.events),
+        'outbound_requests': dict(gateway.http.requests),
+        'outbound_total': sum(gateway.http.requests.values()),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(old: dict, new: dict) -> None:
+    for key in ('messages_per_s', 'outbound_total', 'peak_rss_mb'):
+        a, b = old.get(key), new.get(key)
+        if a and b:
+            print(f"{key:>16}: {a:10.1f} -> {b:10.1f} ({(b - a) / a:+.1%})")
+    for name, new_metric in new['commands'].items():
+        old_metric = old['commands'].get(name)
+        if old_metric:
+            print(f"{name:>16}: p95 {old_metric['p95_ms']:.2f} ms -> {new_metric['p95_ms']:.2f} ms")
+
+
+async def run(messages: int, http_latency: float) -> dict:
+    bot, gateway = await make_bot(http_latency=http_latency)
+    elapsed = await replay(gateway, messages)
+    return summarize(bot, gateway, messages, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--http-latency', type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument('--output', help="where to save the results (default benchmarks/results/throughput-<version>.json)")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    parser.add_argument('--event-loop', default=info.EVENT_LOOP, help="'asyncio' or 'uvloop' (default from the config)")
+    args = parser.parse_args()
+
+    from main import install_event_loop
+    info.EVENT_LOOP = args.event_loop
+    install_event_loop()
+    results = asyncio.run(run(args.messages, args.http_latency))
+    results['event_loop'] = type(asyncio.get_event_loop_policy()).__module__.split('.')[0]
+    print(f"{results['messages']} events in {results['elapsed_s']:.2f} s "
+          f"({results['messages_per_s']:.0f}/s), {results['outbound_total']} outbound requests, "
+          f"peak RSS {results['peak_rss_mb']:.1f} MB")
+    for name, metric in results['commands'].items():
+        print(f"{name:>16}: {metric['count']:5} calls, p50/p95/p99 "
+              f"{metric['p50_ms']:.2f}/{metric['p95_ms']:.2f}/{metric['p99_ms']:.2f} ms")
+
+    output = args.output or path.join(RESULTS_DIR, f"throughput-{info.VERSION}.json")
+    if path.dirname(output):
+        makedirs(path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent='\t')
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare the timer wheel in utils/timers.py with a task per timeout using
+asyncio.wait_for() (as prompts used before) and with plain loop.call_later()
+handles, at 100,000 pending timeouts.
+
+Each approach schedules TIMEOUTS timeouts spread over a second, then either
+cancels all of them (as when prompts are answered) or lets them all expire,
+and reports the CPU time spent on each phase.
+"""
+import asyncio
+import gc
+import random
+import time
+
+from utils.timers import TimerWheel
+
+
+TIMEOUTS = 100000
+TICK = 0.05
+
+
+async def wait_for_task(future, delay, fired):
+    try:
+        await asyncio.wait_for(future, delay)
+    except asyncio.TimeoutError:
+        fired.append(None)
+
+
+async def bench_wait_for(delays, expire: bool):
+    loop = asyncio.get_event_loop()
+    fired = []
+    start = time.process_time()
+    futures = [loop.create_future() for _ in delays]
+    tasks = [loop.create_task(wait_for_task(f, d, fired)) for f, d in zip(futures, delays)]
+    # Let every task start waiting.
+    await asyncio.sleep(0)
+    scheduled = time.process_time()
+    if not expire:
+        for f in futures:
+            f.set_result(None)
+    await asyncio.wait(tasks)
+    return scheduled - start, time.process_time() - scheduled, len(fired)
+
+
+async def bench_call_later(delays, expire: bool):
+    loop = asyncio.get_event_loop()
+    fired = []
+    start = time.process_time()
+    handles = [loop.call_later(d, fired.append, None) for d in delays]
+    scheduled = time.process_time()
+    if expire:
+        while len(fired) < len(delays):
+            await asyncio.sleep(TICK)
+    else:
+        for handle in handles:
+            handle.cancel()
+        # Let the loop drop the cancelled handles.
+        await asyncio.sleep(0)
+    return scheduled - start, time.process_time() - scheduled, len(fired)
+
+
+async def bench_wheel(delays, expire: bool):
+    wheel = TimerWheel(TICK)
+    fired = []
+    start = time.process_time()
+    timers = [wheel.call_later(d, fired.append, None) for d in delays]
+    scheduled = time.process_time()
+    if expire:
+        while len(wheel):
+            await asyncio.sleep(TICK)
+    else:
+        for timer in timers:
+            timer.cancel()
+        await asyncio.sleep(0)
+    return scheduled - start, time.process_time() - scheduled, len(fired)
+
+
+async def run():
+    rng = random.Random(0)
+    delays = [rng.uniform(0.5, 1.5) for _ in range(TIMEOUTS)]
+    cases = (
+        ("asyncio.wait_for tasks", bench_wait_for),
+        ("loop.call_later", bench_call_later),
+        ("timer wheel", bench_wheel),
+    )
+    for expire in (False, True):
+        print(f"{TIMEOUTS} timeouts, {'all expire' if expire else 'all cancelled'} (CPU time):")
+        for name, bench in cases:
+            gc.collect()
+            schedule, finish, fired = await bench(delays, expire)
+            print(f"{name:>24}: schedule {schedule * 1e3:7.1f} ms, "
+                  f"{'expire' if expire else 'cancel'} {finish * 1e3:7.1f} ms, {fired} fired")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Compare how long it takes to post a 30-page embed with send_split_embed()
+through the channel's webhook (up to 10 embeds per message) and one message
+per page with ctx.send(), as when the bot can't manage webhooks.
+
+Requests go to FakeHTTP with a simulated latency and, unless
+--no-ratelimits is given, rate limits of 5 messages per 5 seconds per channel
+and 5 per 2 seconds per webhook, roughly what Discord allows.
+"""
+import argparse
+import asyncio
+import time
+
+import discord
+
+from benchmarks.fake_discord import FakeGateway, FakeHTTP, GUILD_ID, drain
+from constants import info
+import utils
+
+
+PAGES = 30
+WEBHOOK_EXECUTE = 'POST /webhooks/{webhook_id}/{webhook_token}?wait=true'
+RATELIMITS = {'send_message': (5, 5.0), WEBHOOK_EXECUTE: (5, 2.0)}
+
+
+def big_embed():
+    """Return an embed that split_embed() splits into PAGES pages."""
+    paragraph = "lorem ipsum dolor sit amet " * 37
+    embed = discord.Embed(title="Big output", description="")
+    while len(utils.discord.split_embed(embed)) < PAGES:
+        embed.description += paragraph + "\n\n"
+    return embed
+
+
+async def post(http_latency: float, ratelimits: bool, webhooks: bool):
+    from main import Bot
+    bot = Bot(description=info.DESCRIPTION)
+    http = FakeHTTP(latency=http_latency, ratelimits=RATELIMITS if ratelimits else None)
+    gateway = FakeGateway(bot, http=http)
+    if not webhooks:
+        permissions = discord.Permissions.all()
+        permissions.administrator = permissions.manage_webhooks = False
+        gateway.guild.get_role(GUILD_ID + 1)._permissions = permissions.value
+    info.WEBHOOKS = webhooks
+    utils.discord._WEBHOOKS.clear()
+    message = bot._connection._get_message(int(gateway.message("hi")['id']))
+    ctx = await bot.get_context(message)
+    embed = big_embed()
+    results = []
+    for _ in range(2):
+        http.requests.clear()
+        start = time.perf_counter()
+        messages = await utils.discord.send_split_embed(ctx, embed)
+        results.append((time.perf_counter() - start, len(messages), dict(http.requests)))
+        await drain()
+        if ratelimits:
+            # Start the second run with fresh rate limits.
+            await asyncio.sleep(max(per for _, per in RATELIMITS.values()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--http-latency', type=float, default=0.05, help="simulated REST latency in seconds")
+    parser.add_argument('--no-ratelimits', action='store_true')
+    args = parser.parse_args()
+    for name, webhooks in (("ctx.send()", False), ("webhook", True)):
+        results = asyncio.run(post(args.http_latency, not args.no_ratelimits, webhooks))
+        for run, (elapsed, messages, requests) in zip(("first", "second"), results):
+            print(f"{name:>10} ({run} post): {PAGES} pages in {messages} messages, {elapsed:6.2f} s, "
+                  f"requests: {', '.join(f'{n} {request}' for request, n in sorted(requests.items()))}")
+
+
+if __name__ == '__main__':
+    main()
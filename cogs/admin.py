@@ -1,7 +1,9 @@
+from datetime import datetime
 from discord.ext import commands
-from subprocess import PIPE
+from subprocess import PIPE, STDOUT
 import asyncio
 import discord
+import time
 
 from . import get_extensions
 from constants import colors, strings
@@ -9,6 +11,14 @@ from utils import l
 import utils
 
 
+# Minimum number of seconds between edits while streaming `git pull` output.
+UPDATE_EDIT_INTERVAL = 1
+# Maximum number of seconds to wait for a new instance to start.
+RESTART_TIMEOUT = 120
+# Maximum number of seconds to wait for running commands before restarting.
+DRAIN_TIMEOUT = 30
+
+
 async def reload_extensions(ctx, *extensions):
     if '*' in extensions:
         title = "Reloading all extensions"
@@ -21,29 +31,52 @@ async def reload_extensions(ctx, *extensions):
         title=title
     )
     m = await ctx.send(embed=embed)
-    color = colors.SUCCESS
+    if ctx.bot.cluster:
+        ctx.bot.cluster.broadcast('reload', *extensions)
+    succeeded, description = do_reload_extensions(ctx.bot, *extensions)
+    await ctx.bot.slash_commands.sync()
+    await m.edit(embed=discord.Embed(
+        color=colors.SUCCESS if succeeded else colors.ERROR,
+        title=title.replace("ing", "ed"),
+        description=description
+    ))
+
+
+def format_output(output):
+    """Format command output for an embed description, keeping the end if it is
+    too long.
+    """
+    output = output.replace('```', '` ` `')
+    if len(output) > 1900:
+        output = '\N{HORIZONTAL ELLIPSIS}' + output[-1900:]
+    return f"```\n{output}\n```"
+
+
+def do_reload_extensions(bot, *extensions):
+    """Reload extensions without reporting anything to the user.
+    Returns a tuple (succeeded, description), where succeeded is False if any
+    extension failed to load.
+    """
+    succeeded = True
     description = ''
+    utils.embed_cache.invalidate()
     if '*' in extensions:
         extensions = get_extensions()
     for extension in extensions:
         try:
-            ctx.bot.unload_extension('cogs.' + extension)
+            bot.unload_extension('cogs.' + extension)
         except commands.ExtensionNotLoaded:
             pass
         try:
-            ctx.bot.load_extension('cogs.' + extension)
+            bot.load_extension('cogs.' + extension)
             description += f"Successfully loaded `{extension}`.\n"
         except (commands.ExtensionError, ImportError) as exc:
-            color = colors.ERROR
+            succeeded = False
             description += f"Failed to load `{extension}`.\n"
             if not isinstance(exc, ImportError):
                 raise
     description += "Done."
-    await m.edit(embed=discord.Embed(
-        color=color,
-        title=title.replace("ing", "ed"),
-        description=description
-    ))
+    return succeeded, description
 
 
 class Admin(commands.Cog):
@@ -55,6 +88,15 @@ class Admin(commands.Cog):
     async def cog_check(self, ctx):
         return await utils.discord.is_admin(ctx)
 
+    @commands.Cog.listener()
+    async def on_cluster_message(self, action, *args):
+        if action == 'shutdown':
+            l.info("Shutting down at the request of another cluster...")
+            await self.bot.logout()
+        elif action == 'reload':
+            l.info(f"Reloading {utils.human_list(args)} at the request of another cluster...")
+            do_reload_extensions(self.bot, *args)
+
     @commands.command(aliases=['die', 'quit'])
     async def shutdown(self, ctx):
         """Shut down the bot.
@@ -92,36 +134,135 @@ class Admin(commands.Cog):
         ))
         if response == 'y':
             l.info(f"Shutting down at the command of {utils.discord.fake_mention(ctx.author)}...")
+            if self.bot.cluster:
+                self.bot.cluster.broadcast('shutdown')
             await self.bot.logout()
 
     @commands.command()
-    async def update(self, ctx):
-        """Run `git pull` to update the bot."""
-        subproc = await asyncio.create_subprocess_exec('git', 'pull', stdout=PIPE)
+    async def update(self, ctx, mode: str = 'reload'):
+        """Run `git pull` to update the bot.
+        Afterwards, all extensions are reloaded. Use `update restart` to restart the bot instead (see `restart`), which is necessary for changes outside of extensions.
+        """
         embed = discord.Embed(
             color=colors.INFO,
-            title="Running `git pull`"
+            title="Running `git pull`",
         )
         m = await ctx.send(embed=embed)
+        subproc = await asyncio.create_subprocess_exec('git', 'pull', stdout=PIPE, stderr=STDOUT)
+        output = ''
+        last_edit = time.monotonic()
+        # Read the output as it comes rather than waiting for the process to
+        # exit, which could deadlock once the pipe fills up.
+        while True:
+            line = await subproc.stdout.readline()
+            if not line:
+                break
+            output += line.decode('utf-8', 'replace')
+            if time.monotonic() - last_edit >= UPDATE_EDIT_INTERVAL:
+                embed.description = format_output(output)
+                await m.edit(embed=embed)
+                last_edit = time.monotonic()
         returncode = await subproc.wait()
         embed.color = colors.ERROR if returncode else colors.SUCCESS
-        stdout, stderr = await subproc.communicate()
-        if stdout:
-            embed.add_field(
-                name="Stdout",
-                value=f"```\n{stdout.decode('utf-8')}\n```",
-                inline=False,
-            )
-        if stderr:
-            embed.add_field(
-                name="Stderr",
-                value=f"```\n{stderr.decode('utf-8')}\n```",
-                inline=False,
-            )
-        if not (stdout or stderr):
-            embed.description = "`git pull` completed."
+        embed.description = format_output(output) if output else "`git pull` completed."
         await m.edit(embed=embed)
-        await utils.discord.invoke_command(ctx, 'reload *')
+        if returncode:
+            return
+        if mode == 'restart':
+            await self.restart_(ctx)
+        else:
+            await utils.discord.invoke_command(ctx, 'reload *')
+
+    @commands.command()
+    async def restart(self, ctx):
+        """Restart the bot without interrupting any commands.
+        A new instance of the bot is started and loads everything in the background. Once it is ready, this one stops accepting commands, waits for the commands that are running to finish, saves all data, and hands over to the new instance.
+        This command is automatically run by `update restart`.
+        """
+        await self.restart_(ctx)
+
+    async def restart_(self, ctx):
+        embed = discord.Embed(color=colors.INFO, title="Restarting\N{HORIZONTAL ELLIPSIS}")
+        if self.bot.cluster:
+            embed.color = colors.ERROR
+            embed.description = "Rolling restarts are not supported when running multiple clusters."
+            await ctx.send(embed=embed)
+            return
+        embed.description = "Starting a new instance\N{HORIZONTAL ELLIPSIS}"
+        m = await ctx.send(embed=embed)
+        replacement = utils.handover.spawn_replacement()
+        if not await replacement.wait_ready(RESTART_TIMEOUT):
+            replacement.abort()
+            embed.color = colors.ERROR
+            embed.description = "The new instance failed to start. Check the logs for details."
+            await m.edit(embed=embed)
+            return
+        embed.description = "Waiting for running commands to finish\N{HORIZONTAL ELLIPSIS}"
+        await m.edit(embed=embed)
+        l.info(f"Restarting at the command of {utils.discord.fake_mention(ctx.author)}...")
+        unfinished = await self.bot.drain(timeout=DRAIN_TIMEOUT, exclude=[ctx])
+        if unfinished:
+            l.warning(f"Restarting with {utils.human_count(unfinished, 'command', 'commands')} still running")
+        await utils.database.save_all_async()
+        embed.color = colors.SUCCESS
+        embed.description = "Handing over to the new instance."
+        await m.edit(embed=embed)
+        self.bot.replacement = replacement
+        await self.bot.logout()
+
+    @commands.command()
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """Display command latency and error statistics."""
+        stats = self.bot.stats
+        embed = discord.Embed(
+            color=colors.INFO,
+            title="Command statistics",
+            description=f"Since {datetime.utcfromtimestamp(stats.started).strftime(strings.TIME_FORMAT)}",
+        )
+        for title, metrics in (("Cogs", stats.cogs), ("Commands", stats.commands), ("Outbound messages", {'send': stats.sends})):
+            lines = []
+            for name, metric in sorted(metrics.items(), key=lambda item: -item[1].count):
+                percentiles = '/'.join(f"{metric.latency.percentile(p) * 1000:.1f}" for p in (50, 95, 99))
+                lines.append(
+                    f"`{name}` \N{EM DASH} {utils.human_count(metric.count, 'call', 'calls')}, "
+                    f"{metric.error_rate:.1%} errors, p50/p95/p99 {percentiles} ms"
+                )
+            embed.add_field(name=title, value="\n".join(lines) or strings.EMPTY_LIST, inline=False)
+        lines = []
+        for kind, pool in self.bot.executor.report().items():
+            lines.append(
+                f"`{kind}` \N{EM DASH} {pool['busy']}/{pool['workers']} busy ({pool['utilisation']:.0%}), "
+                f"{pool['queued']} queued, {pool['completed']} completed, {pool['failed']} failed, "
+                f"{pool['timeouts']} timed out"
+            )
+        embed.add_field(name="Workers", value="\n".join(lines), inline=False)
+        await utils.discord.send_split_embed(ctx, embed)
+
+    @commands.command()
+    async def lag(self, ctx):
+        """Display event loop lag and recent stalls."""
+        watchdog = self.bot.watchdog
+        embed = discord.Embed(
+            color=colors.INFO,
+            title="Event loop lag",
+            description=(
+                f"p50/p99 lag: {watchdog.lag.percentile(50) * 1000:.1f}/{watchdog.lag.percentile(99) * 1000:.1f} ms\n"
+                f"Max lag: {watchdog.max_lag * 1000:.1f} ms\n"
+                f"Heartbeat latency: {self.bot.latency * 1000:.0f} ms"
+            ),
+        )
+        if not watchdog.running:
+            embed.description += "\nThe watchdog is not running."
+        for stall in reversed(watchdog.stalls):
+            value = f"Heartbeat latency: {stall.latency_before * 1000:.0f} ms"
+            if stall.latency_after is not None:
+                value += f" \N{RIGHTWARDS ARROW} {stall.latency_after * 1000:.0f} ms"
+            last_frame = stall.stack.strip().splitlines()[-2:]
+            if last_frame:
+                value += "\n```\n" + "\n".join(last_frame).replace('```', '` ` `') + "\n```"
+            embed.add_field(name=str(stall), value=value, inline=False)
+        await utils.discord.send_split_embed(ctx, embed)
 
     @commands.command(aliases=['r'])
     async def reload(self, ctx, *, extensions: str = '*'):
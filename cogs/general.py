@@ -3,6 +3,7 @@ import discord
 
 from utils import l
 from utils.discord import invoke_command
+import utils
 from constants import colors, info, strings
 
 
@@ -33,6 +34,21 @@ def get_command_signature(command):
     return result
 
 
+@utils.embed_cache.template('about')
+def about_embed():
+    return discord.Embed(
+        color=colors.INFO,
+        title=f"About {info.NAME}",
+        description=info.ABOUT_TEXT,
+    ).add_field(
+        name="Author",
+        value=f"[{info.AUTHOR}]({info.AUTHOR_LINK})",
+    ).add_field(
+        name="GitHub repository",
+        value=info.GITHUB_REPO_LINK,
+    ).set_footer(text=f"{info.NAME} v{info.VERSION}")
+
+
 class General(commands.Cog):
     """General-purpose commands."""
 
@@ -56,10 +72,14 @@ class General(commands.Cog):
         if command_name:
             command = self.bot.get_command(command_name)
             if command is None:
+                description = f"Could not find command `{command_name}`."
+                suggestions = utils.suggest.suggest(self.bot, command_name)
+                if suggestions:
+                    description += f" {utils.suggest.did_you_mean(ctx.prefix, suggestions)}"
                 await ctx.send(embed=discord.Embed(
                     color=colors.ERROR,
                     title="Command help",
-                    description=f"Could not find command `{command_name}`.",
+                    description=description,
                 ))
             elif await command.can_run(ctx):
                 embed = discord.Embed(
@@ -144,25 +164,12 @@ class General(commands.Cog):
                     else:
                         name = cog_name
                     embed.add_field(name=name, value="\n".join(lines), inline=False)
-            await ctx.send(embed=embed)
+            await utils.discord.paginate_embed(ctx, embed)
 
     @commands.command(aliases=['i', 'info'])
     async def about(self, ctx):
         """Display information about the bot."""
-        await ctx.send(
-            embed=discord.Embed(
-                color=colors.INFO,
-                title=f"About {info.NAME}",
-                description=info.ABOUT_TEXT,
-                footer_text=f"{info.NAME} v{info.VERSION}",
-            ).add_field(
-                name="Author",
-                value=f"[{info.AUTHOR}]({info.AUTHOR_LINK})",
-            ).add_field(
-                name="GitHub repository",
-                value=info.GITHUB_REPO_LINK,
-            ).set_footer(text=f"{info.NAME} v{info.VERSION}")
-        )
+        await ctx.send(embed=utils.embed_cache.get('about'))
 
     @commands.command('confirm', aliases=['y', 'yes'])
     async def confirm(self, ctx):
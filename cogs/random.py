@@ -1,5 +1,6 @@
 from discord.ext import commands
 from typing import Optional
+import asyncio
 import random
 import re
 
@@ -11,6 +12,73 @@ import utils
 MAX_RAND = 50
 
 
+DICE_TERM_PATTERN = re.compile(r'(?P<rolls>\d*)d(?P<faces>\d+)(\*(?P<multiplier>\d+))?')
+MOD_TERM_PATTERN = re.compile(r'\d+')
+
+# Dice expressions that roll more than this many dice in total are evaluated in
+# the process pool rather than on the event loop.
+OFFLOAD_ROLLS = 10000
+# Dice expressions that roll more than this many dice in total are rejected
+# without being evaluated. This takes about half a second.
+MAX_ROLLS = 1000000
+
+
+def count_rolls(dice_expressions: str) -> int:
+    """Return the number of dice rolled by a string of dice expressions, or
+    MAX_ROLLS + 1 if that is more than MAX_ROLLS.
+    """
+    total = 0
+    for m in DICE_TERM_PATTERN.finditer(dice_expressions):
+        rolls = (m['rolls'] or '1').lstrip('0') or '0'
+        # Don't parse huge numbers.
+        if len(rolls) > len(str(MAX_ROLLS)):
+            return MAX_ROLLS + 1
+        total += int(rolls)
+    return min(total, MAX_ROLLS + 1)
+
+
+@utils.executor.cpu_bound(timeout=5)
+def roll_dice(dice_expressions: str) -> str:
+    """Evaluate a string of dice expressions (see `Random.roll`) and return a
+    message describing the results.
+    """
+    message = ''
+    for dice_expression in dice_expressions.split():
+        remaining = dice_expression
+        first = True
+        total = 0
+        while remaining:
+            multiplier = 1
+            if remaining[0] in '+-':
+                if remaining[0] == '-':
+                    multiplier = -1
+                remaining = remaining[1:]
+            elif not first:
+                raise commands.UserInputError(f"Missing delimiter before `{remaining}`")
+            first = False
+            dice_match = DICE_TERM_PATTERN.match(remaining)
+            mod_match = MOD_TERM_PATTERN.match(remaining)
+            if dice_match:
+                rolls = int(dice_match['rolls'] or '1')
+                if rolls < 1:
+                    raise commands.UserInputError(f"Invalid roll count: `{dice_match['rolls']}` at start of `{remaining}`")
+                faces = int(dice_match['faces'] or '1')
+                if faces < 2:
+                    raise commands.UserInputError(f"Invalid face count: `{dice_match['faces']}` at start of `{remaining}`")
+                multiplier *= int(dice_match['multiplier'] or '1')
+                total += sum(random.randint(1, faces) for _ in range(rolls)) * multiplier
+                remaining = remaining[dice_match.end():]
+            elif mod_match:
+                total += int(mod_match.group()) * multiplier
+                remaining = remaining[mod_match.end():]
+            else:
+                raise commands.UserInputError(f"Cannot match dice term at start of `{remaining}`")
+        message += f"`{dice_expression}` → {total}\n"
+    if message.count('\n') > 1:
+        message = "Rolls:\n" + message
+    return message
+
+
 class Random(commands.Cog):
     """Commands for generating random numbers."""
 
@@ -33,9 +101,9 @@ class Random(commands.Cog):
                 if times > MAX_RAND:
                     await self.too_much(ctx, times)
                     return
-                await ctx.send(utils.human_list(
+                await ctx.send(utils.human_list([
                     f"{random.randint(1, limit)}" for _ in range(times)
-                ))
+                ]))
             else:
                 await invoke_command_help(ctx)
 
@@ -53,18 +121,15 @@ class Random(commands.Cog):
             return
         # Use random.uniform() instead of random.random() so that 100% is
         # (hopefully) included in the distribution.
-        await ctx.send(utils.human_list(
+        await ctx.send(utils.human_list([
             f"{random.uniform(0, 100):.2f}%" for _ in range(times)
-        ))
+        ]))
 
     @commands.command('percent', aliases=['%'])
     async def random_percent2(self, ctx, times: Optional[int] = 1):
         """Generate a random percentage to two decimal places. See `random percent`."""
         await ctx.invoke(self. random_percent, times)
 
-    dice_term_pattern = re.compile(r'(?P<rolls>\d*)d(?P<faces>\d+)(\*(?P<multiplier>\d+))?')
-    mod_term_pattern = re.compile(r'\d+')
-
     @commands.command('roll', rest_is_raw=True)
     async def roll(self, ctx, *, dice_expressions: str):
         """Roll one or more dice, using [dice notation](https://en.wikipedia.org/wiki/Dice_notation).
@@ -88,40 +153,16 @@ class Random(commands.Cog):
         if not dice_expressions:
             await invoke_command_help(ctx)
             return
-        message = ''
-        for dice_expression in dice_expressions.split():
-            remaining = dice_expression
-            first = True
-            total = 0
-            while remaining:
-                multiplier = 1
-                if remaining[0] in '+-':
-                    if remaining[0] == '-':
-                        multiplier = -1
-                    remaining = remaining[1:]
-                elif not first:
-                    raise commands.UserInputError(f"Missing delimiter before `{remaining}`")
-                first = False
-                dice_match = self.dice_term_pattern.match(remaining)
-                mod_match = self.mod_term_pattern.match(remaining)
-                if dice_match:
-                    rolls = int(dice_match['rolls'] or '1')
-                    if rolls < 1:
-                        raise commands.UserInputError(f"Invalid roll count: `{dice_match['rolls']}` at start of `{remaining}`")
-                    faces = int(dice_match['faces'] or '1')
-                    if faces < 2:
-                        raise commands.UserInputError(f"Invalid face count: `{dice_match['faces']}` at start of `{remaining}`")
-                    multiplier *= int(dice_match['multiplier'] or '1')
-                    total += sum(random.randint(1, faces) for _ in range(rolls)) * multiplier
-                    remaining = remaining[dice_match.end():]
-                elif mod_match:
-                    total += int(mod_match.group()) * multiplier
-                    remaining = remaining[mod_match.end():]
-                else:
-                    raise commands.UserInputError(f"Cannot match dice term at start of `{remaining}`")
-            message += f"`{dice_expression}` → {total}\n"
-        if message.count('\n') > 1:
-            message = "Rolls:\n" + message
+        rolls = count_rolls(dice_expressions)
+        if rolls > MAX_ROLLS:
+            raise commands.UserInputError(f"That's too many dice to roll; {MAX_ROLLS} is my limit")
+        try:
+            if rolls > OFFLOAD_ROLLS:
+                message = await roll_dice(dice_expressions)
+            else:
+                message = roll_dice.__wrapped__(dice_expressions)
+        except asyncio.TimeoutError:
+            raise commands.UserInputError("That's too many dice to roll")
         await ctx.send(message)
 
 
@@ -18,7 +18,14 @@ class Tests(commands.Cog):
 
     @test_group.command('embed_split')
     async def test_embed_split(self, ctx):
-        embed = discord.Embed(
+        await utils.discord.send_split_embed(ctx, self.make_big_embed(ctx))
+
+    @test_group.command('paginate')
+    async def test_paginate(self, ctx):
+        await utils.discord.paginate_embed(ctx, self.make_big_embed(ctx))
+
+    def make_big_embed(self, ctx):
+        return discord.Embed(
             title="Every single natural number (1-999)",
             description=', '.join(map(str, range(1, 1000))),
             timestamp=datetime.fromtimestamp(utils.now()),
@@ -31,7 +38,6 @@ class Tests(commands.Cog):
         ).set_footer(
             **utils.discord.embed_happened_footer("Tested", ctx.author)
         )
-        await utils.discord.send_split_embed(ctx, embed)
 
 
 def setup(bot):
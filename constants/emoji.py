@@ -3,3 +3,11 @@ CANCEL = '\N{NO ENTRY SIGN}'
 
 SUCCESS = '\N{THUMBS UP SIGN}'
 FAILURE = '\N{THUMBS DOWN SIGN}'
+
+REVEAL = '\N{EYE}'
+
+FIRST_PAGE = '\N{BLACK LEFT-POINTING DOUBLE TRIANGLE}'
+PREVIOUS_PAGE = '\N{BLACK LEFT-POINTING TRIANGLE}'
+NEXT_PAGE = '\N{BLACK RIGHT-POINTING TRIANGLE}'
+LAST_PAGE = '\N{BLACK RIGHT-POINTING DOUBLE TRIANGLE}'
+STOP = '\N{BLACK SQUARE FOR STOP}'
@@ -7,6 +7,37 @@ DAEMON = CONFIG.get('daemon', False)
 DEV = CONFIG.get('dev', False)
 TOKEN = CONFIG.get('token')
 COMMAND_PREFIX = CONFIG.get('prefix', '!')
+DISABLED_EXTENSIONS = CONFIG.get('disabled_extensions', [])
+
+# DEV, COMMAND_PREFIX, DISABLED_EXTENSIONS, LOG_LEVEL and RATELIMITS are
+# updated when the config file changes (see utils.live_config), so always read
+# them from this module rather than copying them.
+
+LOG_LEVEL = CONFIG.get('log_level', 'INFO')
+LOG_JSON = CONFIG.get('log_json', False)
+LOG_SAMPLE_RATE = CONFIG.get('log_sample_rate', 1)
+
+METRICS_PORT = CONFIG.get('metrics_port')
+WATCHDOG_THRESHOLD = CONFIG.get('watchdog_threshold', 0.25)
+
+EVENT_LOOP = CONFIG.get('event_loop', 'asyncio')
+
+WORKER_THREADS = CONFIG.get('worker_threads')
+WORKER_PROCESSES = CONFIG.get('worker_processes')
+TIMER_TICK = CONFIG.get('timer_tick', 0.5)
+
+MEMORY_PROFILE = CONFIG.get('memory_profile')
+
+RATELIMITS = CONFIG.get('ratelimits', {})
+
+RESUME_SESSIONS = CONFIG.get('resume_sessions', False)
+
+SLASH_COMMAND_GUILDS = CONFIG.get('slash_command_guilds', [])
+
+WEBHOOKS = CONFIG.get('webhooks', False)
+
+CLUSTERS = CONFIG.get('clusters', 1)
+SHARD_COUNT = CONFIG.get('shard_count')
 
 GITHUB_EMAIL = CONFIG.get('github_email')
 GITHUB_REPO = CONFIG.get('github_repo')
@@ -1,5 +1,7 @@
-!/usr/bin/env python3
+#!/usr/bin/env python3
 
+import asyncio
+import atexit
 import logging
 
 try:
@@ -12,32 +14,67 @@ except ImportError:
 from cogs import get_extensions
 from constants import colors, info
 from utils import l, LOG_SEP
+from utils.log import setup_logging
 import utils
 
 
 LOG_LEVEL_API = logging.WARNING
-LOG_LEVEL_BOT = logging.INFO
-LOG_FMT = "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
 
 
-if info.DAEMON:
-    logging.basicConfig(format=LOG_FMT, filename='bot.log')
-else:
-    logging.basicConfig(format=LOG_FMT)
-logging.getLogger('discord').setLevel(LOG_LEVEL_API)
-l.setLevel(LOG_LEVEL_BOT)
+def init_logging(log_filename='bot.log'):
+    log_listener = setup_logging(
+        filename=log_filename if info.DAEMON else None,
+        json_format=info.LOG_JSON,
+        sample_rate=info.LOG_SAMPLE_RATE,
+    )
+    atexit.register(log_listener.stop)
+    logging.getLogger('discord').setLevel(LOG_LEVEL_API)
+    l.setLevel(info.LOG_LEVEL)
+
+
+@utils.embed_cache.template('mention_reply')
+def mention_reply_embed(prefix, mention):
+    description = f"Hi! I'm {mention}, {info.DESCRIPTION[0].lower()}{info.DESCRIPTION[1:]}."
+    description += f" Type `{prefix}help` to get general bot help, `{prefix}help <command>` to get help for a specific command, and `!about` for general info about me."
+    return discord.Embed(
+        color=colors.INFO,
+        description=description,
+    )
 
 
 class Bot(commands.Bot):
     def __init__(self, **kwargs):
+        self.cluster = kwargs.pop('cluster', None)
         super().__init__(
             command_prefix=info.COMMAND_PREFIX,
             case_insensitive=True,
             description=kwargs.pop('description'),
-            status=discord.Status.dnd
+            status=discord.Status.dnd,
+            **kwargs
         )
         self.app_info = None
         self.cogs_loaded = set()
+        self.stats = utils.stats.Stats()
+        self.metrics_server = None
+        self.watchdog = utils.watchdog.Watchdog(self, threshold=info.WATCHDOG_THRESHOLD)
+        self.executor = utils.executor.configure(threads=info.WORKER_THREADS, processes=info.WORKER_PROCESSES)
+        utils.timers.configure(tick=info.TIMER_TICK)
+        self.draining = False
+        self.replacement = None
+        self.ratelimiter = utils.ratelimit.RateLimiter(info.RATELIMITS)
+        self.slash_commands = utils.interactions.SlashCommands(self, info.SLASH_COMMAND_GUILDS)
+        # call_once keeps `help` (which runs every command's checks) from
+        # using up tokens.
+        self.add_check(self.check_not_draining, call_once=True)
+        self.add_check(self.ratelimiter.check, call_once=True)
+        self.before_invoke(self.before_command)
+        self.after_invoke(self.after_command)
+        self.live_config = utils.live_config.LiveConfig(info.CONFIG)
+        self.live_config.subscribe('prefix', self.set_prefix)
+        self.live_config.subscribe('log_level', l.setLevel)
+        self.live_config.subscribe('ratelimits', self.ratelimiter.configure)
+        self.live_config.subscribe('dev', self.update_extensions)
+        self.live_config.subscribe('disabled_extensions', self.update_extensions)
 
     async def ready_status(self):
         await self.change_presence(
@@ -48,20 +85,56 @@ class Bot(commands.Bot):
     async def on_connect(self):
         l.info(f"Connected as {self.user}")
         await self.change_presence(status=discord.Status.idle)
+        if info.METRICS_PORT and self.metrics_server is None:
+            self.metrics_server = await utils.stats.start_metrics_server(self.stats, info.METRICS_PORT)
+        if info.WATCHDOG_THRESHOLD:
+            self.watchdog.start()
+        if self.cluster:
+            self.cluster.start(self)
+        self.live_config.start()
 
     async def on_ready(self):
-        self.app_info = await self.application_info()
-        l.info(LOG_SEP)
-        l.info(f"Logged in as: {self.user.name}")
-        l.info(f"discord.py:   {discord.__version__}")
-        l.info(f"Owner:        {self.app_info.owner}")
-        l.info(LOG_SEP)
-        await self.load_all_extensions()
+        """This event triggers after every full (re)connection, so only do
+        anything expensive the first time.
+        """
+        if self.app_info is None:
+            self.app_info = await self.application_info()
+            self.owner_id = self.app_info.owner.id
+            l.info(LOG_SEP)
+            l.info(f"Logged in as: {self.user.name}")
+            l.info(f"discord.py:   {discord.__version__}")
+            l.info(f"Owner:        {self.app_info.owner}")
+            l.info(LOG_SEP)
+            await self.load_all_extensions()
+            self.loop.create_task(self.warm_up_executor())
+            await self.slash_commands.sync()
+        else:
+            l.info("Reconnected.")
         await self.ready_status()
 
+    async def warm_up_executor(self):
+        # Start the worker processes now rather than during the first command
+        # that needs them.
+        try:
+            await self.executor.warm_up()
+        except Exception as exc:
+            l.warning(f"Failed to start the worker processes: {type(exc).__name__}: {exc}")
+
     async def on_resumed(self):
         l.info("Resumed session.")
-        await self.ready_status()
+        if self.app_info is None:
+            # This process resumed a previous process's session (see
+            # utils.session), so on_ready() never ran.
+            await self.on_ready()
+        else:
+            await self.ready_status()
+
+    async def close(self):
+        if info.RESUME_SESSIONS and not self.cluster and utils.session.save(self):
+            # Discord invalidates the session if the connection is closed
+            # normally (with code 1000).
+            await self.ws.close(code=4000)
+        await super().close()
 
     async def load_all_extensions(self, reload=False):
         """Attempt to load all .py files in cogs/ as cog extensions.
@@ -69,14 +142,12 @@ class Bot(commands.Bot):
         successfully loaded; False = not successfully loaded).
         """
         succeeded = {}
-        disabled_extensions = set()
-        if not info.DEV:
-            disabled_extensions.add('tests')
-        for extension in get_extensions(disabled=disabled_extensions):
+        utils.embed_cache.invalidate()
+        for extension in get_extensions(disabled=self.disabled_extensions()):
             try:
                 if reload or extension not in self.cogs_loaded:
                     self.load_extension(f'cogs.{extension}')
-                    l.info(f"Loaded extension '{extension}'")
+                    l.info(f"Loaded extension '{extension}'", extra={'sample': 'extension_load'})
                     self.cogs_loaded.add(extension)
                     succeeded[extension] = True
             except Exception as exc:
@@ -88,9 +159,38 @@ class Bot(commands.Bot):
             l.info(LOG_SEP)
         return succeeded
 
+    def add_command(self, command):
+        super().add_command(command)
+        utils.suggest.invalidate()
+
+    def remove_command(self, name):
+        utils.suggest.invalidate()
+        return super().remove_command(name)
+
+    def disabled_extensions(self):
+        disabled = set(info.DISABLED_EXTENSIONS)
+        if not info.DEV:
+            disabled.add('tests')
+        return disabled
+
+    def set_prefix(self, prefix):
+        self.command_prefix = prefix
+        utils.embed_cache.invalidate()
+
+    def update_extensions(self, *args):
+        """Unload extensions that have been disabled and load ones that have
+        been enabled since the config was last changed.
+        """
+        for extension in self.cogs_loaded & self.disabled_extensions():
+            self.unload_extension(f'cogs.{extension}')
+            self.cogs_loaded.discard(extension)
+            l.info(f"Unloaded extension '{extension}'")
+        if self.is_ready():
+            self.loop.create_task(self.load_all_extensions())
+
     async def on_guild_join(self, guild):
         """This event triggers when the bot joins a guild."""
-        l.info(f"Joined {guild.name} with {guild.member_count} users!")
+        l.info(f"Joined {guild.name} with {guild.member_count} users!", extra={'sample': 'guild_join', 'guild': guild.id})
 
     async def on_message(self, message):
         """This event triggers on every message received by the bot, including
@@ -98,25 +198,143 @@ class Bot(commands.Bot):
         """
         if message.author.bot:
             return  # Ignore all bots.
+        if message.guild is not None and message.guild.id in self.slash_commands.guild_ids:
+            return  # This guild uses application commands instead.
         if message.content.startswith(self.user.mention):
-            prefix = info.COMMAND_PREFIX
-            description = f"Hi! I'm {self.user.mention}, {info.DESCRIPTION[0].lower()}{info.DESCRIPTION[1:]}."
-            description += f" Type `{prefix}help` to get general bot help, `{prefix}help <command>` to get help for a specific command, and `!about` for general info about me."
-            await message.channel.send(embed=discord.Embed(
-                color=colors.INFO,
-                description=description,
-            ))
+            await message.channel.send(embed=utils.embed_cache.get('mention_reply', info.COMMAND_PREFIX, self.user.mention))
         else:
             await self.process_commands(message)
 
-    async def on_command_error(self, exc, *args, **kwargs):
-        await utils.error_handling.on_command_error(exc, *args, **kwargs)
+    def check_not_draining(self, ctx):
+        if self.draining:
+            raise utils.handover.Restarting()
+        return True
 
+    async def drain(self, *, timeout=30, exclude=()):
+        """Stop accepting commands and wait up to `timeout` seconds for the
+        ones in progress (except for those whose contexts are in `exclude`) to
+        finish. Returns the number of commands still running.
+        """
+        self.draining = True
+        exclude = {id(ctx) for ctx in exclude}
+        deadline = self.loop.time() + timeout
+        while self.loop.time() < deadline:
+            if not self.stats.in_flight.keys() - exclude:
+                break
+            await asyncio.sleep(0.1)
+        return len(self.stats.in_flight.keys() - exclude)
 
-if __name__ == '__main__':
-    bot = Bot(description=info.DESCRIPTION)
+    async def on_cluster_message(self, action, *args):
+        """This event triggers when another cluster broadcasts a message."""
+        if action == 'db_saved' and utils.database.is_loaded(args[0]):
+            utils.get_db(args[0]).merge(**args[1])
+
+    async def before_command(self, ctx):
+        self.ratelimiter.acquire(ctx)
+        self.stats.command_started(ctx)
+
+    async def after_command(self, ctx):
+        self.ratelimiter.release(ctx)
+        self.stats.command_finished(ctx, ctx.command_failed)
+        latency = getattr(ctx, 'latency', None)
+        if latency is not None:
+            l.debug(f"Command {ctx.command.qualified_name!r} finished in {latency * 1e3:.1f} ms",
+                    extra=utils.log.log_context(ctx, sample='command_finished'))
+
+    async def on_command_error(self, ctx, *args, **kwargs):
+        # If the command failed before it was invoked (e.g. a check failed),
+        # after_command() won't have recorded it.
+        self.stats.command_finished(ctx, True)
+        await utils.error_handling.on_command_error(ctx, *args, **kwargs)
+        if isinstance(ctx, utils.interactions.InteractionContext):
+            await ctx.finish()
+
+
+class ShardedBot(Bot, commands.AutoShardedBot):
+    """A Bot that runs some subset of the shards as one of several clusters.
+    See utils.cluster for details.
+    """
+
+
+def install_event_loop():
+    """Use the event loop implementation chosen by the 'event_loop' config
+    option, falling back to the default one if it isn't available. This must be
+    called before the bot is created.
+    """
+    if info.EVENT_LOOP == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            l.warning("uvloop is not installed; using the default event loop")
+            return
+        uvloop.install()
+        l.info("Using uvloop")
+    elif info.EVENT_LOOP != 'asyncio':
+        l.warning(f"Unknown event loop {info.EVENT_LOOP!r}; using the default event loop")
+
+
+def cache_options():
+    """Return keyword arguments for Bot() that limit discord.py's caches
+    according to the 'memory_profile' config option.
+    """
+    profile = info.MEMORY_PROFILE
+    if not profile:
+        return {}
+    options = {
+        'max_messages': profile.get('max_messages', 100),
+        'chunk_guilds_at_startup': False,
+    }
+    if 'intents' in profile:
+        intents = discord.Intents.none()
+        for name in profile['intents']:
+            setattr(intents, name, True)
+        options['intents'] = intents
+    if not profile.get('cache_members', False):
+        options['member_cache_flags'] = discord.MemberCacheFlags.none()
+    return options
+
+
+def run(bot):
+    # Load every database now rather than during the first command that uses
+    # it. A replacement process only gets here once the previous one has saved
+    # its databases (see utils.handover).
+    bot.loop.run_until_complete(utils.database.preload(exclude=[utils.session.SESSION_FILE]))
     try:
         bot.run(info.TOKEN)
     except discord.errors.LoginFailure:
         print(f"Please specify a proper bot token in {info.CONFIG.filepath}.")
         exit(1)
+    if bot.replacement:
+        # Only now that this process has disconnected is it safe for the
+        # replacement to connect.
+        bot.replacement.go()
+
+
+def run_cluster(cluster_id, cluster_count, shard_count, conn):
+    init_logging(f'bot-{cluster_id}.log')
+    install_event_loop()
+    cluster = utils.cluster.Cluster(cluster_id, cluster_count, conn)
+    # Pass the changes to any database that this one saves on to the other
+    # clusters.
+    utils.database.SAVE_HOOKS.append(lambda db_name, changes: cluster.broadcast('db_saved', db_name, changes))
+    run(ShardedBot(
+        description=info.DESCRIPTION,
+        shard_ids=utils.cluster.cluster_shard_ids(cluster_id, cluster_count, shard_count),
+        shard_count=shard_count,
+        cluster=cluster,
+        **cache_options()
+    ))
+
+
+if __name__ == '__main__':
+    if info.CLUSTERS > 1:
+        init_logging('bot-launcher.log')
+        utils.cluster.launch(run_cluster, info.CLUSTERS, info.SHARD_COUNT or info.CLUSTERS)
+    else:
+        init_logging()
+        install_event_loop()
+        bot = Bot(description=info.DESCRIPTION, **cache_options())
+        utils.handover.standby(bot)
+        if info.RESUME_SESSIONS:
+            utils.session.resume_on_connect(bot)
+        run(bot)
@@ -0,0 +1,183 @@
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import unittest
+
+from utils.database import DB, GuildDB, TrackedDict, TrackedList, load_data
+
+
+class TrackedDBTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = DB('test', self.directory.name, 'ok', data={
+            'a': {'points': 1, 'items': [{'name': 'x'}]},
+            'b': [1, 2, 3],
+            'c': 'unchanged',
+        })
+
+    def assert_round_trip(self):
+        """The serialized DB matches a full dump and the saved file."""
+        text = self.db.serialize()
+        self.assertEqual(text, json.dumps(self.db, indent='\t'))
+        self.assertEqual(self.db.dirty, set())
+        self.db.save()
+        self.assertEqual(load_data(self.db.filepath, quiet=True), json.loads(text))
+
+    def test_nested_values_are_tracked(self):
+        self.assertIsInstance(self.db['a'], TrackedDict)
+        self.assertIsInstance(self.db['a']['items'], TrackedList)
+        self.assertIsInstance(self.db['a']['items'][0], TrackedDict)
+        self.assertEqual(self.db.dirty, set())
+
+    def test_nested_mutations(self):
+        self.assert_round_trip()
+        self.db['a']['items'][0]['name'] = 'y'
+        self.assertEqual(self.db.dirty, {'a'})
+        self.assert_round_trip()
+
+        self.db['a']['items'].append({'name': 'z'})
+        self.db['a']['items'][-1]['tags'] = ['new']
+        self.db['a']['items'][-1]['tags'].append('tag')
+        self.db['b'].extend([4, [5]])
+        self.db['b'][-1].append(6)
+        self.assertEqual(self.db.dirty, {'a', 'b'})
+        self.assert_round_trip()
+        self.assertEqual(self.db['a']['items'][-1], {'name': 'z', 'tags': ['new', 'tag']})
+        self.assertEqual(self.db['b'], [1, 2, 3, 4, [5, 6]])
+
+        self.db['a'].pop('points')
+        del self.db['b'][0]
+        self.db['b'].sort(key=str)
+        self.db['d'] = {'nested': {'list': []}}
+        self.db['d']['nested']['list'].insert(0, {'deep': True})
+        self.assertEqual(self.db.dirty, {'a', 'b', 'd'})
+        self.assert_round_trip()
+
+        del self.db['c']
+        self.db['d']['nested'].clear()
+        self.assertEqual(self.db.dirty, {'c', 'd'})
+        self.assert_round_trip()
+        self.assertNotIn('c', load_data(self.db.filepath, quiet=True))
+
+    def test_replaced_values_are_tracked(self):
+        self.db['a']['items'] = [{'name': 'new'}]
+        self.assertIsInstance(self.db['a']['items'][0], TrackedDict)
+        self.assert_round_trip()
+        self.db['a']['items'][0]['name'] = 'newer'
+        self.assertEqual(self.db.dirty, {'a'})
+        self.assert_round_trip()
+        self.assertEqual(load_data(self.db.filepath, quiet=True)['a']['items'], [{'name': 'newer'}])
+
+    def test_stale_write_is_dropped(self):
+        self.db['a']['points'] = 2
+        old = self.db._serialize()
+        self.db['a']['points'] = 3
+        new = self.db._serialize()
+        self.db._save_locked(*new)
+        self.db._save_locked(*old)
+        self.assertEqual(load_data(self.db.filepath, quiet=True)['a']['points'], 3)
+
+    def test_concurrent_saves(self):
+        async def save_twice():
+            self.db['a']['points'] = 2
+            first = asyncio.ensure_future(self.db.save_async())
+            self.db['b'].append(4)
+            await asyncio.gather(first, self.db.save_async())
+
+        asyncio.run(save_twice())
+        saved = load_data(self.db.filepath, quiet=True)
+        self.assertEqual(saved['a']['points'], 2)
+        self.assertEqual(saved['b'], [1, 2, 3, 4])
+        self.assertEqual(self.db.serialize(), json.dumps(saved, indent='\t'))
+
+
+class GuildDBTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = GuildDB('guilds', self.directory.name, 2, 'ok')
+
+    def saved(self, guild_id: int):
+        filepath = os.path.join(self.db.path, f'{guild_id}.json')
+        return load_data(filepath, quiet=True) if os.path.exists(filepath) else None
+
+    def counters(self):
+        return self.db.hits, self.db.misses, self.db.evictions, self.db.writebacks
+
+    def test_counters(self):
+        self.db[1]
+        self.db[1]
+        self.db['2']
+        self.assertEqual(self.counters(), (1, 2, 0, 0))
+        # Evicting clean partitions doesn't write them.
+        self.db[3]
+        self.db[4]
+        self.assertEqual(self.counters(), (1, 4, 2, 0))
+        self.assertEqual(len(self.db), 2)
+        self.assertFalse(self.db.is_loaded(1))
+        self.assertTrue(self.db.is_loaded(4))
+
+    def test_dirty_partition_is_written_back(self):
+        self.db[1]['points'] = 5
+        self.db[2]
+        self.assertIsNone(self.saved(1))
+        self.db[3]
+        self.assertEqual(self.saved(1), {'points': 5})
+        self.assertEqual(self.counters(), (0, 3, 1, 1))
+        gc.collect()
+        self.assertEqual(self.db[1], {'points': 5})
+        self.assertEqual(self.counters(), (0, 4, 2, 1))
+
+    def test_dirty_partition_is_written_back_async(self):
+        async def run():
+            self.db[1]['points'] = 5
+            self.db[2]
+            self.db[3]
+            self.assertIsNotNone(self.db._writer)
+            await self.db._writer
+        asyncio.run(run())
+        self.assertEqual(self.saved(1), {'points': 5})
+        self.assertEqual(self.counters(), (0, 3, 1, 1))
+        self.assertEqual(self.db._unwritten, {})
+
+    def test_referenced_partition_is_reused(self):
+        partition = self.db[1]
+        partition['points'] = 5
+        self.db[2]
+        self.db[3]
+        partition['points'] = 6
+        self.assertIs(self.db[1], partition)
+        self.assertEqual(self.counters(), (0, 4, 2, 1))
+        # Changes made after the write-back are still saved.
+        self.assertEqual(self.saved(1), {'points': 5})
+        self.db.save()
+        self.assertEqual(self.saved(1), {'points': 6})
+        self.assertEqual(partition.dirty, set())
+
+    def test_evicted_referenced_partition_is_saved(self):
+        async def run():
+            partition = self.db[1]
+            self.db[2]
+            self.db[3]
+            partition['points'] = 7
+            self.assertFalse(self.db.is_loaded(1))
+            await self.db.save_async()
+            return partition
+        asyncio.run(run())
+        self.assertEqual(self.saved(1), {'points': 7})
+
+    def test_empty_partition_is_removed(self):
+        self.db[1]['points'] = 5
+        self.db.save()
+        del self.db[1]['points']
+        self.db.save()
+        self.assertIsNone(self.saved(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
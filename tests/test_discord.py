@@ -0,0 +1,117 @@
+import asyncio
+import random
+import unittest
+
+import discord
+from discord.ext import commands
+
+from benchmarks.fake_discord import CHANNEL_ID, GUILD_ID, OWNER_ID, FakeGateway, FakeHTTP, drain
+from constants import info
+import utils
+
+
+class WebhookTest(unittest.TestCase):
+
+    def setUp(self):
+        webhooks = info.WEBHOOKS
+        self.addCleanup(setattr, info, 'WEBHOOKS', webhooks)
+        utils.discord._WEBHOOKS.clear()
+        utils.discord._WEBHOOK_FAILURES.clear()
+
+    def send(self, embed_count: int, channels: int = 1):
+        async def run():
+            bot = commands.Bot(command_prefix='!')
+            http = FakeHTTP(latency=0.01)
+            gateway = FakeGateway(bot, http=http, member_count=2)
+            contexts = []
+            for i in range(channels):
+                guild_id, channel_id = GUILD_ID + 10 * i, CHANNEL_ID + 10 * i
+                if i:
+                    gateway.add_guild(guild_id, [OWNER_ID], channel_ids=(channel_id,))
+                payload = gateway.message("hi", channel_id=channel_id, guild_id=guild_id)
+                message = bot._connection._get_message(int(payload['id']))
+                contexts.append(await bot.get_context(message))
+            await drain()
+            http.requests.clear()
+            embeds = [discord.Embed(description=str(i)) for i in range(embed_count)]
+            # Several commands at once in each channel.
+            results = await asyncio.gather(*(
+                utils.discord.send_embeds(ctx, embeds, typing=False) for ctx in contexts for _ in range(3)
+            ))
+            return [len(messages) for messages in results], dict(http.requests)
+
+        return asyncio.run(run())
+
+    def test_disabled_by_default(self):
+        info.WEBHOOKS = False
+        messages, requests = self.send(12)
+        self.assertEqual(messages, [12] * 3)
+        self.assertNotIn('create_webhook', requests)
+        self.assertNotIn('channel_webhooks', requests)
+
+    def test_one_webhook_per_channel(self):
+        info.WEBHOOKS = True
+        messages, requests = self.send(12, channels=2)
+        self.assertEqual(messages, [2] * 6)
+        self.assertEqual(requests['create_webhook'], 2)
+        self.assertNotIn('send_message', requests)
+        # The locks are dropped once no command is waiting for them.
+        self.assertEqual(len(utils.discord._WEBHOOK_LOCKS), 0)
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    words = []
+    total = 0
+    while total < length:
+        word = 'abcdefghij'[rng.randrange(10)] * rng.choice((1, 4, 8, 30, 1500))
+        words.append(word + rng.choice(('', '', '', '\n', '\n\n')))
+        total += len(words[-1]) + 1
+    return ' '.join(words)[:length]
+
+
+def random_embed(rng: random.Random) -> discord.Embed:
+    embed = discord.Embed(title=random_text(rng, rng.randrange(256)),
+                          description=random_text(rng, rng.choice((0, 100, 2047, 2048, 5000, 20000))),
+                          url='https://example.com', color=rng.randrange(0x1000000))
+    if rng.random() < 0.5:
+        embed.set_footer(text=random_text(rng, rng.randrange(1, 200)), icon_url='https://example.com/icon.png')
+    for _ in range(rng.choice((0, 3, 25, 26, 80))):
+        embed.add_field(name=random_text(rng, rng.randrange(1, 256)),
+                        value=random_text(rng, rng.choice((1, 100, 1023, 1024, 3000))),
+                        inline=rng.random() < 0.5)
+    return embed
+
+
+class SplitEmbedTest(unittest.TestCase):
+
+    def test_pages(self):
+        rng = random.Random(0)
+        for i in range(200):
+            embed = random_embed(rng)
+            pages = utils.discord.split_embed(embed)
+            with self.subTest(i=i, pages=len(pages)):
+                iterated = list(utils.discord.iter_split_embed(embed))
+                unnumbered = utils.discord.split_embed(embed, page_numbers=False)
+                self.assertEqual([page.to_dict() for page in iterated], [page.to_dict() for page in unnumbered])
+                self.assertEqual(len(pages), len(iterated))
+                for page in pages:
+                    self.assertLessEqual(len(page), utils.discord.MAX_EMBED_TOTAL)
+                    self.assertLessEqual(len(page.fields), utils.discord.MAX_EMBED_FIELDS)
+                    self.assertLessEqual(len(page.description or ''), 2048)
+                    for field in page.fields:
+                        self.assertLessEqual(len(field.value), utils.discord.MAX_EMBED_VALUE)
+                # Nothing is lost, apart from whitespace where text was split.
+                text = lambda embeds: ''.join(
+                    (page.description or '') + ''.join(field.value for field in page.fields) for page in embeds
+                ).replace(' ', '').replace('\n', '')
+                self.assertEqual(text(pages), text([embed]))
+
+    def test_iter_split_embed_is_lazy(self):
+        embed = discord.Embed(description="word " * 10000)
+        pages = utils.discord.iter_split_embed(embed)
+        self.assertLessEqual(len(next(pages).description), 2048)
+        self.assertGreater(len(list(pages)), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
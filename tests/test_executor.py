@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import unittest
+
+from utils.executor import Executor
+
+
+class ExecutorTest(unittest.TestCase):
+
+    def test_report_counts_outcomes(self):
+        executor = Executor(threads=2, processes=1)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        async def run():
+            self.assertEqual(await executor.run(sum, [1, 2]), 3)
+            with self.assertRaises(ZeroDivisionError):
+                await executor.run(divmod, 1, 0)
+            with self.assertRaises(asyncio.TimeoutError):
+                await executor.run(release.wait, timeout=0.01)
+
+        asyncio.run(run())
+        report = executor.report()['thread']
+        self.assertEqual((report['completed'], report['failed'], report['timeouts']), (1, 1, 1))
+        # The call that timed out may still be running, but nothing waits for it.
+        self.assertEqual(report['busy'], 0)
+        self.assertEqual(executor.report()['process']['completed'], 0)
+        # The process pool isn't started by the thread pool or the report.
+        self.assertIsNone(executor.process_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+
+import discord
+from discord.ext import commands
+
+from benchmarks.fake_discord import GUILD_ID, OWNER_ID, FakeGateway, FakeHTTP, drain
+from utils.interactions import BOOLEAN, CHANNEL, INTEGER, STRING, SUB_COMMAND, USER, SlashCommands, invocation
+
+
+class RecordingHTTP(FakeHTTP):
+
+    def __init__(self):
+        super().__init__()
+        self.payloads = []
+
+    async def request(self, route, **kwargs):
+        self.payloads.append((f'{route.method} {route.path}', kwargs.get('json')))
+        return await super().request(route, **kwargs)
+
+
+class Commands(commands.Cog):
+
+    def __init__(self):
+        self.calls = []
+
+    @commands.command()
+    async def roll(self, ctx, dice: str = '1d6', times: int = 1, loud: bool = False):
+        self.calls.append(('roll', dice, times, loud))
+
+    @commands.command()
+    async def say(self, ctx, member: discord.Member, *, text: str):
+        self.calls.append(('say', member.id, text))
+
+    @commands.group()
+    async def config(self, ctx):
+        pass
+
+    @config.command(name='set')
+    async def config_set(self, ctx, key: str, value: str = ''):
+        self.calls.append(('config set', key, value))
+
+    @commands.command()
+    async def reply(self, ctx, kind: str):
+        if kind == 'none':
+            await ctx.send("<@1>", allowed_mentions=discord.AllowedMentions.none())
+        elif kind == 'tts':
+            await ctx.send("hello", tts=True)
+        else:
+            await ctx.send("<@1>")
+
+
+def option(name, value, type=STRING):
+    return {'name': name, 'type': type, 'value': value}
+
+
+class InvocationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.bot = commands.Bot(command_prefix='!', loop=self.loop, intents=discord.Intents.all())
+        self.cog = Commands()
+        self.bot.add_cog(self.cog)
+
+    def invocation(self, name, *options):
+        return invocation(self.bot, {'name': name, 'options': list(options)})
+
+    def invoke(self, name, *options, allowed_mentions=None):
+        """Run a command through an interaction, returning the requests to
+        the interaction's webhook.
+        """
+        async def run():
+            self.bot._connection.allowed_mentions = allowed_mentions
+            http = RecordingHTTP()
+            gateway = FakeGateway(self.bot, http=http, member_count=2)
+            SlashCommands(self.bot, [GUILD_ID])
+            gateway.interaction(name, options)
+            await drain()
+            return http
+
+        return self.loop.run_until_complete(run())
+
+    def test_skipped_defaults(self):
+        self.assertEqual(self.invocation('roll'), 'roll')
+        self.assertEqual(self.invocation('roll', option('times', 3, INTEGER)), 'roll 1d6 3')
+        self.assertEqual(self.invocation('roll', option('loud', True, BOOLEAN)), 'roll 1d6 1 true')
+        self.invoke('roll', option('loud', True, BOOLEAN))
+        self.assertEqual(self.cog.calls, [('roll', '1d6', 1, True)])
+
+    def test_keyword_only(self):
+        text = 'hello  "world" \\ x'
+        member = option('member', str(OWNER_ID), USER)
+        self.assertEqual(self.invocation('say', member, option('text', text)), f'say <@{OWNER_ID}> {text}')
+        self.invoke('say', member, option('text', text))
+        self.assertEqual(self.cog.calls, [('say', OWNER_ID, text)])
+
+    def test_quoting(self):
+        for value in ('plain', 'two words', 'say "hi"', 'back\\slash "quote"', 'back\\', 'escaped \\"', '', '"',
+                      'tab\there'):
+            with self.subTest(value=value):
+                self.cog.calls.clear()
+                self.invoke('roll', option('dice', value), option('times', 2, INTEGER))
+                self.assertEqual(self.cog.calls, [('roll', value, 2, False)])
+
+    def test_mentions(self):
+        self.assertEqual(self.invocation('say', option('member', '5', USER), option('text', 'x')), 'say <@5> x')
+        self.assertEqual(invocation(self.bot, {'name': 'say', 'options': [option('member', '7', CHANNEL)]}),
+                         'say <#7>')
+
+    def test_subcommand(self):
+        options = {'name': 'set', 'type': SUB_COMMAND, 'options': [option('key', 'prefix'), option('value', 'a b')]}
+        self.assertEqual(self.invocation('config', options), 'config set prefix "a b"')
+        self.invoke('config', options)
+        self.assertEqual(self.cog.calls, [('config set', 'prefix', 'a b')])
+        self.assertEqual(self.invocation('config', dict(options, options=[option('key', 'prefix')])),
+                         'config set prefix')
+        # Unknown commands and subcommands are passed on for the bot to report.
+        self.assertEqual(self.invocation('config', dict(options, name='unset')), 'config unset')
+        self.assertEqual(self.invocation('missing', option('x', 'y')), 'missing')
+
+    def webhook_payloads(self, http):
+        return [payload for request, payload in http.payloads if request.startswith('PATCH /webhooks/')]
+
+    def test_allowed_mentions(self):
+        http = self.invoke('reply', option('kind', 'none'))
+        self.assertEqual(self.webhook_payloads(http)[0]['allowed_mentions'], {'parse': []})
+        # The bot's default allowed mentions apply, merged with the message's.
+        default = discord.AllowedMentions(everyone=False, users=True, roles=False)
+        http = self.invoke('reply', option('kind', 'default'), allowed_mentions=default)
+        self.assertEqual(self.webhook_payloads(http)[0]['allowed_mentions'], default.to_dict())
+        http = self.invoke('reply', option('kind', 'none'), allowed_mentions=default)
+        self.assertEqual(self.webhook_payloads(http)[0]['allowed_mentions'], {'parse': []})
+        http = self.invoke('reply', option('kind', 'default'))
+        self.assertNotIn('allowed_mentions', self.webhook_payloads(http)[0])
+
+    def test_tts_is_sent_to_the_channel(self):
+        http = self.invoke('reply', option('kind', 'tts'))
+        self.assertEqual(http.requests['send_message'], 1)
+        self.assertEqual(self.webhook_payloads(http), [])
+        # The deferred response is deleted instead.
+        self.assertIn('DELETE /webhooks/{application_id}/{interaction_token}/messages/@original',
+                      [request for request, _ in http.payloads])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+
+from constants import info
+from utils.database import DB
+from utils.live_config import SETTINGS, LiveConfig
+
+
+class LiveConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        saved = {attr: getattr(info, attr) for attr, _, _ in SETTINGS.values()}
+        self.addCleanup(lambda: [setattr(info, attr, value) for attr, value in saved.items()])
+        for key, (attr, default, _) in SETTINGS.items():
+            setattr(info, attr, default)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config = {'token': 'abc', 'prefix': '!', 'ratelimits': {'roll': {'rate': 5, 'per': 10}}}
+        info.RATELIMITS = self.config['ratelimits']
+        self.db = DB('config', directory.name, 'ok', data=self.config)
+        self.live_config = LiveConfig(self.db)
+        self.changes = []
+        for key in SETTINGS:
+            self.live_config.subscribe(key, lambda value, key=key: self.changes.append((key, value)))
+
+    def assert_unchanged(self):
+        self.assertEqual(dict(self.db), self.config)
+        self.assertEqual(info.COMMAND_PREFIX, '!')
+        self.assertEqual(info.RATELIMITS, {'roll': {'rate': 5, 'per': 10}})
+        self.assertEqual(self.changes, [])
+
+    def test_invalid_edits_are_ignored(self):
+        for ratelimits in ([], [{'rate': 5}], {'roll': []}, {'roll': {'rate': 0}}, {'roll': {'rate': 5, 'per': '10'}},
+                           {'roll': {'rate': 5, 'burst': 2}}, {'roll': {'scope': 'server'}}):
+            with self.subTest(ratelimits=ratelimits):
+                self.assertFalse(self.live_config.apply(dict(self.config, prefix='?', ratelimits=ratelimits)))
+                self.assert_unchanged()
+        self.assertFalse(self.live_config.apply(dict(self.config, prefix='  ')))
+        self.assert_unchanged()
+
+    def test_valid_edit_is_applied(self):
+        ratelimits = {'roll': {'rate': 1, 'per': 60}}
+        self.assertTrue(self.live_config.apply(dict(self.config, prefix='?', ratelimits=ratelimits)))
+        self.assertEqual(info.COMMAND_PREFIX, '?')
+        self.assertEqual(info.RATELIMITS, ratelimits)
+        self.assertEqual(self.db['prefix'], '?')
+        self.assertEqual(sorted(self.changes), [('prefix', '?'), ('ratelimits', ratelimits)])
+
+
+if __name__ == '__main__':
+    unittest.main()
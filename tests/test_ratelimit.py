@@ -0,0 +1,162 @@
+import asyncio
+import unittest
+
+from discord.ext import commands
+
+from benchmarks.fake_discord import FakeGateway, drain
+from utils.ratelimit import Limit, RateLimiter, TokenBucket
+
+
+class LimitTest(unittest.TestCase):
+
+    def test_invalid_options(self):
+        for options in ({'rate': 0}, {'rate': -1}, {'rate': '5'}, {'rate': True}, {'rate': float('nan')},
+                        {'rate': 1, 'per': 0}, {'rate': 1, 'per': None}, {'rate': 1, 'per': float('inf')},
+                        {'concurrency': 0}, {'concurrency': 1.5}, {'scope': 'server'}):
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                Limit('roll', **options)
+
+    def test_valid_options(self):
+        limit = Limit('roll', rate=2, per=0.5, concurrency=1)
+        self.assertEqual((limit.rate, limit.per, limit.concurrency), (2, 0.5, 1))
+        Limit('roll', concurrency=3)
+        RateLimiter({'roll': {'rate': 5, 'per': 10}, 'Random': {'concurrency': 1}})
+
+    def test_invalid_config(self):
+        with self.assertRaises(ValueError):
+            RateLimiter({'roll': {'rate': 5, 'per': 0}})
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_refill_and_retry(self):
+        # 2 tokens every 10 seconds: one token every 5 seconds.
+        limit = Limit('roll', rate=2, per=10)
+        bucket = TokenBucket(limit.rate, 100.0)
+        self.assertEqual(bucket.take(limit, 100.0), 0)
+        self.assertEqual(bucket.take(limit, 100.0), 0)
+        self.assertAlmostEqual(bucket.full_at, 110.0)
+        self.assertAlmostEqual(bucket.take(limit, 100.0), 5.0)
+        self.assertAlmostEqual(bucket.take(limit, 102.0), 3.0)
+        # A failed take doesn't use up the partial token.
+        self.assertEqual(bucket.take(limit, 105.0), 0)
+        self.assertAlmostEqual(bucket.take(limit, 105.0), 5.0)
+        # Tokens never accumulate beyond the rate.
+        self.assertEqual(bucket.take(limit, 1000.0), 0)
+        self.assertEqual(bucket.take(limit, 1000.0), 0)
+        self.assertGreater(bucket.take(limit, 1000.0), 0)
+
+
+class ExpireTest(unittest.TestCase):
+
+    def test_full_buckets_are_dropped(self):
+        limiter = RateLimiter(max_buckets=10)
+        limiter.buckets['full'] = bucket = TokenBucket(1, 0.0)
+        bucket.full_at = 5.0
+        limiter.buckets['refilling'] = bucket = TokenBucket(1, 0.0)
+        bucket.full_at = 20.0
+        limiter._expire(10.0)
+        self.assertEqual(list(limiter.buckets), ['refilling'])
+
+    def test_least_recently_used_buckets_are_dropped(self):
+        limiter = RateLimiter(max_buckets=3)
+        for i in range(5):
+            limiter.buckets[i] = bucket = TokenBucket(1, 0.0)
+            bucket.full_at = 100.0
+        limiter._expire(10.0)
+        self.assertEqual(list(limiter.buckets), [3, 4])
+
+    def test_stops_at_first_refilling_bucket(self):
+        limiter = RateLimiter(max_buckets=10)
+        for key, full_at in (('a', 20.0), ('b', 5.0)):
+            limiter.buckets[key] = bucket = TokenBucket(1, 0.0)
+            bucket.full_at = full_at
+        limiter._expire(10.0)
+        # Buckets are kept in order of use, not of refilling.
+        self.assertEqual(list(limiter.buckets), ['a', 'b'])
+
+
+class Admin(commands.Cog):
+
+    def __init__(self):
+        self.invoked = []
+
+    @commands.group()
+    async def admin(self, ctx):
+        self.invoked.append(('admin', dict(ctx.bot.ratelimiter.in_flight)))
+
+    @admin.command()
+    async def update(self, ctx):
+        self.invoked.append(('admin update', dict(ctx.bot.ratelimiter.in_flight)))
+
+    @commands.group(invoke_without_command=True)
+    async def config(self, ctx):
+        self.invoked.append(('config', dict(ctx.bot.ratelimiter.in_flight)))
+
+    @config.command()
+    async def show(self, ctx):
+        self.invoked.append(('config show', dict(ctx.bot.ratelimiter.in_flight)))
+
+
+class InvocationTest(unittest.TestCase):
+    """Rate limits applied by a bot wired up like main.Bot."""
+
+    def run_commands(self, config, *contents):
+        errors = []
+
+        async def run():
+            bot = commands.Bot(command_prefix='!')
+            bot.ratelimiter = RateLimiter(config)
+            bot.add_check(bot.ratelimiter.check, call_once=True)
+
+            async def before(ctx):
+                bot.ratelimiter.acquire(ctx)
+
+            async def after(ctx):
+                bot.ratelimiter.release(ctx)
+
+            async def on_command_error(ctx, exc):
+                errors.append(exc)
+
+            bot.before_invoke(before)
+            bot.after_invoke(after)
+            bot.add_listener(on_command_error)
+            cog = Admin()
+            bot.add_cog(cog)
+            gateway = FakeGateway(bot, member_count=2)
+            for content in contents:
+                gateway.message(content)
+                await drain()
+            return bot, cog
+
+        bot, cog = asyncio.run(run())
+        return bot, cog.invoked, errors
+
+    def test_acquire_and_release_balance(self):
+        config = {'admin': {'concurrency': 1}, 'admin update': {'concurrency': 1}, 'Admin': {'concurrency': 2},
+                  'config': {'concurrency': 1}, 'config show': {'concurrency': 1}}
+        bot, invoked, errors = self.run_commands(config, '!admin update', '!admin', '!config show', '!config')
+        self.assertEqual(errors, [])
+        self.assertEqual([name for name, _ in invoked], ['admin', 'admin update', 'admin', 'config show', 'config'])
+        # Only the running command's limits are held: a group's are released
+        # before its subcommand runs.
+        for name, in_flight in invoked:
+            self.assertEqual(sorted(key[0] for key in in_flight), sorted({name, name.split()[0], 'Admin'}))
+        self.assertEqual(bot.ratelimiter.in_flight, {})
+
+    def test_subcommand_rate_limit(self):
+        config = {'admin update': {'rate': 1, 'per': 60}}
+        _, invoked, errors = self.run_commands(config, '!admin update', '!admin update', '!admin', '!admin')
+        self.assertEqual([name for name, _ in invoked], ['admin', 'admin update', 'admin', 'admin'])
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], commands.CommandOnCooldown)
+
+    def test_group_rate_limit_applies_to_subcommands(self):
+        config = {'admin': {'rate': 2, 'per': 60}}
+        _, invoked, errors = self.run_commands(config, '!admin update', '!admin', '!admin update')
+        self.assertEqual(len(invoked), 3)
+        self.assertEqual(len(errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+from utils import database, session
+
+
+class SessionFileTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for module in (database, session):
+            patcher = mock.patch.object(module, 'DATA_DIR', self.directory)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.bot = types.SimpleNamespace(ws=types.SimpleNamespace(session_id='abc', sequence=42))
+
+    def test_save_and_load(self):
+        self.assertTrue(session.save(self.bot))
+        self.assertEqual(os.listdir(self.directory), [session.SESSION_FILE])
+        saved = session.load()
+        self.assertEqual((saved['session_id'], saved['sequence']), ('abc', 42))
+        # The session is only used once, and nothing is left behind.
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertIsNone(session.load())
+
+    def test_not_connected(self):
+        self.bot.ws.session_id = None
+        self.assertFalse(session.save(self.bot))
+        self.bot.ws = None
+        self.assertFalse(session.save(self.bot))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_old_session_is_discarded(self):
+        with open(os.path.join(self.directory, session.SESSION_FILE), 'w') as f:
+            json.dump({'session_id': 'abc', 'sequence': 42, 'saved_at': time.time() - session.MAX_AGE - 1}, f)
+        self.assertIsNone(session.load())
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
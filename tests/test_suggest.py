@@ -0,0 +1,108 @@
+import random
+import unittest
+
+from utils.suggest import SuggestionIndex, did_you_mean, edit_distance
+
+
+def reference_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance, without any bound."""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def typo(rng: random.Random, word: str, alphabet: str) -> str:
+    """Make one random edit to a word."""
+    i = rng.randrange(len(word) + 1)
+    edit = rng.choice(('insert', 'delete', 'substitute', 'transpose'))
+    if edit == 'insert' or not word:
+        return word[:i] + rng.choice(alphabet) + word[i:]
+    i = min(i, len(word) - 1)
+    if edit == 'delete':
+        return word[:i] + word[i + 1:]
+    if edit == 'substitute':
+        return word[:i] + rng.choice(alphabet) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1:i + 2] + word[i:i + 1] + word[i + 2:] if i >= 0 else word
+
+
+class EditDistanceTest(unittest.TestCase):
+
+    def test_examples(self):
+        for a, b, distance in (('roll', 'roll', 0), ('roll', 'rol', 1), ('roll', 'rolls', 1), ('roll', 'toll', 1),
+                               ('roll', 'rlol', 1), ('help', 'hepl', 1), ('ab', 'ba', 1), ('abcd', 'badc', 2),
+                               ('ca', 'abc', 3), ('', 'ab', 2), ('', '', 0)):
+            with self.subTest(a=a, b=b):
+                self.assertEqual(edit_distance(a, b, 5), distance)
+                self.assertEqual(edit_distance(b, a, 5), distance)
+
+    def test_bound(self):
+        self.assertEqual(edit_distance('roll', 'rollover', 2), 3)
+        self.assertEqual(edit_distance('abcdef', 'fedcba', 2), 3)
+        self.assertEqual(edit_distance('abcd', 'badc', 1), 2)
+        self.assertEqual(edit_distance('abcd', 'badc', 2), 2)
+
+    def test_matches_reference(self):
+        rng = random.Random(0)
+        for _ in range(1000):
+            a = ''.join(rng.choice('abc') for _ in range(rng.randrange(8)))
+            b = ''.join(rng.choice('abc') for _ in range(rng.randrange(8)))
+            max_distance = rng.randrange(4)
+            with self.subTest(a=a, b=b, max_distance=max_distance):
+                self.assertEqual(edit_distance(a, b, max_distance), min(reference_distance(a, b), max_distance + 1))
+
+
+class SuggestionIndexTest(unittest.TestCase):
+
+    def linear_scan(self, names, word, max_distance):
+        word = word.lower()
+        max_distance = min(max_distance, len(word) // 3)
+        scored = sorted((reference_distance(word, name), name) for name in set(names) if name != word)
+        return [name for distance, name in scored if distance <= max_distance and max_distance]
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(0)
+        alphabet = 'abcde'
+        names = {''.join(rng.choice(alphabet) for _ in range(rng.randrange(1, 10))) for _ in range(300)}
+        names = sorted(names)
+        for max_distance in (1, 2, 3):
+            index = SuggestionIndex(names, max_distance)
+            for _ in range(100):
+                word = rng.choice(names)
+                for _ in range(rng.randrange(4)):
+                    word = typo(rng, word, alphabet)
+                with self.subTest(word=word, max_distance=max_distance):
+                    self.assertEqual(index.lookup(word, limit=len(names)), self.linear_scan(names, word, max_distance))
+
+    def test_lookup(self):
+        index = SuggestionIndex(['roll', 'Random', 'remind', 'help', 'config show'])
+        self.assertEqual(index.lookup('rol'), ['roll'])
+        self.assertEqual(index.lookup('RLOL'), ['roll'])
+        self.assertEqual(index.lookup('randmo'), ['random'])
+        self.assertEqual(index.lookup('config shwo'), ['config show'])
+        # Exact matches and short words aren't suggested.
+        self.assertEqual(index.lookup('roll'), [])
+        self.assertEqual(index.lookup('he'), [])
+        self.assertEqual(index.lookup('xyzzy'), [])
+        self.assertEqual(SuggestionIndex([]).lookup('roll'), [])
+
+    def test_limit(self):
+        index = SuggestionIndex(['roll', 'rolls', 'role', 'toll', 'poll'])
+        self.assertEqual(index.lookup('rolll', limit=2), ['roll', 'rolls'])
+
+    def test_did_you_mean(self):
+        self.assertEqual(did_you_mean('!', []), '')
+        self.assertEqual(did_you_mean('!', ['roll']), "Did you mean `!roll`?")
+        self.assertEqual(did_you_mean('!', ['roll', 'role', 'toll']), "Did you mean `!roll`, `!role` or `!toll`?")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import random
+import unittest
+from unittest import mock
+
+from utils import timers
+from utils.timers import TimerWheel
+
+
+class FakeLoop:
+    """Just enough of an event loop for TimerWheel, with a clock that only
+    moves when advance() is called.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.handles = []
+        self.calls = 0
+
+    def time(self) -> float:
+        return self.now
+
+    def call_at(self, when: float, callback, *args):
+        self.calls += 1
+        heapq.heappush(self.handles, (when, self.calls, callback, args))
+        return self.calls
+
+    def advance(self, seconds: float) -> None:
+        end = self.now + seconds
+        while self.handles and self.handles[0][0] <= end:
+            when, _, callback, args = heapq.heappop(self.handles)
+            self.now = max(self.now, when)
+            callback(*args)
+        self.now = end
+
+
+# Times are multiples of 1/4 second so that they are exact in floating point.
+TICK = 0.5
+
+
+class TimerWheelTest(unittest.TestCase):
+
+    def setUp(self):
+        # A small wheel whose top level spans 4 ** 3 = 64 ticks, so that
+        # timers cascade and overflow it quickly.
+        for name, value in (('SLOTS', 4), ('LEVELS', 3)):
+            patcher = mock.patch.object(timers, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.loop = FakeLoop()
+        patcher = mock.patch.object(asyncio, 'get_event_loop', return_value=self.loop)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.wheel = TimerWheel(TICK)
+        self.fired = {}
+
+    def schedule(self, name, delay):
+        return self.wheel.call_later(delay, lambda: self.fired.setdefault(name, self.loop.now))
+
+    def assert_fired_on_time(self, name, expires):
+        self.assertIn(name, self.fired)
+        self.assertGreaterEqual(self.fired[name], expires)
+        # A timer that expires on a tick that has already passed (e.g. with
+        # no delay) fires on the next one.
+        self.assertLessEqual(self.fired[name], expires + TICK)
+
+    def test_never_early(self):
+        rng = random.Random(0)
+        expected = {}
+        for i in range(500):
+            self.loop.advance(rng.randrange(8) * 0.25)
+            delay = rng.randrange(400) * 0.25
+            self.schedule(i, delay)
+            expected[i] = self.loop.now + delay
+            # Check every timer that should have fired by now, and that none
+            # has fired early.
+            for name, fired in self.fired.items():
+                self.assertGreaterEqual(fired, expected[name])
+        self.loop.advance(200)
+        for name, expires in expected.items():
+            self.assert_fired_on_time(name, expires)
+        self.assertEqual(len(self.wheel), 0)
+        # The wheel stops ticking once it's empty.
+        self.assertEqual(self.loop.handles, [])
+
+    def level_of(self, timer):
+        for level, slots in enumerate(self.wheel._levels):
+            if any(timer._slot is slot for slot in slots):
+                return level
+        return None
+
+    def test_cancelled_timers_never_fire(self):
+        early = self.schedule('early', 3)
+        early.cancel()
+        self.assertTrue(early.cancelled())
+        # 20.75 s is 42 ticks, which starts in level 2.
+        timers = {level: self.schedule(level, 20.75) for level in (2, 1, 0)}
+        self.schedule('kept', 20.75)
+        self.assertEqual(len(self.wheel), 4)
+        self.assertEqual(self.level_of(timers[2]), 2)
+        timers[2].cancel()
+        # Cancel the others once they have cascaded to their level.
+        for level in (1, 0):
+            while self.level_of(timers[level]) != level:
+                self.assertFalse(timers[level].cancelled())
+                self.loop.advance(TICK)
+            timers[level].cancel()
+            timers[level].cancel()
+        self.assertEqual(len(self.wheel), 1)
+        self.loop.advance(30)
+        self.assertEqual(list(self.fired), ['kept'])
+        self.assert_fired_on_time('kept', 20.75)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_beyond_top_level(self):
+        # The top level spans 64 ticks (32 s).
+        delays = [31.75, 32, 32.25, 100, 1000.25]
+        for delay in delays:
+            self.schedule(delay, delay)
+        self.loop.advance(10)
+        self.schedule('later', 500)
+        for name, expires in sorted([(delay, delay) for delay in delays] + [('later', 510)], key=lambda item: item[1]):
+            self.loop.advance(expires - 0.25 - self.loop.now)
+            self.assertNotIn(name, self.fired)
+        self.loop.advance(TICK)
+        for delay in delays:
+            self.assert_fired_on_time(delay, delay)
+        self.assert_fired_on_time('later', 510)
+
+    def test_callback_errors_dont_stop_the_wheel(self):
+        self.wheel.call_later(1, lambda: 1 / 0)
+        self.schedule('after', 1)
+        with self.assertLogs(timers.l, 'ERROR'):
+            self.loop.advance(2)
+        self.assert_fired_on_time('after', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+
+import utils
+from utils import KeyPath, get_many, set_many
+from utils.database import DB
+
+
+class KeyPathTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db = DB('test', directory.name, 'ok', data={'g': {'u': {'points': 1}}})
+        self.points = KeyPath('g', 'u', 'points')
+
+    def test_cached_parent_is_invalidated_by_mutset(self):
+        self.assertEqual(self.points.get(self.db), 1)
+        utils.mutset(self.db, ['g', 'u'], {'points': 2})
+        self.assertEqual(self.points.get(self.db), 2)
+        utils.mutset(self.db, ['g'], {'u': {'points': 3}})
+        self.assertEqual(self.points.get(self.db), 3)
+        self.points.set(self.db, 4)
+        self.assertEqual(self.db['g']['u']['points'], 4)
+
+    def test_cached_parent_is_invalidated_by_set(self):
+        self.assertEqual(self.points.get(self.db), 1)
+        KeyPath('g', 'u').set(self.db, {'points': 2})
+        self.assertEqual(self.points.get(self.db), 2)
+        set_many(self.db, [(['g', 'u'], {'points': 3})])
+        self.assertEqual(self.points.get(self.db), 3)
+
+    def test_cached_parent_is_invalidated_by_reload(self):
+        self.assertEqual(self.points.get(self.db), 1)
+        self.db.reload({'g': {'u': {'points': 5}}})
+        self.assertEqual(self.points.get(self.db), 5)
+        self.points.set(self.db, 6)
+        self.assertEqual(self.db['g']['u']['points'], 6)
+        self.assertEqual(self.db.dirty, {'g'})
+        self.db.reload({})
+        self.assertIsNone(self.points.get(self.db))
+        self.assertEqual(self.points.mutget(self.db, 7), 7)
+        self.assertEqual(self.db, {'g': {'u': {'points': 7}}})
+
+    def test_each_root_is_cached_separately(self):
+        other = {'g': {'u': {'points': 'other'}}}
+        self.assertEqual(self.points.get(self.db), 1)
+        self.assertEqual(self.points.get(other), 'other')
+        self.assertEqual(self.points.get(self.db), 1)
+
+
+class ManyTest(unittest.TestCase):
+
+    def test_get_many_defaults(self):
+        # Paths through values that aren't dictionaries are missing too.
+        root = {'a': {'b': 1, 'c': None}, 'd': 2, 'e': 'text'}
+        paths = [['a', 'b'], ['a', 'c'], ['a', 'x'], ['x', 'y', 'z'], 'd', ['d', 'f'], ['e', 'f'], KeyPath('a')]
+        expected = [1, None, 0, 0, 2, 0, 0, root['a']]
+        self.assertEqual(get_many(root, paths, 0), expected)
+        self.assertEqual(get_many(root, []), [])
+        # Nothing is created for missing paths.
+        self.assertEqual(root, {'a': {'b': 1, 'c': None}, 'd': 2, 'e': 'text'})
+
+    def test_get_many_repeated_paths(self):
+        root = {'a': {'b': 1}}
+        self.assertEqual(get_many(root, [['a', 'b'], ['a', 'b'], ['a', 'c']]), [1, 1, None])
+
+    def test_set_many_overlapping_prefixes(self):
+        # The shorter path is set first, whatever the order of the items.
+        for items in ([(['a'], {'c': 1}), (['a', 'b'], 2)], [(['a', 'b'], 2), (['a'], {'c': 1})]):
+            with self.subTest(items=items):
+                root = {'a': {'old': 0}}
+                set_many(root, items)
+                self.assertEqual(root, {'a': {'c': 1, 'b': 2}})
+
+    def test_set_many_matches_mutset(self):
+        items = [(['a', 'b'], 1), (['a', 'c', 'd'], 2), ('e', 3), (['a', 'c', 'f'], 4)]
+        root, expected = {'a': {'x': 0}}, {'a': {'x': 0}}
+        set_many(root, items)
+        for path, value in items:
+            utils.mutset(expected, path if isinstance(path, list) else [path], value)
+        self.assertEqual(root, expected)
+
+    def test_set_many_marks_dirty(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        db = DB('test', directory.name, 'ok', data={'a': {'b': 1}, 'c': 2})
+        set_many(db, [(['a', 'b'], 3), (['d', 'e'], 4)])
+        self.assertEqual(db.dirty, {'a', 'd'})
+        self.assertEqual(db, {'a': {'b': 3}, 'c': 2, 'd': {'e': 4}})
+
+
+if __name__ == '__main__':
+    unittest.main()
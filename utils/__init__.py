@@ -1,5 +1,6 @@
 from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Callable, Iterable, List, Union
 import logging
 
@@ -22,7 +23,13 @@ def format_time_interval(timestamp1: int,
                          timestamp2: int = 0,
                          *,
                          include_seconds: bool = True):
-    dt = int(abs(timestamp1 - timestamp2))
+    return _format_interval(int(abs(timestamp1 - timestamp2)), include_seconds)
+
+
+# Most intervals that get formatted are short (cooldowns, uptimes, timeouts), so
+# the same few thousand come up over and over again.
+@lru_cache(maxsize=4096)
+def _format_interval(dt: int, include_seconds: bool):
     dt, seconds = dt // 60, dt % 60
     dt, minutes = dt // 60, dt % 60
     dt, hours   = dt // 24, dt % 24
@@ -49,7 +56,11 @@ def format_hours(hours: int):
 
 
 def human_list(words: Iterable[str], oxford_comma: bool = True):
-    words = list(words)
+    """Join words into an English list, e.g. "a, b, and c". Pass a list or
+    tuple; any other iterable is copied into a list first.
+    """
+    if not isinstance(words, (list, tuple)):
+        words = list(words)
     if len(words) == 0:
         return strings.EMPTY_LIST
     elif len(words) == 1:
@@ -129,6 +140,7 @@ def mutset(d: dict, keys: Union[List, Any], value):
     # This is NOT the same as mutget().
     """
     mutget(d, keys[:-1], {})[keys[-1]] = value
+    _mark_dirty(d, keys[0])
 
 
 def lazy_mutget(d: dict, keys: Union[List, Any], value_lambda: Callable[[], Any]):
@@ -140,6 +152,166 @@ def lazy_mutget(d: dict, keys: Union[List, Any], value_lambda: Callable[[], Any]
     return d[keys[-1]]
 
 
+_LEAF = object()
+
+
+class KeyPath:
+    """A path of keys into nested dictionaries, compiled once so that it can be
+    used many times, e.g. `KeyPath(guild_id, user_id, 'points')`.
+
+    The methods mirror mutget(), mutset() and lazy_mutget(). If the root has a
+    `generation` attribute (as DB does), the dictionary containing the last key
+    is cached and reused until the generation changes, so repeated accesses
+    don't walk the whole path. The root's generation must be incremented
+    whenever a dictionary on the path might have been replaced or removed,
+    which DB does automatically (see utils.database.TrackedDict).
+
+    If the root has a `mark_dirty()` method (as DB does), it is called with the
+    first key of the path whenever a value is set or created.
+    """
+
+    __slots__ = ('keys', 'parent_keys', 'last_key', '_root', '_generation', '_parent')
+
+    def __init__(self, *keys):
+        if not keys:
+            raise ValueError("KeyPath requires at least one key")
+        self.keys = keys
+        self.parent_keys = keys[:-1]
+        self.last_key = keys[-1]
+        self._root = None
+        self._generation = None
+        self._parent = None
+
+    def __repr__(self):
+        return f"KeyPath{self.keys!r}"
+
+    def _get_parent(self, root: dict, create: bool):
+        generation = getattr(root, 'generation', None)
+        if generation is not None and self._root is root and self._generation == generation:
+            return self._parent
+        d = root
+        for key in self.parent_keys:
+            if key not in d:
+                if not create:
+                    return None
+                d[key] = {}
+            d = d[key]
+        if generation is not None:
+            self._root = root
+            self._generation = root.generation
+            self._parent = d
+        return d
+
+    def get(self, root: dict, default=None):
+        """Return the value at the path, or `default` if it is missing. Unlike
+        mutget(), this never modifies anything.
+        """
+        d = self._get_parent(root, False)
+        return default if d is None else d.get(self.last_key, default)
+
+    def mutget(self, root: dict, value=None):
+        d = self._get_parent(root, True)
+        if self.last_key not in d:
+            d[self.last_key] = value
+            _mark_dirty(root, self.keys[0])
+        return d[self.last_key]
+
+    def lazy_mutget(self, root: dict, value_lambda: Callable[[], Any]):
+        d = self._get_parent(root, True)
+        if self.last_key not in d:
+            d[self.last_key] = value_lambda()
+            _mark_dirty(root, self.keys[0])
+        return d[self.last_key]
+
+    def set(self, root: dict, value) -> None:
+        d = self._get_parent(root, True)
+        if isinstance(d.get(self.last_key), dict) and hasattr(root, 'generation'):
+            # Another path might have cached the dictionary being replaced.
+            root.generation += 1
+        d[self.last_key] = value
+        _mark_dirty(root, self.keys[0])
+
+
+def _mark_dirty(root, key):
+    mark_dirty = getattr(root, 'mark_dirty', None)
+    if mark_dirty is not None:
+        mark_dirty(key)
+
+
+def _as_key_path(path) -> KeyPath:
+    if isinstance(path, KeyPath):
+        return path
+    # Like mutget(), treat anything but a list (including a tuple) as one key.
+    return KeyPath(*path) if isinstance(path, list) else KeyPath(path)
+
+
+def _build_trie(paths: Iterable) -> dict:
+    """Group paths by common prefix, so that each prefix is only walked once.
+    The trie maps keys to subtries; _LEAF maps to the indices of the paths that
+    end there.
+    """
+    trie = {}
+    for i, path in enumerate(paths):
+        node = trie
+        for key in _as_key_path(path).keys:
+            node = node.setdefault(key, {})
+        node.setdefault(_LEAF, []).append(i)
+    return trie
+
+
+def get_many(root: dict, paths: Iterable, default=None) -> list:
+    """Return the values at many paths (KeyPaths, lists of keys or single keys)
+    in a single walk of the nested dictionaries, like [path.get(root, default)
+    for path in paths].
+    """
+    paths = list(paths)
+    results = [default] * len(paths)
+
+    def walk(d, node):
+        for key, child in node.items():
+            if key is _LEAF:
+                continue
+            if isinstance(d, dict) and key in d:
+                value = d[key]
+                for i in child.get(_LEAF, ()):
+                    results[i] = value
+                walk(value, child)
+
+    walk(root, _build_trie(paths))
+    return results
+
+
+def set_many(root: dict, items: Iterable) -> None:
+    """Set many (path, value) pairs in a single walk of the nested
+    dictionaries, like mutset() for each pair. If one path is a prefix of
+    another, the shorter one is set first.
+    """
+    items = list(items)
+    dirty = set()
+    for i, (path, value) in enumerate(items):
+        path = _as_key_path(path)
+        items[i] = (path, value)
+        dirty.add(path.keys[0])
+    trie = _build_trie(path for path, _ in items)
+
+    def walk(d, node):
+        for key, child in node.items():
+            if key is _LEAF:
+                continue
+            for i in child.get(_LEAF, ()):
+                d[key] = items[i][1]
+            if len(child) > (_LEAF in child):
+                if not isinstance(d.get(key), dict):
+                    d[key] = {}
+                walk(d[key], child)
+
+    walk(root, trie)
+    if hasattr(root, 'generation'):
+        root.generation += 1
+    for key in dirty:
+        _mark_dirty(root, key)
+
+
 INFINITY = float('inf')
 
 
@@ -155,8 +327,22 @@ def isfinite(value):
     return not (isnan(value) or isinf(value))
 
 
-from .database import get_db  # noqa: E402, F401
+from .database import get_db, get_guild_db  # noqa: E402, F401
 from . import (  # noqa: E402, F401
+    cluster,
+    database,
     discord,
+    embed_cache,
     error_handling,
+    executor,
+    handover,
+    interactions,
+    live_config,
+    log,
+    ratelimit,
+    session,
+    stats,
+    suggest,
+    timers,
+    watchdog,
 )
@@ -0,0 +1,94 @@
+from multiprocessing.connection import Connection, wait
+from typing import Callable, List
+import multiprocessing
+import threading
+import time
+
+from . import l
+
+
+# Discord only allows one IDENTIFY every five seconds (per concurrency bucket),
+# so clusters are started this many seconds apart for each shard they run.
+IDENTIFY_INTERVAL = 5
+
+
+def cluster_shard_ids(cluster_id: int, cluster_count: int, shard_count: int) -> List[int]:
+    """Return the IDs of the shards that should be run by a given cluster."""
+    return list(range(cluster_id, shard_count, cluster_count))
+
+
+class Cluster:
+    """A worker process's connection to the launcher and, through it, to every
+    other cluster.
+    Messages are tuples of the form (action, *args). Each message received from
+    another cluster is dispatched on the bot as a 'cluster_message' event, so
+    cogs can handle it with an `on_cluster_message(action, *args)` listener.
+    """
+
+    def __init__(self, cluster_id: int, cluster_count: int, conn: Connection):
+        self.id = cluster_id
+        self.count = cluster_count
+        self.conn = conn
+        self._thread = None
+
+    def broadcast(self, action: str, *args) -> None:
+        """Send a message to every other cluster."""
+        self.conn.send((action, *args))
+
+    def start(self, bot) -> None:
+        if self._thread is None:
+            # Use a daemon thread rather than the loop's executor so that a
+            # blocked recv() can't keep the process alive after the bot exits.
+            self._thread = threading.Thread(target=self._listen, args=(bot,), name='cluster', daemon=True)
+            self._thread.start()
+
+    def _listen(self, bot):
+        while True:
+            try:
+                action, *args = self.conn.recv()
+            except (EOFError, OSError):
+                l.warning(f"Cluster {self.id} lost its connection to the launcher")
+                return
+            bot.loop.call_soon_threadsafe(bot.dispatch, 'cluster_message', action, *args)
+
+
+def launch(target: Callable, cluster_count: int, shard_count: int) -> None:
+    """Start `cluster_count` worker processes, each of which runs
+    `target(cluster_id, cluster_count, shard_count, conn)`, and relay messages
+    between them until they have all exited.
+    `target` must be picklable (i.e. a module-level function). It is
+    responsible for creating and running a bot with its share of the shards (see
+    cluster_shard_ids()), so a target that connects to a fake gateway can be
+    used to exercise the launcher locally (see benchmarks/cluster.py).
+    """
+    mp = multiprocessing.get_context('spawn')
+    conns, processes = [], []
+    for cluster_id in range(cluster_count):
+        if cluster_id:
+            time.sleep(IDENTIFY_INTERVAL * len(cluster_shard_ids(cluster_id - 1, cluster_count, shard_count)))
+        parent_conn, child_conn = mp.Pipe()
+        process = mp.Process(
+            target=target,
+            args=(cluster_id, cluster_count, shard_count, child_conn),
+            name=f'cluster-{cluster_id}',
+        )
+        process.start()
+        child_conn.close()
+        l.info(f"Started cluster {cluster_id} (pid {process.pid}) with shards {cluster_shard_ids(cluster_id, cluster_count, shard_count)}")
+        conns.append(parent_conn)
+        processes.append(process)
+    while conns:
+        for conn in wait(conns):
+            try:
+                message = conn.recv()
+            except EOFError:
+                conns.remove(conn)
+                continue
+            for other in conns:
+                if other is not conn:
+                    try:
+                        other.send(message)
+                    except OSError:
+                        pass
+    for process in processes:
+        process.join()
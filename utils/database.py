@@ -1,24 +1,112 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import asyncio
 import json
-from os import makedirs, path, remove, rename
+from os import cpu_count, fstat, listdir, makedirs, path, remove, rename, stat
+import time
+import weakref
+import zlib
 from tempfile import mkstemp
-from typing import Optional
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from utils import l
+from utils.executor import get_executor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 DATA_DIR = path.realpath(path.join(path.dirname(__file__), '../data'))
 
+# Functions called each time a database is saved, with its name and a dict of
+# the changes that were saved (the keyword arguments of DB.merge()). When
+# running several clusters, this is used to pass the changes on to the other
+# processes.
+SAVE_HOOKS: List[Callable[[str, dict], None]] = []
+
+# Maps data files to how long they took to read and parse the last time they
+# were loaded, in seconds.
+LOAD_TIMES: Dict[str, float] = {}
+
+# On machines with more than one CPU, preload() parses files larger than this
+# many bytes in the process pool, and smaller ones in the thread pool, where the
+# result doesn't need to be pickled.
+PROCESS_THRESHOLD = 1024 * 1024
+
+
+class ChecksumError(ValueError):
+    """Raised when a data file doesn't match the checksum saved with it."""
+
+
+@contextmanager
+def file_lock(fullpath: str):
+    """Hold an exclusive lock on `<fullpath>.lock`, so that only one process
+    writes to the file at a time. This is a no-op where fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    if not path.isdir(path.dirname(fullpath)):
+        makedirs(path.dirname(fullpath))
+    with open(fullpath + '.lock', 'w') as lockfile:
+        fcntl.flock(lockfile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+
+def read_checksum(fullpath: str) -> Optional[Tuple[int, int, int]]:
+    """Return the CRC-32, size and modification time (in nanoseconds) that a
+    data file had when it was last written by write_data(), or None if they
+    weren't recorded.
+    """
+    try:
+        with open(fullpath + '.crc', 'r') as f:
+            crc, size, mtime = f.read().split()
+        return int(crc, 16), int(size), int(mtime)
+    except (OSError, ValueError):
+        return None
+
+
+def read_data(fullpath: str) -> Tuple[dict, float]:
+    """Read and parse a data file. Returns the data and the time taken in
+    seconds.
+    If the file hasn't been modified since write_data() wrote it, it is first
+    checked against the checksum saved with it, so that corruption that still
+    happens to be valid JSON is caught too. Files edited by hand (or written
+    by older versions of the bot) are only parsed.
+    """
+    start = time.perf_counter()
+    with open(fullpath, 'rb') as f:
+        raw = f.read()
+        mtime = fstat(f.fileno()).st_mtime_ns
+    checksum = read_checksum(fullpath)
+    if checksum is not None and checksum[2] == mtime and checksum[:2] != (zlib.crc32(raw), len(raw)):
+        raise ChecksumError("file doesn't match its checksum")
+    return json.loads(raw), time.perf_counter() - start
+
+
+def _loaded(filename: str, seconds: float, quiet: bool = False) -> None:
+    LOAD_TIMES[path.relpath(filename)] = seconds
+    (l.debug if quiet else l.info)(f"Loaded data file {path.relpath(filename)!r} in {seconds * 1e3:.1f} ms")
 
-def load_data(filename: str) -> dict:
+
+def load_data(filename: str, quiet: bool = False) -> dict:
     fullpath = path.join(DATA_DIR, filename)
     try:
-        with open(fullpath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        l.info(f"Loaded data file {path.relpath(filename)!r}")
+        data, seconds = read_data(fullpath)
+        _loaded(filename, seconds, quiet)
         return data
-    except Exception:
-        msg = f"Error loading {path.relpath(filename)!r};"
+    except Exception as exc:
+        msg = f"Error loading {path.relpath(filename)!r}"
+        if isinstance(exc, ChecksumError):
+            msg += f" ({exc})"
+        msg += ";"
         try:
             rename(fullpath, f'{fullpath}.{int(datetime.now().timestamp())}.bak')
             msg += f" backing up existing file and"
@@ -30,19 +118,36 @@ def load_data(filename: str) -> dict:
 
 
 def save_data(filename: str, data: dict) -> None:
+    if isinstance(data, str):
+        # Already serialized (see save_data_async()); just pretty-print it.
+        data = json.loads(data)
+    write_data(filename, json.dumps(data, indent='\t'))
+
+
+def write_data(filename: str, text: str, quiet: bool = False, checksum: bool = True) -> bool:
+    """Write already-serialized JSON to a data file, and its checksum to
+    `<file>.crc` unless `checksum` is False (see read_data()). Returns False
+    if it couldn't be written.
+    """
     # Use a temporary file so that the original one doesn't get corrupted in the
     # case of an error.
     fullpath = path.join(DATA_DIR, filename)
     try:
         if not path.isdir(path.dirname(fullpath)):
             makedirs(path.dirname(fullpath))
-        tempfile, tempfile_path = mkstemp(dir=DATA_DIR)
-        with open(tempfile, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent='\t')
-        rename(tempfile_path, path.join(DATA_DIR, filename))
-        l.info(f"Saved data file {path.relpath(filename)!r}")
+        tempfile, tempfile_path = mkstemp(dir=path.dirname(fullpath))
+        raw = text.encode('utf-8')
+        with open(tempfile, 'wb') as f:
+            f.write(raw)
+        rename(tempfile_path, fullpath)
+        if checksum:
+            with open(fullpath + '.crc', 'w') as f:
+                f.write(f"{zlib.crc32(raw):08x} {len(raw)} {stat(fullpath).st_mtime_ns}\n")
+        (l.debug if quiet else l.info)(f"Saved data file {path.relpath(filename)!r}")
+        return True
     except Exception:
         l.warning(f"Error saving {path.relpath(filename)!r}")
+        return False
     finally:
         try:
             remove(tempfile_path)
@@ -50,15 +155,189 @@ def save_data(filename: str, data: dict) -> None:
             pass
 
 
+async def save_data_async(filename: str, data: dict) -> None:
+    """Like save_data(), but do most of the work in the executor's thread pool.
+    The data is snapshotted on the calling thread using the compact (C-accelerated)
+    JSON encoder, so it's safe to keep modifying it while the save is running;
+    pretty-printing and writing the file happen on a worker thread.
+    """
+    await get_executor().run(save_data, filename, json.dumps(data), timeout=None)
+
+
+def render_fragment(key, value) -> str:
+    """Return `"key": value` exactly as it appears in a top-level object
+    written by save_data().
+    """
+    # Strip '{\n\t' and '\n}'.
+    return json.dumps({key: value}, indent='\t')[3:-2]
+
+
+def join_fragments(fragments) -> str:
+    """Combine rendered fragments into the text of a whole object."""
+    body = ',\n\t'.join(fragments)
+    return '{\n\t' + body + '\n}' if body else '{}'
+
+
+def _track(value, db: 'DB', key):
+    """Return a copy of `value` in which every dictionary and list reports
+    changes to `db` as changes to the top-level key `key`.
+    """
+    if isinstance(value, (TrackedDict, TrackedList)) and value._db is db and value._key == key:
+        return value
+    if isinstance(value, dict):
+        tracked = TrackedDict()
+        dict.update(tracked, ((k, _track(v, db, key)) for k, v in value.items()))
+    elif isinstance(value, list):
+        tracked = TrackedList(_track(v, db, key) for v in value)
+    else:
+        return value
+    tracked._db = db
+    tracked._key = key
+    return tracked
+
+
+class TrackedDict(dict):
+    """A dictionary inside a DB that marks its top-level key as dirty whenever
+    it is modified. DB creates these automatically; copies (including
+    copy.deepcopy()) are plain dictionaries.
+    """
+
+    __slots__ = ('_db', '_key')
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def _changed(self, replaced=None) -> None:
+        if isinstance(replaced, dict):
+            # A KeyPath might have cached the dictionary being replaced.
+            self._db.generation += 1
+        self._db.dirty.add(self._key)
+
+    def __setitem__(self, key, value) -> None:
+        self._changed(self.get(key))
+        super().__setitem__(key, _track(value, self._db, self._key))
+
+    def __delitem__(self, key) -> None:
+        self._changed(self.get(key))
+        super().__delitem__(key)
+
+    def pop(self, key, *args):
+        self._changed(self.get(key))
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._changed(value)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        self._changed({})
+        super().clear()
+
+
+class TrackedList(list):
+    """A list inside a DB that marks its top-level key as dirty whenever it is
+    modified (see TrackedDict).
+    """
+
+    __slots__ = ('_db', '_key')
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def _changed(self) -> None:
+        # A KeyPath can't cache a list, but it can cache a dictionary inside
+        # one.
+        self._db.generation += 1
+        self._db.dirty.add(self._key)
+
+    def _track_all(self, values):
+        return [_track(v, self._db, self._key) for v in values]
+
+    def __setitem__(self, index, value) -> None:
+        self._changed()
+        if isinstance(index, slice):
+            value = self._track_all(value)
+        else:
+            value = _track(value, self._db, self._key)
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index) -> None:
+        self._changed()
+        super().__delitem__(index)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, n):
+        self._changed()
+        return super().__imul__(n)
+
+    def append(self, value) -> None:
+        self._changed()
+        super().append(_track(value, self._db, self._key))
+
+    def extend(self, values) -> None:
+        self._changed()
+        super().extend(self._track_all(values))
+
+    def insert(self, index, value) -> None:
+        self._changed()
+        super().insert(index, _track(value, self._db, self._key))
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def remove(self, value) -> None:
+        self._changed()
+        super().remove(value)
+
+    def clear(self) -> None:
+        self._changed()
+        super().clear()
+
+    def sort(self, *args, **kwargs) -> None:
+        self._changed()
+        super().sort(*args, **kwargs)
+
+    def reverse(self) -> None:
+        self._changed()
+        super().reverse()
+
+
 class DB(dict):
     """A simple subclass of dict implementing JSON save/load.
     Do not instantiate this class directly; use database.get_db() instead.
+
+    Dictionaries and lists stored in a DB are replaced with copies (TrackedDict
+    and TrackedList) that record which top-level key they belong to whenever
+    they are modified, so always modify the object that is in the DB rather
+    than the one that was originally stored. When saving, only the modified
+    top-level keys are serialized again; the rest of the file is reused from
+    the last save. Changes to other mutable objects must be reported with
+    mark_dirty().
+
     Read-only attributes:
     - name -- str
     - filepath -- str
+    - dirty -- set of top-level keys modified since the last save
+    - generation -- int incremented whenever a dictionary in the DB might
+      have been replaced or removed (see utils.KeyPath)
     """
 
-    def __init__(self, db_name: str, db_path: Optional[str] = None, do_not_instantiate_directly=None):
+    def __init__(self, db_name: str, db_path: Optional[str] = None, do_not_instantiate_directly=None,
+                 data: Optional[dict] = None):
         """Do not instantiate this class directly; use database.get_db()
         instead.
         """
@@ -67,23 +346,424 @@ class DB(dict):
             raise TypeError("Do not instantiate DB object directly; use get_db() instead")
         self.name = db_name
         self.filepath = path.join(db_path or DATA_DIR, db_name + '.json')
-        self.reload()
+        self.dirty = set()
+        self.generation = 0
+        # Maps top-level keys to their serialized form as of the last save.
+        self._fragments = {}
+        self._fragments_lock = Lock()
+        # Texts rendered from the fragments are numbered in order, so that a
+        # worker thread never overwrites a newer text with an older one.
+        self._rendered = 0
+        self._written_text = 0
+        self._write_lock = Lock()
+        # time.time_ns() when this process last wrote the file, and the number
+        # of writes in progress.
+        self._written = 0
+        self._saving = 0
+        self.reload(data)
+
+    def mark_dirty(self, key) -> None:
+        self.dirty.add(key)
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, _track(value, self, key))
+        self.generation += 1
+        self.dirty.add(key)
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self.generation += 1
+        self.dirty.add(key)
+
+    def pop(self, key, *args):
+        self.generation += 1
+        self.dirty.add(key)
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.generation += 1
+        self.dirty.add(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        self.dirty.update(self)
+        super().clear()
+        self.generation += 1
 
     def replace(self, new_data: dict) -> None:
         self.clear()
         self.update(new_data)
 
-    def reload(self) -> None:
-        self.replace(load_data(self.filepath))
+    def reload(self, data: Optional[dict] = None) -> None:
+        """Reload the DB from its file, or from `data` if the file has already
+        been read.
+        """
+        self.replace(load_data(self.filepath) if data is None else data)
+        with self._fragments_lock:
+            self._fragments.clear()
+        # The file is up to date; it just hasn't been serialized by this DB
+        # yet.
+        self.dirty.clear()
+
+    def _unserialized_keys(self) -> list:
+        fragments = self._fragments
+        return [key for key in self if key not in fragments]
+
+    def serialize(self) -> str:
+        """Return the DB as pretty-printed JSON, only serializing the top-level
+        keys that have changed since the last call.
+        """
+        return self._serialize()[0]
+
+    def _serialize(self) -> Tuple[str, int]:
+        with self._fragments_lock:
+            fragments = self._fragments
+            for key in self.dirty:
+                if key not in self:
+                    fragments.pop(key, None)
+            for key in self.dirty | set(self._unserialized_keys()):
+                if key in self:
+                    fragments[key] = render_fragment(key, self[key])
+            self.dirty.clear()
+            self._rendered += 1
+            return join_fragments(fragments[key] for key in self), self._rendered
 
     def save(self) -> None:
-        save_data(self.filepath, self)
+        changed = [key for key in self.dirty if key in self]
+        deleted = [key for key in self.dirty if key not in self]
+        snapshot = json.dumps([self[key] for key in changed]) if SAVE_HOOKS else None
+        written = self._save_locked(*self._serialize())
+        self._saved(changed, snapshot, deleted, written)
+
+    async def save_async(self) -> None:
+        """Like save(), but without blocking the event loop (see
+        save_data_async()). Only the modified top-level keys are snapshotted
+        on the event loop; pretty-printing and writing the file happen on a
+        worker thread.
+        """
+        deleted = [key for key in self.dirty if key not in self]
+        changed = [key for key in self.dirty if key in self]
+        keys = changed + [key for key in self._unserialized_keys() if key not in self.dirty]
+        values = [self[key] for key in keys]
+        snapshot = json.dumps(values)
+        order = list(self)
+        self.dirty.clear()
+        self._saving += 1
+        try:
+            written = await get_executor().run(self._save_snapshot, keys, snapshot, deleted, order, timeout=None)
+        finally:
+            self._saving -= 1
+        if SAVE_HOOKS:
+            self._saved(changed, json.dumps(values[:len(changed)]), deleted, written)
+
+    def _saved(self, keys, snapshot: Optional[str], deleted, written: int) -> None:
+        for hook in SAVE_HOOKS:
+            hook(self.name, {'keys': keys, 'snapshot': snapshot, 'deleted': deleted, 'written': written})
+
+    def merge(self, keys, snapshot: str, deleted, written: int) -> None:
+        """Apply changes that another process saved to this DB's file:
+        `keys` were set to the values in the JSON list `snapshot` and `deleted`
+        were removed, in a write that finished at time.time_ns() `written`.
+        Keys modified here since the last save are left as they are, and
+        overwrite the other process's changes when this DB is saved. If this
+        process has written the file since the other one did, that write
+        didn't include the changes, so they are marked dirty to be written
+        again with the next save.
+        """
+        merged = []
+        conflicts = 0
+        with self._fragments_lock:
+            for key, value in zip(keys, json.loads(snapshot)):
+                if key in self.dirty:
+                    conflicts += key not in self or self[key] != value
+                    continue
+                dict.__setitem__(self, key, _track(value, self, key))
+                self._fragments.pop(key, None)
+                merged.append(key)
+            for key in deleted:
+                if key in self.dirty:
+                    conflicts += key in self
+                    continue
+                dict.pop(self, key, None)
+                self._fragments.pop(key, None)
+                merged.append(key)
+        self.generation += 1
+        if self._written > written or self._saving:
+            self.dirty.update(merged)
+        if conflicts:
+            l.warning(f"Keeping unsaved changes to {conflicts} keys of {self.name!r} that another process saved")
+
+    def _save_snapshot(self, keys, snapshot: str, deleted, order) -> int:
+        with self._fragments_lock:
+            fragments = self._fragments
+            for key in deleted:
+                fragments.pop(key, None)
+            for key, value in zip(keys, json.loads(snapshot)):
+                fragments[key] = render_fragment(key, value)
+            # merge() may have dropped fragments since the snapshot was taken
+            # (and marked those keys dirty).
+            text = join_fragments(fragments[key] for key in order if key in fragments)
+            self._rendered += 1
+            rendered = self._rendered
+        return self._save_locked(text, rendered)
+
+    def _save_locked(self, text: str, rendered: int) -> int:
+        """Write the `rendered`th text rendered from the fragments, unless a
+        later one (which includes all of its changes) has already been
+        written. Returns the time at which the file was last written.
+        """
+        with self._write_lock, file_lock(self.filepath):
+            if rendered > self._written_text:
+                write_data(self.filepath, text)
+                self._written_text = rendered
+                self._written = time.time_ns()
+            return self._written
+
+
+MAX_PARTITIONS = 1000
+
+
+class GuildDB:
+    """A database with a separate partition for each guild, for data that is
+    only ever used one guild at a time.
+    Do not instantiate this class directly; use database.get_guild_db()
+    instead.
+
+    Each partition is a DB stored in `<name>/<guild ID>.json` and loaded the
+    first time it is used. Once more than `max_partitions` partitions are
+    loaded, the least recently used ones are dropped; those that have changed
+    are kept until they have been written back on a worker thread (or straight
+    away, outside an event loop). Look partitions up again rather than holding on to
+    them, e.g. across an `await`; a partition that is dropped while something
+    still refers to it is reused by the next lookup, and is still saved by
+    save(). Always save partitions through the GuildDB rather than with their
+    own save() methods.
+
+    Read-only attributes:
+    - name -- str
+    - path -- str, the directory holding the partitions
+    - max_partitions -- int
+    - hits -- number of lookups of a partition that was loaded
+    - misses -- number of lookups that had to load a partition
+    - evictions -- number of partitions dropped to stay within max_partitions
+    - writebacks -- number of changed partitions written to disk
+    """
+
+    def __init__(self, db_name: str, db_path: Optional[str] = None, max_partitions: int = MAX_PARTITIONS,
+                 do_not_instantiate_directly=None):
+        if do_not_instantiate_directly != 'ok':
+            raise TypeError("Do not instantiate GuildDB object directly; use get_guild_db() instead")
+        self.name = db_name
+        self.path = path.join(db_path or DATA_DIR, db_name)
+        self.max_partitions = max_partitions
+        self.hits = self.misses = self.evictions = self.writebacks = 0
+        self._partitions = OrderedDict()
+        self._evicted = weakref.WeakValueDictionary()
+        # Evicted partitions that still need to be written back.
+        self._unwritten = {}
+        self._writer = None
+        # Snapshots are taken and written in order, so an older one can't
+        # overwrite a newer one.
+        self._write_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of partitions in memory."""
+        return len(self._partitions)
+
+    def __getitem__(self, guild_id: int) -> DB:
+        """Return the partition for a guild, loading it if necessary."""
+        guild_id = int(guild_id)
+        partition = self._partitions.get(guild_id)
+        if partition is not None:
+            self._partitions.move_to_end(guild_id)
+            self.hits += 1
+            return partition
+        self.misses += 1
+        partition = self._evicted.pop(guild_id, None)
+        if partition is None:
+            partition = self._load(guild_id)
+        self._partitions[guild_id] = partition
+        self._evict()
+        return partition
+
+    def is_loaded(self, guild_id: int) -> bool:
+        return int(guild_id) in self._partitions
+
+    def _load(self, guild_id: int) -> DB:
+        filepath = path.join(self.path, f'{guild_id}.json')
+        data = load_data(filepath, quiet=True) if path.exists(filepath) else {}
+        return DB(str(guild_id), self.path, 'ok', data=data)
+
+    def _evict(self) -> None:
+        while len(self._partitions) > self.max_partitions:
+            guild_id, partition = self._partitions.popitem(last=False)
+            self._evicted[guild_id] = partition
+            self.evictions += 1
+            if partition.dirty:
+                self._unwritten[guild_id] = partition
+        if not self._unwritten or self._writer is not None:
+            return
+        try:
+            self._writer = asyncio.get_running_loop().create_task(self._write_evicted())
+        except RuntimeError:
+            for guild_id, partition in list(self._unwritten.items()):
+                if self._write_back(partition):
+                    del self._unwritten[guild_id]
+
+    async def _write_evicted(self) -> None:
+        try:
+            while self._unwritten:
+                unwritten, self._unwritten = self._unwritten, {}
+                failed = await self._write_async(list(unwritten.values()))
+                if failed:
+                    # Keep them rather than lose the changes; try again with
+                    # the next eviction.
+                    self._unwritten.update((int(partition.name), partition) for partition in failed)
+                    break
+        finally:
+            self._writer = None
+
+    def _dirty_partitions(self) -> List[DB]:
+        partitions = list(self._partitions.values()) + list(self._evicted.values())
+        return [partition for partition in partitions if partition.dirty]
+
+    def _write_back(self, partition: DB) -> bool:
+        if not partition.dirty:
+            return True
+        if not self._write(partition.filepath, json.dumps(partition, indent='\t') if partition else None):
+            return False
+        partition.dirty.clear()
+        self.writebacks += 1
+        return True
+
+    @staticmethod
+    def _write(filepath: str, text: Optional[str]) -> bool:
+        """Write a partition, or delete its file if `text` is None (because
+        it is empty).
+        """
+        if text is not None:
+            # There can be a great many partitions, so don't double the number
+            # of files with checksums.
+            return write_data(filepath, text, quiet=True, checksum=False)
+        try:
+            remove(filepath)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            l.warning(f"Error removing {path.relpath(filepath)!r}")
+            return False
+        return True
+
+    def save(self) -> None:
+        """Write every changed partition to disk."""
+        for partition in self._dirty_partitions():
+            self._write_back(partition)
+
+    async def save_async(self) -> None:
+        """Like save(), but pretty-print and write the files on a worker
+        thread (see DB.save_async()).
+        """
+        await self._write_async(self._dirty_partitions())
+
+    async def _write_async(self, partitions: List[DB]) -> List[DB]:
+        """Write changed partitions on a worker thread, returning the ones
+        that couldn't be written.
+        """
+        async with self._write_lock:
+            partitions = [partition for partition in partitions if partition.dirty]
+            snapshots = [(partition.filepath, json.dumps(partition) if partition else None) for partition in partitions]
+            dirty = [partition.dirty.copy() for partition in partitions]
+            for partition in partitions:
+                partition.dirty.clear()
+            failed = await get_executor().run(self._write_snapshots, snapshots, timeout=None)
+            for i in failed:
+                partitions[i].dirty |= dirty[i]
+            self.writebacks += len(partitions) - len(failed)
+            return [partitions[i] for i in failed]
+
+    @classmethod
+    def _write_snapshots(cls, snapshots) -> List[int]:
+        """Write compact snapshots, returning the indices of the ones that
+        couldn't be written.
+        """
+        failed = []
+        for i, (filepath, snapshot) in enumerate(snapshots):
+            text = None if snapshot is None else json.dumps(json.loads(snapshot), indent='\t')
+            if not cls._write(filepath, text):
+                failed.append(i)
+        return failed
 
 
 _DATABASES = {}
+_GUILD_DATABASES = {}
+
+
+def is_loaded(db_name: str) -> bool:
+    return db_name in _DATABASES
+
+
+async def save_all_async() -> None:
+    """Save every loaded DB and GuildDB that has unsaved changes."""
+    for db in list(_DATABASES.values()):
+        if db.dirty:
+            await db.save_async()
+    for guild_db in list(_GUILD_DATABASES.values()):
+        await guild_db.save_async()
 
 
 def get_db(db_name: str, db_path: Optional[str] = None) -> DB:
     if db_name not in _DATABASES:
         _DATABASES[db_name] = DB(db_name, db_path, 'ok')
     return _DATABASES[db_name]
+
+
+def get_guild_db(db_name: str, db_path: Optional[str] = None, max_partitions: int = MAX_PARTITIONS) -> GuildDB:
+    if db_name not in _GUILD_DATABASES:
+        _GUILD_DATABASES[db_name] = GuildDB(db_name, db_path, max_partitions, 'ok')
+    return _GUILD_DATABASES[db_name]
+
+
+def guild_dbs() -> List[GuildDB]:
+    return list(_GUILD_DATABASES.values())
+
+
+async def preload(exclude=(), directory: str = DATA_DIR) -> None:
+    """Load every database in `directory` that isn't loaded yet, so that the
+    first command to use each one doesn't have to wait for it to be parsed.
+    The files are read and parsed in parallel on the shared executor.
+    `exclude` is a collection of file names to skip.
+    """
+    if not path.isdir(directory):
+        return
+    start = time.perf_counter()
+    names = []
+    for filename in sorted(listdir(directory)):
+        name, ext = path.splitext(filename)
+        if ext == '.json' and filename not in exclude and name not in _DATABASES:
+            names.append(name)
+    await asyncio.gather(*(_preload(name, directory) for name in names))
+    l.info(f"Preloaded {len(names)} data files in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+
+async def _preload(name: str, directory: str) -> None:
+    fullpath = path.join(directory, name + '.json')
+    try:
+        process = (cpu_count() or 1) > 1 and path.getsize(fullpath) > PROCESS_THRESHOLD
+        data, seconds = await get_executor().run(read_data, fullpath, process=process, timeout=None)
+    except Exception:
+        # Leave it to load_data() to report the error and back up the file.
+        data = None
+    else:
+        _loaded(fullpath, seconds)
+    if name not in _DATABASES:
+        _DATABASES[name] = DB(name, directory, 'ok', data=data)
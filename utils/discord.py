@@ -1,9 +1,14 @@
+from collections import OrderedDict
 from discord.ext import commands
-from typing import Callable, List, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import asyncio
 import discord
+import time
+import weakref
 
-from constants import colors, emoji, strings
+from constants import colors, emoji, info, strings
+from . import l, timers
+from .stats import timed, timed_send
 
 
 # https://birdie0.github.io/discord-webhooks-guide/other/field_limits.html
@@ -12,11 +17,66 @@ MAX_EMBED_FIELDS = 25
 MAX_EMBED_VALUE = 1024
 MAX_EMBED_TOTAL = 6000
 
+# Application commands need a newer API version than discord.py 1.7 uses.
+API_BASE = 'https://discord.com/api/v8'
+
+
+class Route(discord.http.Route):
+    """A route for requests that discord.py has no method for, such as
+    interaction responses and webhook executions.
+    """
+
+    BASE = API_BASE
+
+    def __init__(self, method: str, path: str, **parameters):
+        super().__init__(method, path, **parameters)
+        # discord.py holds a bucket's lock for the whole request, so give each
+        # interaction and webhook its own bucket, as Discord does.
+        self.token = parameters.get('interaction_token', parameters.get('webhook_token'))
+
+    @property
+    def bucket(self):
+        return f'{super().bucket}:{self.token}'
+
 
 def fake_mention(user):
     return f"{user.name}#{user.discriminator}"
 
 
+# Members that had to be fetched because they weren't in discord.py's member
+# cache (e.g. because member caching is disabled by the memory profile).
+MEMBER_CACHE_SIZE = 256
+_FETCHED_MEMBERS = OrderedDict()
+
+
+async def get_member(guild: discord.Guild, member_id: int) -> Optional[discord.Member]:
+    """Return a member of a guild, fetching it from Discord if it isn't cached.
+    Returns None if the user is not a member of the guild.
+    """
+    member = guild.get_member(member_id)
+    if member is not None:
+        return member
+    key = (guild.id, member_id)
+    try:
+        _FETCHED_MEMBERS.move_to_end(key)
+        return _FETCHED_MEMBERS[key]
+    except KeyError:
+        pass
+    try:
+        member = await guild.fetch_member(member_id)
+    except discord.NotFound:
+        return None
+    _FETCHED_MEMBERS[key] = member
+    if len(_FETCHED_MEMBERS) > MEMBER_CACHE_SIZE:
+        _FETCHED_MEMBERS.popitem(last=False)
+    return member
+
+
+async def get_member_mention(guild: discord.Guild, member_id: int) -> str:
+    member = await get_member(guild, member_id)
+    return member.mention if member else f"<@{member_id}>"
+
+
 MESSAGE_LINK_FORMAT = 'https://discordapp.com/channels/{guild.id}/{channel.id}/{message_id}'
 
 
@@ -48,89 +108,359 @@ def _split_text(p: str, max_len: int) -> Tuple[str, str]:
     return p[:i], p[i:].strip()
 
 
-def split_embed(embed: discord.Embed) -> List[discord.Embed]:
+class FieldChunk:
+    """A piece of an embed field waiting to be placed by split_embed().
+    Uses about 64 bytes per instance, versus about 184 for an equivalent dict
+    (CPython 3.11, 64-bit; see benchmarks/record_memory.py).
+    """
+
+    __slots__ = ('name', 'value', 'inline', 'continued')
+
+    def __init__(self, name: str, value: str, inline: bool, continued: bool):
+        self.name = name
+        self.value = value
+        self.inline = inline
+        self.continued = continued
+
+
+def split_embed(embed: discord.Embed, *, page_numbers: bool = True) -> List[discord.Embed]:
     """Split an embed as needed in order to avoid hitting Discord's size limits.
-    Inline fields that are too long will be made non-inline.
+    Inline fields that are too long will be made non-inline. If `page_numbers`
+    is True and the embed had to be split, each footer is suffixed with the page
+    number.
     """
+    embeds = list(iter_split_embed(embed))
+    if len(embeds) > 1 and page_numbers:
+        if embed.footer:
+            footer_icon_url = embed.footer.icon_url
+            footer_text = embed.footer.text + f" ({{}}/{len(embeds)})"
+        else:
+            footer_icon_url = embed.footer.icon_url
+            footer_text = f"{{}}/{len(embeds)}"
+        for i, new_embed in enumerate(embeds):
+            new_embed.set_footer(
+                text=footer_text.format(i + 1),
+                icon_url=footer_icon_url,
+            )
+    return embeds
+
+
+def iter_split_embed(embed: discord.Embed) -> Iterator[discord.Embed]:
+    """Like split_embed(), but without page numbers, and each page is only
+    built when the previous one has been consumed (see paginate_embed()).
+    """
+    def finish(page: discord.Embed) -> discord.Embed:
+        if embed.footer:
+            page.set_footer(text=embed.footer.text, icon_url=embed.footer.icon_url)
+        page.url = embed.url
+        page.timestamp = embed.timestamp
+        return page
+
     description = embed.description
     empty_embed = discord.Embed(color=embed.color)
-    embeds = [discord.Embed(color=embed.color, title=embed.title)]
+    page = discord.Embed(color=embed.color, title=embed.title)
     while description:
-        embeds[-1].description, description = _split_text(description, 2048)
-        embeds.append(empty_embed.copy())
-    length = len(embed.title) + len(embed.description)
-    # TODO test handling of description
-    field_stack = [{
-        'name': field.name.strip(),
-        'value': field.value.strip(),
-        'inline': field.inline,
-        'continued': False,
-    } for field in reversed(embed.fields)]
-    if not field_stack:
-        del embeds[-1]
+        if page.description:
+            yield finish(page)
+            page = empty_embed.copy()
+        page.description, description = _split_text(description, 2048)
+    # Fields start on the same embed as the end of the description.
+    length = len(page.title) + len(page.description)
+    # Leave room for the footer and page numbers.
+    max_length = MAX_EMBED_TOTAL - len(embed.footer.text or '') - 10
+    field_stack = [
+        FieldChunk(field.name.strip(), field.value.strip(), field.inline, False)
+        for field in reversed(embed.fields)
+    ]
     while field_stack:
         field = field_stack.pop()
-        name = field['name']
-        value = field['value']
+        name = field.name
+        value = field.value
         if value and len(value) >= MAX_EMBED_VALUE:
             former, latter = _split_text(value, MAX_EMBED_VALUE)
             # This is a LIFO stack, so push the latter field first.
-            field_stack.append({
-                'name': name,
-                'value': latter,
-                'inline': False,
-                'continued': True,
-            })
-            field_stack.append({
-                'name': name,
-                'value': former,
-                'inline': False,
-                'continued': field['continued']
-            })
+            field_stack.append(FieldChunk(name, latter, False, True))
+            field_stack.append(FieldChunk(name, former, False, field.continued))
         else:
+            if field.continued:
+                name += strings.CONTINUED
             field_length = len(name or '') + len(value or '')
             length += field_length
-            too_many_fields = len(embeds[-1].fields) >= MAX_EMBED_FIELDS
-            # Subtract footer and some extra wiggle room
-            too_big_embed = length >= MAX_EMBED_TOTAL - len(embed.footer) - 10
+            too_many_fields = len(page.fields) >= MAX_EMBED_FIELDS
+            too_big_embed = length >= max_length
             if too_many_fields or too_big_embed:
-                embeds.append(empty_embed.copy())
+                yield finish(page)
+                page = empty_embed.copy()
                 length = field_length
-            if field['continued']:
-                field['name'] += strings.CONTINUED
-            del field['continued']
-            embeds[-1].add_field(**field)
-    if len(embeds) == 1:
-        embeds[0].set_footer(text=embed.footer.text, icon_url=embed.footer.icon_url)
-        embeds[0].url = embed.url
-        embeds[0].timestamp = embed.timestamp
-    else:
-        if embed.footer:
-            footer_icon_url = embed.footer.icon_url
-            footer_text = embed.footer.text + f" ({{}}/{len(embeds)})"
+            page.add_field(name=name, value=value, inline=field.inline)
+    yield finish(page)
+
+
+# Webhooks used to send bulk output, by channel ID.
+WEBHOOK_CACHE_SIZE = 256
+_WEBHOOKS = OrderedDict()
+# Locks that stop concurrent commands in a channel from creating a webhook
+# each, by channel ID. They're created when needed rather than at import
+# time, when the event loop (e.g. uvloop) may not be set up yet, and dropped
+# once nothing is waiting for them.
+_WEBHOOK_LOCKS = weakref.WeakValueDictionary()
+# Channels where finding or creating a webhook failed, mapped to the
+# time.monotonic() after which to try again.
+WEBHOOK_RETRY = 60
+_WEBHOOK_FAILURES = OrderedDict()
+
+
+async def get_webhook(channel: discord.abc.Messageable) -> Optional[dict]:
+    """Return the webhook (as a payload with 'id' and 'token') that the bot
+    uses to send bulk output to a channel, creating it if necessary. Returns
+    None if the bot isn't allowed to manage webhooks in the channel, or if
+    finding or creating one failed in the last WEBHOOK_RETRY seconds.
+    """
+    try:
+        _WEBHOOKS.move_to_end(channel.id)
+        return _WEBHOOKS[channel.id]
+    except KeyError:
+        pass
+    if _WEBHOOK_FAILURES.get(channel.id, 0) > time.monotonic():
+        return None
+    me = getattr(getattr(channel, 'guild', None), 'me', None)
+    if not isinstance(channel, discord.TextChannel) or me is None or not channel.permissions_for(me).manage_webhooks:
+        return None
+    lock = _WEBHOOK_LOCKS.get(channel.id)
+    if lock is None:
+        lock = _WEBHOOK_LOCKS[channel.id] = asyncio.Lock()
+    async with lock:
+        if channel.id in _WEBHOOKS:
+            return _WEBHOOKS[channel.id]
+        if _WEBHOOK_FAILURES.get(channel.id, 0) > time.monotonic():
+            return None
+        state = channel._state
+        try:
+            for data in await state.http.channel_webhooks(channel.id):
+                if data.get('token') and int(data.get('user', {}).get('id', 0)) == state.user.id:
+                    webhook = data
+                    break
+            else:
+                webhook = await state.http.create_webhook(channel.id, name=state.user.name)
+        except discord.HTTPException as exc:
+            l.warning(f"Failed to get a webhook for channel {channel.id}: {exc}")
+            _WEBHOOK_FAILURES.pop(channel.id, None)
+            _WEBHOOK_FAILURES[channel.id] = time.monotonic() + WEBHOOK_RETRY
+            if len(_WEBHOOK_FAILURES) > WEBHOOK_CACHE_SIZE:
+                _WEBHOOK_FAILURES.popitem(last=False)
+            return None
+        _WEBHOOK_FAILURES.pop(channel.id, None)
+        _WEBHOOKS[channel.id] = webhook
+        if len(_WEBHOOKS) > WEBHOOK_CACHE_SIZE:
+            _WEBHOOKS.popitem(last=False)
+        return webhook
+
+
+async def _webhook_send(ctx: commands.Context, webhook: dict, embeds: List[discord.Embed]) -> discord.Message:
+    user = ctx.bot.user
+    data = await ctx.bot.http.request(Route(
+        'POST', '/webhooks/{webhook_id}/{webhook_token}?wait=true',
+        webhook_id=webhook['id'], webhook_token=webhook['token'],
+    ), json={
+        'username': user.name,
+        'avatar_url': str(user.avatar_url),
+        'embeds': [embed.to_dict() for embed in embeds],
+    })
+    return ctx.bot._connection.create_message(channel=ctx.channel, data=data)
+
+
+async def send_embeds(ctx: commands.Context, embeds: List[discord.Embed], *, typing: bool = True) -> List[discord.Message]:
+    """Send several embeds in as few messages as possible.
+    If the `webhooks` config key is enabled, up to MAX_EMBEDS embeds are sent
+    in each message through the channel's webhook (see get_webhook()), which
+    has its own rate limit, separate from the bot's messages in the channel.
+    Commands invoked by interactions send follow-up messages instead, and
+    otherwise each embed is sent as a message with ctx.send(), showing the bot
+    as typing in between if `typing` is True.
+    """
+    chunks = [embeds[i:i + MAX_EMBEDS] for i in range(0, len(embeds), MAX_EMBEDS)]
+    messages = []
+    if getattr(ctx, 'interaction', None) is not None:
+        for chunk in chunks:
+            messages.append(await timed_send(ctx, embeds=chunk))
+        return messages
+    webhook = await get_webhook(ctx.channel) if info.WEBHOOKS and len(embeds) > 1 else None
+    while webhook is not None and chunks:
+        try:
+            messages.append(await timed(ctx.bot, _webhook_send(ctx, webhook, chunks[0])))
+        except (discord.Forbidden, discord.NotFound):
+            # The webhook was deleted or the bot lost permission to use it.
+            _WEBHOOKS.pop(ctx.channel.id, None)
+            webhook = None
         else:
-            footer_icon_url = embed.footer.icon_url
-            footer_text = f"{{}}/{len(embeds)}"
-        for i, new_embed in enumerate(embeds):
-            new_embed.set_footer(
-                text=footer_text.format(i + 1),
-                icon_url=footer_icon_url,
-            )
-            new_embed.url = embed.url
-            new_embed.timestamp = embed.timestamp
-    return embeds
+            chunks.pop(0)
+    remaining = [embed for chunk in chunks for embed in chunk]
+    if typing and len(remaining) > 1:
+        async with ctx.typing():
+            for embed in remaining[:-1]:
+                messages.append(await timed_send(ctx, embed=embed))
+        remaining = remaining[-1:]
+    for embed in remaining:
+        messages.append(await timed_send(ctx, embed=embed))
+    return messages
+
+
+async def send_split_embed(ctx: commands.Context, big_embed: discord.Embed, *, typing: bool = True) -> List[discord.Message]:
+    return await send_embeds(ctx, split_embed(big_embed), typing=typing)
+
+
+class ReactionRouter:
+    """Dispatch reaction events to handlers registered by message ID.
+    Every paginator on a bot shares a single router (see get_reaction_router()),
+    so a reaction costs one dictionary lookup no matter how many paginators are
+    open, instead of one check per open `wait_for()`.
+    The router listens for raw reaction events, so it works even after the
+    message has left discord.py's message cache.
+    Handlers are coroutine functions taking (emoji: str, user_id: int).
+    """
 
+    def __init__(self):
+        self.handlers = {}
 
-async def send_split_embed(ctx: commands.Context, big_embed: discord.Embed, *, typing: bool = True):
-    embeds = split_embed(big_embed)
-    if typing and len(embeds) > 1:
-        async with ctx.typing():
-            for embed in embeds[:-1]:
-                await ctx.send(embed=embed)
-        await ctx.send(embed=embeds[-1])
-    else:
-        for embed in embeds:
-            await ctx.send(embed=embed)
+    def register(self, message_id: int, handler: Callable) -> None:
+        self.handlers[message_id] = handler
+
+    def unregister(self, message_id: int) -> None:
+        self.handlers.pop(message_id, None)
+
+    async def on_reaction(self, payload: discord.RawReactionActionEvent):
+        handler = self.handlers.get(payload.message_id)
+        if handler is not None:
+            await handler(str(payload.emoji), payload.user_id)
+
+
+def get_reaction_router(bot) -> ReactionRouter:
+    """Return the bot's reaction router, creating it if necessary."""
+    router = getattr(bot, 'reaction_router', None)
+    if router is None:
+        router = bot.reaction_router = ReactionRouter()
+        # Removing a reaction also turns the page, since the bot might not be
+        # allowed to remove users' reactions.
+        bot.add_listener(router.on_reaction, 'on_raw_reaction_add')
+        bot.add_listener(router.on_reaction, 'on_raw_reaction_remove')
+    return router
+
+
+class Paginator:
+    """A single message showing one page at a time, with reactions to navigate.
+    `pages` is a function that returns an iterable (e.g. a generator) of
+    embeds. Pages are only rendered when they are needed, and only the
+    `cache_size` most recently rendered pages are kept; going back further than
+    that calls `pages()` again and skips forward. The paginator stops
+    responding after `timeout` seconds without any navigation.
+    """
+
+    EMOJIS = (emoji.FIRST_PAGE, emoji.PREVIOUS_PAGE, emoji.NEXT_PAGE, emoji.LAST_PAGE, emoji.STOP)
+
+    def __init__(self, ctx: commands.Context, pages: Callable[[], Iterable[discord.Embed]], *,
+                 timeout: int = 120, cache_size: int = 3):
+        self.ctx = ctx
+        self.pages = pages
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.index = 0
+        self.page_count = None
+        self.message = None
+        self._cache = OrderedDict()
+        self._iter = None
+        self._position = 0
+        self._timeout_handle = None
+
+    def _render(self, index: int) -> Optional[discord.Embed]:
+        """Return page `index`, or None if there is no such page."""
+        if index in self._cache:
+            self._cache.move_to_end(index)
+            return self._cache[index]
+        if self._iter is None or index < self._position:
+            self._iter = iter(self.pages())
+            self._position = 0
+        while self._position <= index:
+            try:
+                page = next(self._iter)
+            except StopIteration:
+                self.page_count = self._position
+                return None
+            self._cache[self._position] = page
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._position += 1
+        return self._cache[index]
+
+    def _page_with_footer(self, index: int) -> discord.Embed:
+        page = self._render(index).copy()
+        footer = f"Page {index + 1}"
+        if self.page_count is not None:
+            footer += f"/{self.page_count}"
+        if page.footer.text:
+            footer = f"{page.footer.text} ({footer})"
+        return page.set_footer(text=footer, icon_url=page.footer.icon_url)
+
+    def _reset_timeout(self) -> None:
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+        self._timeout_handle = timers.call_later(self.timeout, lambda: asyncio.ensure_future(self.stop()))
+
+    async def start(self) -> discord.Message:
+        if self._render(0) is None:
+            raise ValueError("Paginator has no pages")
+        # Peek at the next page to find out whether there is more than one.
+        self._render(1)
+        self.message = await timed_send(self.ctx, embed=self._page_with_footer(0))
+        if self.page_count != 1:
+            get_reaction_router(self.ctx.bot).register(self.message.id, self.on_reaction)
+            self._reset_timeout()
+            for e in self.EMOJIS:
+                await self.message.add_reaction(e)
+        return self.message
+
+    async def stop(self) -> None:
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+        get_reaction_router(self.ctx.bot).unregister(self.message.id)
+        self._cache.clear()
+        self._iter = None
+        try:
+            await self.message.clear_reactions()
+        except discord.HTTPException:
+            pass
+
+    async def on_reaction(self, e: str, user_id: int):
+        if user_id != self.ctx.author.id:
+            return
+        if e == emoji.STOP:
+            await self.stop()
+            return
+        if e == emoji.FIRST_PAGE:
+            index = 0
+        elif e == emoji.PREVIOUS_PAGE:
+            index = max(0, self.index - 1)
+        elif e == emoji.NEXT_PAGE:
+            index = self.index + 1
+        elif e == emoji.LAST_PAGE:
+            while self.page_count is None:
+                self._render(self._position)
+            index = self.page_count - 1
+        else:
+            return
+        self._reset_timeout()
+        if index == self.index or self._render(index) is None:
+            return
+        self.index = index
+        await self.message.edit(embed=self._page_with_footer(index))
+
+
+async def paginate_embed(ctx: commands.Context, big_embed: discord.Embed, **kwargs) -> discord.Message:
+    """Like send_split_embed(), but send a single message with a Paginator
+    instead of one message per page.
+    All keyword arguments are passed to Paginator().
+    """
+    return await Paginator(ctx, lambda: iter_split_embed(big_embed), **kwargs).start()
 
 
 async def safe_bulk_delete(messages: List[discord.Message]):
@@ -143,53 +473,100 @@ async def safe_bulk_delete(messages: List[discord.Message]):
                 await m.delete()
 
 
+class PendingPrompt:
+    """The state of a prompt waiting in wait_for_response(): which channel,
+    user, and message a response must match, and the caller's extra checks.
+    Its bound methods are used as the event checks, which is cheaper than a
+    pair of closures over the whole context: about 290 bytes per prompt
+    including both bound methods, versus about 580 for the closures and their
+    cells (CPython 3.11, 64-bit; see benchmarks/record_memory.py).
+    """
+
+    __slots__ = ('channel_id', 'author_id', 'message_id', 'message_check', 'reaction_check')
+
+    def __init__(self, channel_id: int, author_id: int, message_id: int,
+                 message_check: Callable[[discord.Message], bool],
+                 reaction_check: Callable[[discord.RawReactionActionEvent], bool]):
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.message_id = message_id
+        self.message_check = message_check
+        self.reaction_check = reaction_check
+
+    def check_message(self, msg: discord.Message) -> bool:
+        return (
+            msg.channel.id == self.channel_id
+            and msg.author.id == self.author_id
+            and self.message_check(msg)
+        )
+
+    def check_reaction(self, payload: discord.RawReactionActionEvent) -> bool:
+        return (
+            payload.message_id == self.message_id
+            and payload.user_id == self.author_id
+            and self.reaction_check(payload)
+        )
+
+
 async def wait_for_response(ctx: commands.Context,
                             m: discord.Message,
                             message_check: Callable[[discord.Message], bool],
-                            reaction_check: Callable[[discord.Reaction, discord.abc.User], bool],
+                            reaction_check: Callable[[discord.RawReactionActionEvent], bool],
                             *,
                             timeout: int):
     """Wait for either a reaction to m by ctx.author or a message by ctx.author
     in the same channel as m.
     Returns a tuple (response_type, response), where response_type is either
     'message' or 'reaction' and response is the discord.Message or
-    discord.Reaction object itself.
+    discord.RawReactionActionEvent object itself. Reactions are matched by
+    message ID, so m doesn't need to be in discord.py's message cache.
     Throws asyncio.TimeoutError if a timeout occurs.
     """
-    pending = ()
+    prompt = PendingPrompt(ctx.channel.id, ctx.author.id, m.id, message_check, reaction_check)
+    # A single timer on the shared timer wheel, instead of a timeout for each
+    # wait_for().
+    loop = asyncio.get_event_loop()
+    expired = loop.create_future()
+    timer = timers.call_later(timeout, _expire, expired)
+    # Wait for either ...
+    listeners = [
+        # ... a message containing, e.g. '!y', ...
+        ('message', loop.create_future(), prompt.check_message),
+        # ... or a reaction ...
+        ('raw_reaction_add', loop.create_future(), prompt.check_reaction),
+    ]
+    # ... or the timeout. These are the same listeners that bot.wait_for()
+    # adds, but registered here so that they can be removed straight away
+    # however the prompt ends; discord.py only drops cancelled ones the next
+    # time the event is dispatched.
+    for event, future, check in listeners:
+        ctx.bot._listeners.setdefault(event, []).append((future, check))
     try:
-        # Wait for either ...
-        done, pending = await asyncio.wait([
-            # ... a message containing, e.g. '!y', ...
-            ctx.bot.wait_for(
-                'message',
-                check=lambda msg: (
-                    msg.channel == ctx.channel
-                    and msg.author == ctx.author
-                    and message_check(msg)
-                ),
-                timeout=timeout,
-            ),
-            # ... or a reaction.
-            ctx.bot.wait_for(
-                'reaction_add',
-                check=lambda reaction, user: (
-                    reaction.message.id == m.id
-                    and user == ctx.author
-                    and reaction_check(reaction, user)
-                ),
-                timeout=timeout,
-            )
-        ], return_when=asyncio.FIRST_COMPLETED)
+        done, _ = await asyncio.wait([future for _, future, _ in listeners] + [expired],
+                                     return_when=asyncio.FIRST_COMPLETED)
+        done.discard(expired)
+        if not done:
+            raise asyncio.TimeoutError
         result = done.pop().result()
         if isinstance(result, discord.Message):
             return 'message', result
         else:
-            return 'reaction', result[0]
+            return 'reaction', result
     finally:
-        # Cancel anything that didn't complete.
-        for future in pending:
+        timer.cancel()
+        expired.cancel()
+        for event, future, check in listeners:
             future.cancel()
+            try:
+                ctx.bot._listeners[event].remove((future, check))
+            except (KeyError, ValueError):
+                # Already removed by discord.py when the event was dispatched.
+                pass
+
+
+def _expire(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
 
 
 class TransientMessageReact:
@@ -221,13 +598,13 @@ async def get_confirm(ctx, m, *, timeout=30):
                 ctx,
                 m,
                 lambda msg: msg.content in strings.CONFIRM_MSGS + strings.CANCEL_MSGS,
-                lambda reaction, user: reaction.emoji in emojis,
+                lambda payload: str(payload.emoji) in emojis,
                 timeout=timeout
             )
             if response_type == 'message':
                 return 'y' if response.content in strings.CONFIRM_MSGS else 'n'
             if response_type == 'reaction':
-                return 'y' if response.emoji == emoji.CONFIRM else 'n'
+                return 'y' if str(response.emoji) == emoji.CONFIRM else 'n'
         except asyncio.TimeoutError:
             return 't'
 
@@ -254,7 +631,7 @@ async def query_content(ctx, *, timeout: int = 30, allow_file: bool = False, cle
                 ctx,
                 m,
                 lambda msg: True,
-                lambda reaction, user: reaction.emoji == emoji.CANCEL,
+                lambda payload: str(payload.emoji) == emoji.CANCEL,
                 timeout=timeout,
             )
             if response_type == 'message':
@@ -299,12 +676,17 @@ async def invoke_command(ctx, command_name_to_invoke, *args, **kwargs):
 
 
 def sort_users(user_list):
-    def key(user):
-        if isinstance(user, discord.abc.User):
-            return user.display_name.lower()
-        else:
-            return user
-    return sorted(user_list, key=key)
+    """Sort users by display name, ignoring case. Anything without a display
+    name (e.g. a string) is sorted as is.
+    """
+    # Each key is computed only once; casefold() handles non-ASCII names
+    # properly, unlike lower().
+    return sorted(user_list, key=_user_sort_key)
+
+
+def _user_sort_key(user):
+    name = getattr(user, 'display_name', None)
+    return user if name is None else name.casefold()
 
 
 def print_embed(embed):
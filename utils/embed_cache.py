@@ -0,0 +1,108 @@
+"""Cache for embeds whose content only depends on the configuration.
+
+Builders are registered with @template and called at most once per set of
+arguments. get() returns the cached embed itself, which can't be modified
+(use its copy() method first if necessary). Call invalidate() whenever the
+configuration changes or extensions are reloaded.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict
+import discord
+
+from constants import colors
+
+
+MAX_EMBEDS = 256
+
+_BUILDERS: Dict[str, Callable[..., discord.Embed]] = {}
+_EMBEDS = OrderedDict()
+
+
+def _copy_dict(data: dict) -> dict:
+    """Copy the dictionary of an embed, whose values are strings, numbers,
+    dictionaries of those, or lists of such dictionaries (the fields).
+    """
+    return {
+        key: [dict(item) for item in value] if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+        for key, value in data.items()
+    }
+
+
+class FrozenEmbed(discord.Embed):
+    """An embed that can't be modified, so that the dictionary sent to Discord
+    only has to be built once. to_dict() returns a copy of it, which is still
+    much faster than building it.
+    """
+
+    __slots__ = ('_dict',)
+
+    @classmethod
+    def freeze(cls, embed: discord.Embed) -> 'FrozenEmbed':
+        data = embed.to_dict()
+        frozen = cls.from_dict(_copy_dict(data))
+        frozen._dict = data
+        return frozen
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("FrozenEmbed can't be modified; use copy() first")
+
+    def __setattr__(self, name, value):
+        # from_dict() sets the attributes before freeze() sets _dict.
+        if hasattr(self, '_dict'):
+            self._frozen()
+        super().__setattr__(name, value)
+
+    __delattr__ = set_footer = set_image = set_thumbnail = set_author = remove_author = _frozen
+    add_field = insert_field_at = clear_fields = remove_field = set_field_at = _frozen
+
+    def to_dict(self):
+        return _copy_dict(self._dict)
+
+    def copy(self) -> discord.Embed:
+        """Return a modifiable copy of the embed."""
+        # Embed.from_dict() doesn't copy nested lists and dictionaries.
+        return discord.Embed.from_dict(_copy_dict(self._dict))
+
+
+def template(name: str):
+    """Register a function that builds the embed called `name`."""
+    def decorator(builder):
+        _BUILDERS[name] = builder
+        return builder
+    return decorator
+
+
+def get(name: str, *args) -> FrozenEmbed:
+    """Return the embed built by the template called `name` with the given
+    arguments, building it if it is not cached. At most MAX_EMBEDS embeds are
+    cached; the least recently used one is dropped to make room for a new one.
+    """
+    key = (name,) + args
+    embed = _EMBEDS.get(key)
+    if embed is None:
+        embed = _EMBEDS[key] = FrozenEmbed.freeze(_BUILDERS[name](*args))
+        if len(_EMBEDS) > MAX_EMBEDS:
+            _EMBEDS.popitem(last=False)
+    else:
+        _EMBEDS.move_to_end(key)
+    return embed
+
+
+def invalidate() -> None:
+    """Forget every cached embed."""
+    _EMBEDS.clear()
+
+
+@template('error')
+def error_embed(description: str, title: str = "Error") -> discord.Embed:
+    return discord.Embed(color=colors.ERROR, title=title, description=description)
+
+
+def error(description: str, title: str = "Error", *, cache: bool = False) -> discord.Embed:
+    """Return an error embed with the given description. Only pass
+    `cache=True` for fixed descriptions; ones that include details of the
+    error would just push other embeds out of the cache.
+    """
+    if cache:
+        return get('error', description, title)
+    return error_embed(description, title)
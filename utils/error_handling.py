@@ -2,13 +2,17 @@ from discord.ext import commands
 import discord
 import traceback
 
-from . import l
+from . import embed_cache, handover, l, suggest
+from .log import log_context
 from constants import colors, info
 
 
 async def on_command_error(ctx, exc, *args, **kwargs):
     command_name = ctx.command.qualified_name if ctx.command else "unknown command"
-    l.error(f"{str(exc)!r} encountered while executing command {command_name!r} (args: {args}; kwargs: {kwargs})")
+    l.error(f"{str(exc)!r} encountered while executing command {command_name!r} (args: {args}; kwargs: {kwargs})", extra=log_context(ctx))
+    # Only cache embeds for messages that don't include any details of the
+    # error (see embed_cache.error()).
+    cache = False
     if isinstance(exc, commands.UserInputError):
         if isinstance(exc, commands.MissingRequiredArgument):
             description = f"Missing required argument `{exc.param.name}`."
@@ -22,11 +26,17 @@ async def on_command_error(ctx, exc, *args, **kwargs):
             description = "Bad user input."
         description += f"\n\nRun `{info.COMMAND_PREFIX}help {command_name}` to view the required arguments."
     elif isinstance(exc, commands.CommandNotFound):
-        # description = f"Could not find command `{ctx.invoked_with.split()[0]}`."
-        return
+        suggestions = suggest.suggest_throttled(ctx, ctx.invoked_with)
+        if not suggestions:
+            return
+        description = f"Could not find command `{ctx.invoked_with}`. {suggest.did_you_mean(ctx.prefix, suggestions)}"
     elif isinstance(exc, commands.CheckFailure):
-        if isinstance(exc, commands.NoPrivateMessage):
+        if isinstance(exc, handover.Restarting):
+            description = "I'm restarting. Try again in a few seconds."
+            cache = True
+        elif isinstance(exc, commands.NoPrivateMessage):
             description = "Cannot be run in a private message channel."
+            cache = True
         elif isinstance(exc, commands.MissingPermissions) or isinstance(exc, commands.BotMissingPermissions):
             if isinstance(exc, commands.MissingPermissions):
                 description = "You don't have permission to do that."
@@ -39,24 +49,24 @@ async def on_command_error(ctx, exc, *args, **kwargs):
             return
     elif isinstance(exc, commands.DisabledCommand):
         description = "That command is disabled."
+        cache = True
     elif isinstance(exc, commands.CommandOnCooldown):
-        description = "That command is on cooldown."
+        description = f"That command is on cooldown. Try again in {exc.retry_after:.1f} seconds."
+    elif isinstance(exc, commands.MaxConcurrencyReached):
+        description = "That command is already running. Wait for it to finish before running it again."
+        cache = True
     else:
         description = "Sorry, something went wrong. A team of highly trained monkeys has been dispatched to deal with the situation."
+        cache = True
         await log_error(ctx, exc.original, *args, **kwargs)
-    await ctx.send(embed=discord.Embed(
-        color=colors.ERROR,
-        title="Error",
-        description=description
-    ))
+    await ctx.send(embed=embed_cache.error(description, cache=cache))
 
 
 async def log_error(ctx, exc, *args, **kwargs):
     if not info.DAEMON:
-        for entry in traceback.format_tb(exc.__traceback__):
-            for line in entry.splitlines():
-                l.error(line)
-        l.error('')
+        command = ctx and ctx.command
+        l.error(f"Error in command {command.qualified_name!r}" if command else "Unhandled error",
+                exc_info=(type(exc), exc, exc.__traceback__), extra=log_context(ctx))
     else:
         embed = discord.Embed(
             color=colors.ERROR,
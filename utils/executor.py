@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from importlib import import_module
+from typing import Callable, Optional
+import asyncio
+import functools
+import multiprocessing
+import os
+
+
+DEFAULT_TIMEOUT = 10
+
+# Modules defining functions that cpu_bound() runs in the process pool, which
+# warm_up() imports in every worker.
+_PROCESS_MODULES = set()
+
+
+class Executor:
+    """Thread and process pools for running blocking or CPU-heavy work off the
+    event loop.
+    The process pool is only started the first time it is used, or by
+    warm_up(). Work that times out is cancelled if it has not started yet; work that is already running in
+    a thread or process cannot be interrupted and will run to completion in the
+    background.
+    """
+
+    def __init__(self, *, threads: Optional[int] = None, processes: Optional[int] = None):
+        self.threads = threads or min(32, (os.cpu_count() or 1) + 4)
+        self.processes = processes or os.cpu_count() or 1
+        self.thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='worker')
+        self.process_pool = None
+        self.in_flight = {'thread': 0, 'process': 0}
+        # Calls that returned, raised an exception and timed out.
+        self.completed = {'thread': 0, 'process': 0}
+        self.failed = {'thread': 0, 'process': 0}
+        self.timeouts = {'thread': 0, 'process': 0}
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self.process_pool
+
+    async def warm_up(self) -> None:
+        """Start the process pool's workers and import the modules of the
+        cpu_bound() functions in them, so that the first calls don't spend
+        their timeout doing so. Does nothing if no such functions have been
+        defined.
+        """
+        if not _PROCESS_MODULES:
+            return
+        pool = self._get_process_pool()
+        loop = asyncio.get_event_loop()
+        modules = sorted(_PROCESS_MODULES)
+        # Each call that finds no idle worker starts another one.
+        await asyncio.gather(*(loop.run_in_executor(pool, _import_modules, modules) for _ in range(self.processes)))
+
+    async def run(self, func: Callable, *args, process: bool = False, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """Run func(*args) in the thread pool (or the process pool if `process`
+        is True) and return the result.
+        Raises asyncio.TimeoutError if it takes longer than `timeout` seconds.
+        """
+        kind = 'process' if process else 'thread'
+        pool = self._get_process_pool() if process else self.thread_pool
+        self.in_flight[kind] += 1
+        try:
+            future = asyncio.get_event_loop().run_in_executor(pool, func, *args)
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts[kind] += 1
+            raise
+        except Exception:
+            self.failed[kind] += 1
+            raise
+        finally:
+            self.in_flight[kind] -= 1
+        self.completed[kind] += 1
+        return result
+
+    def report(self) -> dict:
+        """Return a dictionary describing the workers and queue of each pool."""
+        report = {}
+        for kind, workers in (('thread', self.threads), ('process', self.processes)):
+            in_flight = self.in_flight[kind]
+            report[kind] = {
+                'workers': workers,
+                'busy': min(in_flight, workers),
+                'queued': max(0, in_flight - workers),
+                'utilisation': min(in_flight, workers) / workers,
+                'completed': self.completed[kind],
+                'failed': self.failed[kind],
+                'timeouts': self.timeouts[kind],
+            }
+        return report
+
+    def shutdown(self) -> None:
+        self.thread_pool.shutdown(wait=False)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False)
+
+
+_EXECUTOR = None
+
+
+def configure(*, threads: Optional[int] = None, processes: Optional[int] = None) -> Executor:
+    """Replace the shared executor with one of the given size."""
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown()
+    _EXECUTOR = Executor(threads=threads, processes=processes)
+    return _EXECUTOR
+
+
+def get_executor() -> Executor:
+    if _EXECUTOR is None:
+        configure()
+    return _EXECUTOR
+
+
+def _import_modules(module_names) -> None:
+    for module_name in module_names:
+        import_module(module_name)
+
+
+def _call_wrapped(module_name: str, qualname: str, args, kwargs):
+    # Functions decorated with cpu_bound() can't be pickled directly, since
+    # their names refer to the wrapper; look up the original in the worker.
+    func = import_module(module_name)
+    for name in qualname.split('.'):
+        func = getattr(func, name)
+    return func.__wrapped__(*args, **kwargs)
+
+
+def cpu_bound(*, process: bool = True, timeout: Optional[float] = DEFAULT_TIMEOUT):
+    """Decorator that makes a (synchronous) function run on the shared
+    executor, turning it into a coroutine function.
+    By default the function runs in the process pool, so it must be defined at
+    module level and its arguments and return value must be picklable. Use
+    `process=False` for blocking I/O, which can run in the thread pool.
+    The original function is still available as `func.__wrapped__` for when
+    the work is small enough to be done inline.
+    """
+    def decorator(func):
+        if process:
+            _PROCESS_MODULES.add(func.__module__)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if process:
+                call = functools.partial(_call_wrapped, func.__module__, func.__qualname__, args, kwargs)
+            else:
+                call = functools.partial(func, *args, **kwargs)
+            return await get_executor().run(call, process=process, timeout=timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+"""Rolling restarts.
+
+The running bot starts a replacement process with spawn_replacement(). The
+replacement imports everything and loads its extensions, then reports that it
+is ready and waits (see standby()). Meanwhile the old process stops accepting
+commands, waits for the ones in progress to finish, and saves its databases.
+Once it has disconnected from Discord, it tells the replacement to connect.
+
+Only one process is ever connected to the gateway, so no events are handled
+twice and each restart costs a single IDENTIFY, just like a normal restart.
+"""
+from discord.ext import commands
+from typing import Optional
+import asyncio
+import os
+import subprocess
+import sys
+
+from . import l
+from .executor import get_executor
+
+
+HANDOVER_ENV = 'BOT_HANDOVER_FDS'
+READY = b'ready\n'
+GO = b'go\n'
+
+
+class Restarting(commands.CheckFailure):
+    """Raised for commands received while the bot is handing over to a new
+    process.
+    """
+
+
+class Replacement:
+    """A replacement bot process that has been started but not yet told to
+    connect.
+    """
+
+    def __init__(self, process: subprocess.Popen, read_fd: int, write_fd: int):
+        self.process = process
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait until the replacement is ready to take over. Returns False if it
+        exits or takes longer than `timeout` seconds.
+        """
+        try:
+            line = await get_executor().run(os.read, self.read_fd, len(READY), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return line == READY
+
+    def go(self) -> None:
+        """Tell the replacement to connect."""
+        os.write(self.write_fd, GO)
+        self.close()
+
+    def abort(self) -> None:
+        self.process.kill()
+        self.close()
+
+    def close(self) -> None:
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def spawn_replacement() -> Replacement:
+    """Start another instance of the bot in standby mode."""
+    parent_read, child_write = os.pipe()
+    child_read, parent_write = os.pipe()
+    env = dict(os.environ, **{HANDOVER_ENV: f'{child_read},{child_write}'})
+    process = subprocess.Popen(
+        [sys.executable] + sys.argv,
+        env=env,
+        pass_fds=(child_read, child_write),
+        # Don't let signals meant for this process (e.g. ^C) kill the new one.
+        start_new_session=True,
+    )
+    os.close(child_read)
+    os.close(child_write)
+    l.info(f"Started replacement process {process.pid}")
+    return Replacement(process, parent_read, parent_write)
+
+
+def standby(bot) -> Optional[bool]:
+    """If this process was started by spawn_replacement(), load all extensions,
+    report that the bot is ready and block until the previous process hands
+    over. Returns None if this process is not a replacement.
+    """
+    fds = os.environ.pop(HANDOVER_ENV, None)
+    if not fds:
+        return None
+    read_fd, write_fd = map(int, fds.split(','))
+    bot.loop.run_until_complete(bot.load_all_extensions())
+    os.write(write_fd, READY)
+    os.close(write_fd)
+    l.info("Waiting for the previous process to hand over...")
+    with os.fdopen(read_fd, 'rb') as f:
+        # If the previous process exits without handing over, take over anyway.
+        handed_over = f.readline() == GO
+    if not handed_over:
+        l.warning("Previous process exited without handing over")
+    return handed_over
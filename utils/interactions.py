@@ -0,0 +1,295 @@
+"""Application (slash) commands generated from the bot's prefix commands.
+
+discord.py 1.7 doesn't support interactions, so commands are registered over
+HTTP (see utils.discord.Route), and INTERACTION_CREATE events are handled by a
+parser added to the bot's connection state. Each option is derived from the
+same parameters that cogs.general.get_command_signature() describes. An interaction is acknowledged
+with a deferred response straight away. Then the command is invoked as if its
+options had been typed after the prefix, with a context whose send() edits
+the deferred response (and sends follow-up messages after that).
+
+Commands are only registered in the guilds listed in the
+'slash_command_guilds' config option, where the bot also ignores ordinary
+messages (see Bot.on_message()).
+"""
+from discord.ext import commands
+from typing import Iterable, List, Optional
+import discord
+import re
+import typing
+
+from . import l
+from .discord import Route
+
+
+# https://discord.com/developers/docs/interactions/slash-commands
+APPLICATION_COMMAND = 2
+DEFERRED_CHANNEL_MESSAGE = 5
+SUB_COMMAND = 1
+STRING = 3
+INTEGER = 4
+BOOLEAN = 5
+USER = 6
+CHANNEL = 7
+ROLE = 8
+NUMBER = 10
+
+OPTION_TYPES = {
+    str: STRING,
+    int: INTEGER,
+    bool: BOOLEAN,
+    float: NUMBER,
+    discord.Member: USER,
+    discord.User: USER,
+    discord.TextChannel: CHANNEL,
+    discord.Role: ROLE,
+}
+MENTION_FORMATS = {USER: '<@{}>', CHANNEL: '<#{}>', ROLE: '<@&{}>'}
+
+NAME_PATTERN = re.compile(r'^[\w-]{1,32}$')
+MAX_DESCRIPTION = 100
+
+
+def _unwrap(annotation) -> typing.Tuple[object, bool]:
+    """Return the type an annotation converts to and whether it is Optional."""
+    if getattr(annotation, '__origin__', None) is typing.Union and type(None) in annotation.__args__:
+        args = [arg for arg in annotation.__args__ if arg is not type(None)]
+        return args[0], True
+    return annotation, False
+
+
+def _description(text: Optional[str], default: str) -> str:
+    return (text or default)[:MAX_DESCRIPTION]
+
+
+def registrable(command: commands.Command) -> bool:
+    return not command.hidden and NAME_PATTERN.match(command.name) is not None
+
+
+def command_options(command: commands.Command) -> List[dict]:
+    """Return the options for a command, in the same order as its parameters.
+    A group that takes no parameters of its own has one sub-command option per
+    subcommand instead; subcommands of other groups are only available as
+    prefix commands.
+    """
+    if isinstance(command, commands.Group) and not command.clean_params:
+        return [{
+            'type': SUB_COMMAND,
+            'name': subcommand.name,
+            'description': _description(subcommand.short_doc, subcommand.name),
+            'options': command_options(subcommand),
+        } for subcommand in sorted(command.commands, key=lambda cmd: cmd.name) if registrable(subcommand)]
+    options = []
+    required = True
+    for name, param in command.clean_params.items():
+        annotation, optional = _unwrap(param.annotation)
+        description = name
+        if param.default not in (param.empty, None, ''):
+            description += f" (default {param.default})"
+        # Discord requires every required option to come before the optional
+        # ones.
+        required = required and not optional and param.default is param.empty and param.kind != param.VAR_POSITIONAL
+        options.append({
+            'type': OPTION_TYPES.get(annotation, STRING),
+            'name': name.lower(),
+            'description': _description(description, name),
+            'required': required,
+        })
+    return options
+
+
+def application_commands(bot: commands.Bot) -> List[dict]:
+    """Return the application command for every command that can have one."""
+    return [{
+        'name': command.name,
+        'description': _description(command.short_doc, command.name),
+        'options': command_options(command),
+    } for command in sorted(bot.commands, key=lambda cmd: cmd.name) if registrable(command)]
+
+
+def _quote(value: str) -> str:
+    if value and not any(c.isspace() or c == '"' for c in value):
+        return value
+    # discord.py only treats a backslash as an escape before a quote.
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def invocation(bot: commands.Bot, data: dict) -> str:
+    """Return the text that would invoke the command an interaction is for,
+    without the prefix.
+    """
+    words = [data['name']]
+    options = data.get('options', [])
+    command = bot.get_command(data['name'])
+    if options and options[0]['type'] == SUB_COMMAND:
+        words.append(options[0]['name'])
+        command = command and command.get_command(options[0]['name'])
+        options = options[0].get('options', [])
+    if command is None:
+        return ' '.join(words)
+    values = {option['name']: option for option in options}
+    # Defaults of omitted parameters, which are only needed if a later
+    # parameter is given.
+    skipped = []
+    for name, param in command.clean_params.items():
+        option = values.get(name.lower())
+        if option is None:
+            if param.default in (param.empty, None, ''):
+                break
+            skipped.append(_quote(str(param.default)))
+            continue
+        words.extend(skipped)
+        skipped = []
+        value = option['value']
+        if option['type'] in MENTION_FORMATS:
+            words.append(MENTION_FORMATS[option['type']].format(value))
+        elif option['type'] == BOOLEAN:
+            words.append('true' if value else 'false')
+        elif param.kind == param.KEYWORD_ONLY:
+            # This parameter consumes the rest of the message as is.
+            words.append(str(value))
+        else:
+            words.append(_quote(str(value)))
+    return ' '.join(words)
+
+
+class InteractionContext(commands.Context):
+    """A context for a command invoked by an interaction.
+    The first message sent replaces the deferred response and later ones are
+    sent as follow-up messages. Messages with files, text-to-speech or a nonce,
+    which webhook messages don't support here, are sent to the channel
+    normally.
+    """
+
+    interaction = None
+    responded = False
+
+    def _webhook_route(self, method: str, path: str = '') -> Route:
+        return Route(
+            method, '/webhooks/{application_id}/{interaction_token}' + path,
+            application_id=self.interaction['application_id'],
+            interaction_token=self.interaction['token'],
+        )
+
+    async def send(self, content=None, *, embed=None, embeds=None, **kwargs):
+        if kwargs.get('file') or kwargs.get('files') or kwargs.get('tts') or kwargs.get('nonce') is not None:
+            return await super().send(content, embed=embed, **kwargs)
+        payload = {
+            'content': None if content is None else str(content),
+            'embeds': [e.to_dict() for e in (embeds or ([embed] if embed else []))],
+        }
+        # Like Messageable.send(), merge with the bot's allowed mentions.
+        allowed_mentions = kwargs.get('allowed_mentions')
+        default = self._state.allowed_mentions
+        if allowed_mentions is None:
+            allowed_mentions = default
+        elif default is not None:
+            allowed_mentions = default.merge(allowed_mentions)
+        if allowed_mentions is not None:
+            payload['allowed_mentions'] = allowed_mentions.to_dict()
+        if self.responded:
+            route = self._webhook_route('POST')
+        else:
+            route = self._webhook_route('PATCH', '/messages/@original')
+        data = await self.bot.http.request(route, json=payload)
+        self.responded = True
+        message = self.bot._connection.create_message(channel=self.channel, data=data)
+        if kwargs.get('delete_after') is not None:
+            await message.delete(delay=kwargs['delete_after'])
+        return message
+
+    async def finish(self) -> None:
+        """Delete the deferred response if nothing has been sent, so that it
+        doesn't wait forever.
+        """
+        if not self.responded:
+            self.responded = True
+            try:
+                await self.bot.http.request(self._webhook_route('DELETE', '/messages/@original'))
+            except discord.HTTPException:
+                pass
+
+
+class SlashCommands:
+    """Registers application commands in the guilds in `guild_ids` and
+    invokes commands for the interactions the bot receives.
+    """
+
+    def __init__(self, bot: commands.Bot, guild_ids: Iterable[int]):
+        self.bot = bot
+        self.guild_ids = {int(guild_id) for guild_id in guild_ids}
+        # Maps guild IDs to the commands last registered in them.
+        self._registered = {}
+        if self.guild_ids:
+            bot._connection.parsers['INTERACTION_CREATE'] = self.parse_interaction_create
+
+    async def sync(self) -> None:
+        """Register the application commands in every guild whose commands
+        have changed since they were last registered.
+        """
+        if not self.guild_ids or self.bot.app_info is None:
+            return
+        schemas = application_commands(self.bot)
+        for guild_id in sorted(self.guild_ids):
+            if self._registered.get(guild_id) == schemas:
+                continue
+            try:
+                await self.bot.http.request(Route(
+                    'PUT', '/applications/{application_id}/guilds/{guild_id}/commands',
+                    application_id=self.bot.app_info.id, guild_id=guild_id,
+                ), json=schemas)
+            except discord.HTTPException as exc:
+                l.error(f"Failed to register application commands in guild {guild_id}: {exc}")
+            else:
+                self._registered[guild_id] = schemas
+                l.info(f"Registered {len(schemas)} application commands in guild {guild_id}")
+
+    def parse_interaction_create(self, data: dict) -> None:
+        if data.get('type') == APPLICATION_COMMAND:
+            self.bot.loop.create_task(self.handle(data))
+
+    async def handle(self, data: dict) -> None:
+        try:
+            # Discord only waits three seconds for a response.
+            await self.bot.http.request(Route(
+                'POST', '/interactions/{interaction_id}/{interaction_token}/callback',
+                interaction_id=data['id'], interaction_token=data['token'],
+            ), json={'type': DEFERRED_CHANNEL_MESSAGE})
+        except discord.HTTPException as exc:
+            l.error(f"Failed to acknowledge interaction {data['id']}: {exc}")
+            return
+        state = self.bot._connection
+        channel = self.bot.get_channel(int(data['channel_id']))
+        if channel is None:
+            l.warning(f"Received an interaction in unknown channel {data['channel_id']}")
+            return
+        member = dict(data['member'])
+        message = state.create_message(channel=channel, data={
+            'id': data['id'],
+            'channel_id': data['channel_id'],
+            'guild_id': data['guild_id'],
+            'author': member.pop('user'),
+            'member': member,
+            'content': '',
+            'timestamp': discord.utils.snowflake_time(int(data['id'])).isoformat(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+        })
+        prefix = await self.bot.get_prefix(message)
+        if not isinstance(prefix, str):
+            prefix = prefix[0]
+        message.content = prefix + invocation(self.bot, data['data'])
+        ctx = await self.bot.get_context(message, cls=InteractionContext)
+        ctx.interaction = data
+        await self.bot.invoke(ctx)
+        # Errors are handled in the background by on_command_error(), which
+        # finishes the context itself.
+        if ctx.command is not None and not ctx.command_failed:
+            await ctx.finish()
@@ -0,0 +1,154 @@
+"""Apply changes to data/config.json without restarting the bot.
+
+LiveConfig polls the config file's modification time. When it changes, the new
+file is validated and, if every live setting is valid, the corresponding
+attributes of constants.info are replaced and subscribers are notified. Code
+that reads `info.COMMAND_PREFIX` etc. at call time therefore sees the new
+values with no extra overhead; code that copied a value somewhere else (e.g.
+the bot's command_prefix) should subscribe to it instead.
+"""
+from os import path
+from typing import Any, Callable, Dict, List
+import asyncio
+import json
+import logging
+
+from . import l
+from .ratelimit import RateLimiter
+from constants import info
+
+
+POLL_INTERVAL = 5
+
+
+def _check_type(*types):
+    def validate(value):
+        if not isinstance(value, types):
+            raise ValueError(f"expected {' or '.join(t.__name__ for t in types)}, got {value!r}")
+    return validate
+
+
+def _check_prefix(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"expected a non-empty string, got {value!r}")
+
+
+def _check_log_level(value):
+    if not isinstance(logging.getLevelName(value), int):
+        raise ValueError(f"unknown log level {value!r}")
+
+
+def _check_str_list(value):
+    if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+        raise ValueError(f"expected a list of strings, got {value!r}")
+
+
+def _check_ratelimits(value):
+    if not isinstance(value, dict) or not all(isinstance(options, dict) for options in value.values()):
+        raise ValueError(f"expected an object mapping names to objects, got {value!r}")
+    RateLimiter(value)
+
+
+# Maps config keys to (attribute of constants.info, default, validator) for
+# every setting that can change while the bot is running. The defaults must
+# match constants/info.py.
+SETTINGS = {
+    'prefix': ('COMMAND_PREFIX', '!', _check_prefix),
+    'dev': ('DEV', False, _check_type(bool)),
+    'log_level': ('LOG_LEVEL', 'INFO', _check_log_level),
+    'disabled_extensions': ('DISABLED_EXTENSIONS', [], _check_str_list),
+    'ratelimits': ('RATELIMITS', {}, _check_ratelimits),
+}
+
+
+class LiveConfig:
+    """Watch a config DB's file and apply changes to live settings.
+
+    Subscribe to a setting with `subscribe(key, callback)`; the callback is
+    called with the new value each time it changes. Changes to other keys
+    are saved in the DB but only take effect after a restart.
+    """
+
+    def __init__(self, db, *, interval: float = POLL_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self.subscribers: Dict[str, List[Callable[[Any], None]]] = {}
+        self.mtime = self._mtime()
+        self.task = None
+
+    def _mtime(self):
+        try:
+            return path.getmtime(self.db.filepath)
+        except OSError:
+            return None
+
+    def subscribe(self, key: str, callback: Callable[[Any], None]) -> None:
+        if key not in SETTINGS:
+            raise KeyError(f"{key!r} is not a live setting")
+        self.subscribers.setdefault(key, []).append(callback)
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_event_loop().create_task(self._poll())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                l.exception("Error applying config changes")
+
+    def check(self) -> bool:
+        """Reload the config file if it has changed since the last check.
+        Returns True if the new config was applied.
+        """
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        try:
+            with open(self.db.filepath, encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+        except (OSError, ValueError) as exc:
+            # Don't use load_data(), which would move the file out of the way;
+            # it may just be half-written.
+            l.warning(f"Ignoring invalid config file {self.db.filepath!r}: {exc}")
+            return False
+        return self.apply(data)
+
+    def apply(self, data: dict) -> bool:
+        """Validate `data` and, if it is valid, make it the new config.
+        Returns True if it was applied.
+        """
+        changed = {}
+        for key, (attr, default, validate) in SETTINGS.items():
+            value = data.get(key, default)
+            try:
+                validate(value)
+            except (TypeError, ValueError) as exc:
+                l.warning(f"Ignoring config change because {key!r} is invalid: {exc}")
+                return False
+            if value != getattr(info, attr):
+                changed[key] = value
+        restart_keys = sorted(
+            key for key in set(data) | set(self.db)
+            if key not in SETTINGS and data.get(key) != self.db.get(key)
+        )
+        self.db.reload(data)
+        if restart_keys:
+            l.warning(f"Config keys {', '.join(restart_keys)} changed; restart the bot to apply them")
+        for key, value in changed.items():
+            setattr(info, SETTINGS[key][0], value)
+            l.info(f"Config {key!r} changed to {value!r}")
+        for key, value in changed.items():
+            for callback in self.subscribers.get(key, ()):
+                callback(value)
+        return True
@@ -0,0 +1,126 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+import copy
+import json
+import logging
+import queue
+
+
+LOG_FMT = "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
+
+# Extra fields that may be attached to a record with log_context().
+CONTEXT_FIELDS = ('guild', 'channel', 'command', 'latency')
+
+
+class JSONFormatter(logging.Formatter):
+    """Format each record as a single line of JSON, including any context
+    fields attached with log_context().
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['traceback'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LocalQueueHandler(QueueHandler):
+    """A QueueHandler for a queue in the same process. Unlike QueueHandler, it
+    doesn't format records before queueing them (which would happen on the
+    logging thread and discard `exc_info` before JSONFormatter sees it); it
+    only merges the arguments into the message, in case they change before
+    the sink formats it.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Only let one in every `rate` records through for each sampling key.
+    Records opt into sampling by passing `extra={'sample': '<key>'}`; all other
+    records are unaffected. The number of records dropped since the last one
+    that passed is attached to the next record as `suppressed`.
+    """
+
+    def __init__(self, rate: int = 1):
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self.counts = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or self.rate == 1:
+            return True
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        if count % self.rate:
+            return False
+        if count:
+            record.suppressed = self.rate - 1
+            record.msg = f"{record.msg} (+{record.suppressed} similar)"
+        return True
+
+
+def log_context(ctx=None, **kwargs) -> dict:
+    """Return a dictionary suitable for the `extra` argument of a logging call,
+    describing the guild, channel, and command of a command context, and how
+    long the command took in seconds once it has finished (see
+    Stats.command_finished()). Keyword arguments are included as-is.
+    """
+    extra = {}
+    if ctx is not None:
+        extra['guild'] = ctx.guild.id if ctx.guild else None
+        extra['channel'] = ctx.channel.id
+        extra['command'] = ctx.command.qualified_name if ctx.command else None
+        extra['latency'] = getattr(ctx, 'latency', None)
+    extra.update(kwargs)
+    return extra
+
+
+def setup_logging(*,
+                  filename: Optional[str] = None,
+                  json_format: bool = False,
+                  max_bytes: int = 5 * 1024 * 1024,
+                  backup_count: int = 5,
+                  sample_rate: int = 1) -> QueueListener:
+    """Configure the root logger to hand records off to a background thread.
+    Loggers only ever put records on a queue; formatting and writing to the
+    sink (a rotating file if `filename` is given, otherwise stderr) happen on
+    the listener's thread, so a slow disk can't stall the event loop.
+    Returns the running QueueListener; call its stop() method at exit to flush
+    any records still in the queue.
+    """
+    if filename:
+        sink = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    else:
+        sink = logging.StreamHandler()
+    sink.setFormatter(JSONFormatter() if json_format else logging.Formatter(LOG_FMT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, sink, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from discord.ext import commands
+from typing import Dict, List, Optional
+import math
+import time
+
+
+SCOPES = {
+    'user': commands.BucketType.user,
+    'channel': commands.BucketType.channel,
+    'guild': commands.BucketType.guild,
+}
+
+
+class Limit:
+    """A rate limit for a command, cog, or everything ('*'), as configured in
+    config.json:
+
+        "ratelimits": {
+            "roll": {"rate": 5, "per": 10, "scope": "user", "concurrency": 1},
+            "Random": {"rate": 20, "per": 60, "scope": "channel"}
+        }
+
+    This allows `rate` invocations every `per` seconds for each user, channel,
+    or guild (depending on `scope`) and, if `concurrency` is given, at most that
+    many invocations in flight at once for each user/channel/guild. A limit for
+    a group (e.g. "admin") also applies to its subcommands, and a limit for a
+    subcommand is written with its full name (e.g. "admin update").
+    `rate` and `per` must be positive numbers and `concurrency` a positive
+    integer; anything else raises ValueError.
+    """
+
+    __slots__ = ('name', 'rate', 'per', 'scope', 'concurrency')
+
+    def __init__(self, name: str, *, rate: Optional[int] = None, per: float = 60,
+                 scope: str = 'user', concurrency: Optional[int] = None):
+        if scope not in SCOPES:
+            raise ValueError(f"Invalid rate limit scope {scope!r} for {name!r}")
+        for option, value, types in (('rate', rate, (int, float)), ('per', per, (int, float)),
+                                     ('concurrency', concurrency, int)):
+            if value is None and option != 'per':
+                continue
+            if isinstance(value, bool) or not isinstance(value, types) or not math.isfinite(value) or value <= 0:
+                raise ValueError(f"Invalid rate limit {option} {value!r} for {name!r}")
+        self.name = name
+        self.rate = rate
+        self.per = per
+        self.scope = scope
+        self.concurrency = concurrency
+
+    def key(self, ctx) -> tuple:
+        if self.scope == 'user':
+            scope_id = ctx.author.id
+        elif self.scope == 'guild' and ctx.guild is not None:
+            scope_id = ctx.guild.id
+        else:
+            scope_id = ctx.channel.id
+        return (self.name, scope_id)
+
+
+def invoked_command(ctx) -> commands.Command:
+    """Return the command that ctx is going to invoke, following subcommands
+    as Group.invoke() does, without consuming any of the message. This assumes
+    that the subcommand's name comes right after its group's.
+    """
+    command = ctx.command
+    view = ctx.view
+    index, previous = view.index, view.previous
+    try:
+        while isinstance(command, commands.Group):
+            view.skip_ws()
+            subcommand = command.all_commands.get(view.get_word())
+            if subcommand is None:
+                break
+            command = subcommand
+    finally:
+        view.index, view.previous = index, previous
+    return command
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated', 'full_at')
+
+    def __init__(self, rate: int, now: float):
+        self.tokens = rate
+        self.updated = now
+        self.full_at = now
+
+    def take(self, limit: Limit, now: float) -> float:
+        """Take a token if there is one and return 0; otherwise return the
+        number of seconds until there will be one.
+        """
+        self.tokens = min(limit.rate, self.tokens + (now - self.updated) * limit.rate / limit.per)
+        self.updated = now
+        if self.tokens < 1:
+            return (1 - self.tokens) * limit.per / limit.rate
+        self.tokens -= 1
+        self.full_at = now + (limit.rate - self.tokens) * limit.per / limit.rate
+        return 0
+
+
+class RateLimiter:
+    """Token-bucket rate limits and concurrency limits for commands.
+    At most `max_buckets` buckets are kept; the least recently used bucket is
+    dropped to make room for a new one, and buckets that have refilled
+    completely are dropped since they are indistinguishable from new ones.
+    """
+
+    def __init__(self, config: Optional[dict] = None, *, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+        self.in_flight: Dict[tuple, int] = {}
+        self.limits: Dict[str, Limit] = {}
+        self.configure(config or {})
+
+    def configure(self, config: dict) -> None:
+        """Replace all limits with the ones in `config` (see Limit)."""
+        self.limits = {name: Limit(name, **options) for name, options in config.items()}
+        self.buckets.clear()
+
+    def limits_for(self, ctx, command: Optional[commands.Command] = None) -> List[Limit]:
+        """Return the limits for `command` (by default ctx.command), its parent
+        groups, its cog and every command.
+        """
+        command = command or ctx.command
+        names = [command.qualified_name, *(parent.qualified_name for parent in command.parents),
+                 command.cog_name, '*']
+        return [self.limits[name] for name in names if name in self.limits]
+
+    def _expire(self, now: float) -> None:
+        buckets = self.buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if bucket.full_at > now and len(buckets) < self.max_buckets:
+                break
+            del buckets[key]
+
+    def check(self, ctx) -> bool:
+        """Take a token from each bucket that applies to the command.
+        Raises commands.CommandOnCooldown if any of them is empty.
+        """
+        if not self.limits:
+            return True
+        now = time.monotonic()
+        self._expire(now)
+        # This runs once, before a group has looked up its subcommand.
+        for limit in self.limits_for(ctx, invoked_command(ctx)):
+            if limit.rate is None:
+                continue
+            key = limit.key(ctx)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(limit.rate, now)
+            else:
+                self.buckets.move_to_end(key)
+            retry_after = bucket.take(limit, now)
+            if retry_after:
+                cooldown = commands.Cooldown(limit.rate, limit.per, SCOPES[limit.scope])
+                raise commands.CommandOnCooldown(cooldown, retry_after)
+        return True
+
+    def acquire(self, ctx) -> None:
+        """Count an invocation as in flight, raising
+        commands.MaxConcurrencyReached if that would exceed a concurrency limit.
+        Every successful call must be matched by a call to release().
+        """
+        keys = []
+        for limit in self.limits_for(ctx):
+            if limit.concurrency is None:
+                continue
+            key = limit.key(ctx)
+            if self.in_flight.get(key, 0) >= limit.concurrency:
+                raise commands.MaxConcurrencyReached(limit.concurrency, SCOPES[limit.scope])
+            keys.append(key)
+        for key in keys:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        ctx.ratelimit_keys = keys
+
+    def release(self, ctx) -> None:
+        for key in getattr(ctx, 'ratelimit_keys', ()):
+            count = self.in_flight[key] - 1
+            if count:
+                self.in_flight[key] = count
+            else:
+                del self.in_flight[key]
+        ctx.ratelimit_keys = ()
@@ -0,0 +1,135 @@
+"""Resume the previous gateway session after a quick restart instead of
+identifying again (see the 'resume_sessions' config option).
+
+When the bot shuts down, save() records the session ID and sequence number in
+data/session.json, and the bot then disconnects in a way that keeps the session
+open. On the next start, resume_on_connect() makes the first connection RESUME
+that session if it is recent enough. Discord only replays missed events when
+resuming; it doesn't send the guilds again, so they are fetched over HTTP
+first (see rehydrate()), along with the bot's own member in each guild. Other
+guild members are not cached until they are seen.
+
+That takes about three requests per guild, which quickly costs more than
+identifying again, so bots in more than MAX_GUILDS guilds identify normally.
+
+If Discord refuses to resume the session, discord.py falls back to identifying
+normally.
+"""
+from os import path, remove
+from typing import Optional
+import asyncio
+import json
+import time
+
+import discord
+from discord.gateway import DiscordWebSocket
+
+from . import l
+from .database import DATA_DIR, write_data
+
+
+SESSION_FILE = 'session.json'
+# Sessions that have been disconnected for longer than this many seconds are
+# unlikely to be resumable, so don't bother trying.
+MAX_AGE = 60
+# Don't resume if the bot is in more guilds than this. Rehydrating 20 guilds
+# takes about 60 requests, roughly 1.2 seconds at Discord's global limit of 50
+# requests per second; identifying costs a READY plus the 2 seconds discord.py
+# waits for guilds to arrive.
+MAX_GUILDS = 20
+
+
+def save(bot) -> bool:
+    """Save the bot's current session ID and sequence number. Returns False if
+    the bot isn't connected or the session couldn't be saved.
+    """
+    ws = bot.ws
+    if ws is None or not ws.session_id:
+        return False
+    # load() deletes the file after reading it once, so a checksum would only
+    # be left behind.
+    return write_data(SESSION_FILE, json.dumps({
+        'session_id': ws.session_id,
+        'sequence': ws.sequence,
+        'saved_at': time.time(),
+    }, indent='\t'), checksum=False)
+
+
+def load() -> Optional[dict]:
+    """Return the saved session, if there is a recent one, and delete it so
+    that it is only used once.
+    """
+    fullpath = path.join(DATA_DIR, SESSION_FILE)
+    if not path.exists(fullpath):
+        return None
+    try:
+        with open(fullpath, encoding='utf-8') as f:
+            session = json.load(f)
+        remove(fullpath)
+    except (OSError, ValueError) as exc:
+        l.warning(f"Error loading saved session: {exc}")
+        return None
+    age = time.time() - session.get('saved_at', 0)
+    if age > MAX_AGE:
+        l.info(f"Not resuming session saved {age:.0f} seconds ago")
+        return None
+    return session
+
+
+def resume_on_connect(bot) -> bool:
+    """If there is a recent saved session, make the bot's first connection
+    resume it. Returns True if there is one.
+    """
+    session = load()
+    if session is None:
+        return False
+    original = DiscordWebSocket.from_client
+
+    async def from_client(client, **kwargs):
+        if client is bot and kwargs.get('initial'):
+            DiscordWebSocket.from_client = original
+            if await rehydrate(bot):
+                l.info(f"Resuming session {session['session_id']}")
+                kwargs.update(resume=True, session=session['session_id'], sequence=session['sequence'])
+        return await original(client, **kwargs)
+
+    DiscordWebSocket.from_client = from_client
+    return True
+
+
+async def rehydrate(bot) -> bool:
+    """Fill in the bot's user and guilds over HTTP, as a READY event would.
+    Returns False without changing anything if the bot is in more than
+    MAX_GUILDS guilds, in which case it should identify instead.
+    """
+    http = bot.http
+    state = bot._connection
+    partial_guilds = []
+    after = None
+    while True:
+        batch = await http.get_guilds(100, after=after)
+        partial_guilds += batch
+        if len(partial_guilds) > MAX_GUILDS:
+            l.info(f"Not resuming session in more than {MAX_GUILDS} guilds")
+            return False
+        if len(batch) < 100:
+            break
+        after = batch[-1]['id']
+    state.user = discord.ClientUser(state=state, data=await http.get_user('@me'))
+    state._users[state.user.id] = state.user
+
+    async def add_guild(guild_id):
+        data, channels, me = await asyncio.gather(
+            http.get_guild(guild_id),
+            http.get_all_guild_channels(guild_id),
+            # Needed for guild.me, e.g. to check the bot's permissions.
+            http.get_member(guild_id, state.user.id),
+        )
+        data['channels'] = channels
+        data['members'] = [me]
+        state._add_guild_from_data(data)
+
+    await asyncio.gather(*(add_guild(guild['id']) for guild in partial_guilds))
+    l.info(f"Fetched {len(partial_guilds)} guilds")
+    bot._ready.set()
+    return True
@@ -0,0 +1,205 @@
+from bisect import bisect_left
+from typing import Dict, Optional
+import asyncio
+import time
+
+from . import l
+from .database import LOAD_TIMES, guild_dbs
+
+
+# Histogram bucket upper bounds (in seconds), spaced logarithmically from 0.1 ms
+# to about a minute. Every histogram uses the same fixed number of buckets, so
+# memory use does not grow with the number of samples.
+BUCKET_FACTOR = 1.25
+BUCKET_BOUNDS = tuple(0.0001 * BUCKET_FACTOR ** i for i in range(61))
+
+
+class Histogram:
+    """A fixed-memory latency histogram."""
+
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self):
+        # One extra bucket for anything larger than the last bound.
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p: float) -> float:
+        """Return an estimate (the upper bound of the containing bucket) of the
+        `p`th percentile, where `p` is between 0 and 100.
+        """
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+
+class Metric:
+    """Invocation count, error count, and latency histogram for one command,
+    cog, or other operation.
+    """
+
+    __slots__ = ('count', 'errors', 'latency')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def record(self, seconds: Optional[float], failed: bool = False) -> None:
+        self.count += 1
+        if failed:
+            self.errors += 1
+        if seconds is not None:
+            self.latency.record(seconds)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+
+class Stats:
+    """Per-command and per-cog invocation statistics, plus timing of outbound
+    messages.
+    Attributes:
+    - commands -- dict mapping qualified command names to Metric objects
+    - cogs -- dict mapping cog names to Metric objects
+    - sends -- Metric for outbound messages sent through timed_send() or timed()
+    - in_flight -- dict mapping id(ctx) to the qualified name of each command
+      that is currently running
+    - started -- time.time() at creation
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, Metric] = {}
+        self.cogs: Dict[str, Metric] = {}
+        self.sends = Metric()
+        self.in_flight: Dict[int, str] = {}
+        self.started = time.time()
+
+    def command_started(self, ctx) -> None:
+        # A group and its subcommand are invoked with the same context, so
+        # each invocation is recorded separately.
+        ctx.invoked_at = time.perf_counter()
+        ctx.stats_recorded = False
+        self.in_flight[id(ctx)] = ctx.command.qualified_name
+
+    def command_finished(self, ctx, failed: bool = False) -> None:
+        """Record a finished invocation (successful or not). If the command
+        never started (e.g. a check failed), only the error is counted. Each
+        invocation is only recorded once, so this is safe to call from both an
+        after-invoke hook and an error handler. The time taken is also stored
+        as `ctx.latency`, for utils.log.log_context().
+        """
+        self.in_flight.pop(id(ctx), None)
+        if ctx.command is None or getattr(ctx, 'stats_recorded', False):
+            return
+        ctx.stats_recorded = True
+        started = getattr(ctx, 'invoked_at', None)
+        seconds = None if started is None else time.perf_counter() - started
+        ctx.latency = seconds
+        self._metric(self.commands, ctx.command.qualified_name).record(seconds, failed)
+        self._metric(self.cogs, ctx.command.cog_name or 'No cog').record(seconds, failed)
+
+    @staticmethod
+    def _metric(metrics: Dict[str, Metric], name: str) -> Metric:
+        try:
+            return metrics[name]
+        except KeyError:
+            metric = metrics[name] = Metric()
+            return metric
+
+    def prometheus(self) -> str:
+        """Return all statistics in the Prometheus text exposition format."""
+        lines = []
+        for metric_name, label, metrics in (
+            ('bot_command', 'command', self.commands),
+            ('bot_cog', 'cog', self.cogs),
+            ('bot_send', None, {None: self.sends}),
+        ):
+            lines.append(f"# TYPE {metric_name}_latency_seconds summary")
+            for name, metric in metrics.items():
+                labels = f'{label}="{name}"' if label else ''
+                for q in (50, 95, 99):
+                    quantile = f'quantile="{q / 100}"'
+                    lines.append(f"{metric_name}_latency_seconds{{{', '.join(filter(None, (labels, quantile)))}}} {metric.latency.percentile(q)}")
+                suffix = f"{{{labels}}}" if labels else ''
+                lines.append(f"{metric_name}_latency_seconds_sum{suffix} {metric.latency.total}")
+                lines.append(f"{metric_name}_latency_seconds_count{suffix} {metric.latency.count}")
+            lines.append(f"# TYPE {metric_name}_errors_total counter")
+            for name, metric in metrics.items():
+                suffix = f'{{{label}="{name}"}}' if label else ''
+                lines.append(f"{metric_name}_errors_total{suffix} {metric.errors}")
+        for counter in ('hits', 'misses', 'evictions', 'writebacks'):
+            lines.append(f"# TYPE bot_guild_db_{counter}_total counter")
+            for db in guild_dbs():
+                lines.append(f'bot_guild_db_{counter}_total{{db="{db.name}"}} {getattr(db, counter)}')
+        lines.append("# TYPE bot_guild_db_partitions gauge")
+        for db in guild_dbs():
+            lines.append(f'bot_guild_db_partitions{{db="{db.name}"}} {len(db)}')
+        lines.append("# TYPE bot_data_file_load_seconds gauge")
+        for filename, seconds in LOAD_TIMES.items():
+            lines.append(f'bot_data_file_load_seconds{{file="{filename}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+
+async def timed_send(ctx, *args, **kwargs):
+    """Like ctx.send(), but record how long the request takes in the bot's
+    statistics (if it has any).
+    """
+    return await timed(ctx.bot, ctx.send(*args, **kwargs))
+
+
+async def timed(bot, aw):
+    """Await a request that sends a message, recording how long it takes in
+    the bot's statistics (if it has any).
+    """
+    stats = getattr(bot, 'stats', None)
+    if stats is None:
+        return await aw
+    start = time.perf_counter()
+    failed = True
+    try:
+        m = await aw
+        failed = False
+        return m
+    finally:
+        stats.sends.record(time.perf_counter() - start, failed)
+
+
+async def start_metrics_server(stats: Stats, port: int, host: str = '127.0.0.1'):
+    """Serve statistics over HTTP in the Prometheus text format on the given
+    local port. Every request receives the same response regardless of path.
+    """
+    async def handle(reader, writer):
+        try:
+            # Read (and ignore) the request headers.
+            while (await reader.readline()).strip():
+                pass
+            body = stats.prometheus().encode('utf-8')
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    l.info(f"Serving metrics on http://{host}:{port}/")
+    return server
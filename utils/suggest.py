@@ -0,0 +1,144 @@
+"""Suggestions for mistyped command names ("did you mean ...?").
+
+SuggestionIndex uses symmetric deletion: each name is indexed under every
+string that can be made by deleting up to `max_distance` characters from it,
+and a lookup makes the same deletions from the typo. Two words within that edit
+distance always have a deletion in common, so only the few names that do are
+compared with edit_distance(). A lookup costs a few dozen dictionary lookups
+however many commands there are.
+
+The index for the bot's commands is built on first use and dropped by
+invalidate() whenever a command is added or removed (e.g. when extensions are
+reloaded).
+"""
+from typing import Dict, Iterable, List, Optional
+
+from discord.ext import commands
+
+
+MAX_DISTANCE = 2
+MAX_SUGGESTIONS = 3
+# Only suggest a command to the same user once every this many seconds.
+SUGGESTION_COOLDOWN = 30
+
+_INDEX: Optional['SuggestionIndex'] = None
+_THROTTLE = commands.CooldownMapping.from_cooldown(1, SUGGESTION_COOLDOWN, commands.BucketType.user)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Return the number of insertions, deletions, substitutions and
+    transpositions of adjacent characters needed to turn `a` into `b`, or
+    `max_distance + 1` if that is more than `max_distance`.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    two_rows_ago = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                row[j] = min(row[j], two_rows_ago[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+        two_rows_ago, previous = previous, row
+    return min(previous[-1], max_distance + 1)
+
+
+def deletions(word: str, depth: int) -> set:
+    """Return every string made by deleting up to `depth` characters from
+    `word`, including `word` itself.
+    """
+    result = frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result = result | frontier
+    return result
+
+
+class SuggestionIndex:
+    """Find the names closest to a misspelled word.
+    Names are matched case-insensitively.
+    """
+
+    def __init__(self, names: Iterable[str], max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.names = sorted({name.lower() for name in names})
+        self.longest = max(map(len, self.names), default=0)
+        self._index: Dict[str, List[str]] = {}
+        for name in self.names:
+            for deletion in deletions(name, max_distance):
+                self._index.setdefault(deletion, []).append(name)
+
+    def lookup(self, word: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        """Return up to `limit` names close to `word`, closest first. Short
+        words allow fewer typos, so that e.g. any two-letter word doesn't
+        match every one-letter alias.
+        """
+        word = word.lower()
+        max_distance = min(self.max_distance, len(word) // 3)
+        if not max_distance or len(word) > self.longest + max_distance:
+            return []
+        candidates = set()
+        for deletion in deletions(word, max_distance):
+            candidates.update(self._index.get(deletion, ()))
+        candidates.discard(word)
+        scored = []
+        for name in candidates:
+            distance = edit_distance(word, name, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, name))
+        scored.sort()
+        return [name for _, name in scored[:limit]]
+
+
+def command_names(bot) -> Iterable[str]:
+    """Yield the qualified name of every visible command under each of its
+    aliases.
+    """
+    for command in bot.walk_commands():
+        if command.hidden:
+            continue
+        parent = command.full_parent_name
+        for name in [command.name] + list(command.aliases):
+            yield f'{parent} {name}' if parent else name
+
+
+def get_index(bot) -> SuggestionIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = SuggestionIndex(command_names(bot))
+    return _INDEX
+
+
+def invalidate() -> None:
+    global _INDEX
+    _INDEX = None
+
+
+def suggest(bot, word: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+    """Return up to `limit` command names close to `word`."""
+    return get_index(bot).lookup(word, limit)
+
+
+def suggest_throttled(ctx: commands.Context, word: str) -> List[str]:
+    """Like suggest(), but return nothing if the author of `ctx` has already
+    been given a suggestion in the last SUGGESTION_COOLDOWN seconds.
+    """
+    suggestions = suggest(ctx.bot, word)
+    if suggestions and _THROTTLE.get_bucket(ctx.message).update_rate_limit():
+        return []
+    return suggestions
+
+
+def did_you_mean(prefix: str, suggestions: List[str]) -> str:
+    """Format suggestions as a sentence, or return an empty string if there
+    are none.
+    """
+    if not suggestions:
+        return ''
+    quoted = [f"`{prefix}{s}`" for s in suggestions]
+    if len(quoted) > 1:
+        quoted = [", ".join(quoted[:-1]), quoted[-1]]
+    return f"Did you mean {' or '.join(quoted)}?"
@@ -0,0 +1,171 @@
+"""A shared hierarchical timer wheel for timeouts that are usually cancelled,
+such as prompts and paginators.
+
+Time is divided into ticks of `tick` seconds. Level 0 of the wheel has one
+slot per tick for the next SLOTS ticks, level 1 has one slot per SLOTS ticks,
+and so on. Scheduling a timer puts it in the slot for its expiry, and
+cancelling it removes it from that slot, both in constant time; whenever a
+lower level wraps around, the next slot of the level above is moved down. The
+wheel only keeps one asyncio timer handle, for the next tick, and only while
+it has timers. Every timer that expires on a tick is called in the same batch.
+
+Timers fire on the first tick after they expire, so up to `tick` seconds late
+but never early.
+"""
+from typing import Callable, Optional
+import asyncio
+import math
+
+from . import l
+
+
+SLOTS = 64
+LEVELS = 4
+
+_WHEEL = None
+
+
+class Timer:
+    """A timer scheduled with TimerWheel.call_later()."""
+
+    __slots__ = ('expires', 'callback', 'args', '_wheel', '_slot')
+
+    def __init__(self, wheel: 'TimerWheel', expires: int, callback: Callable, args):
+        self._wheel = wheel
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self._slot = None
+
+    def cancel(self) -> None:
+        """Stop the timer from firing. Does nothing if it has already fired or
+        been cancelled.
+        """
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+    def cancelled(self) -> bool:
+        return self._slot is None
+
+
+class TimerWheel:
+    """A hierarchical timer wheel with a resolution of `tick` seconds.
+    Timers expiring more than SLOTS ** LEVELS ticks in the future are kept in
+    the top level and moved down as it turns.
+    """
+
+    def __init__(self, tick: float = 0.5):
+        self.tick = tick
+        self._loop = None
+        self._origin = 0.0
+        self._current = 0
+        self._count = 0
+        self._handle = None
+        # Each slot is a dictionary used as an ordered set of timers.
+        self._levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_later(self, delay: float, callback: Callable, *args) -> Timer:
+        """Call `callback(*args)` after at least `delay` seconds. Returns a
+        Timer that can be cancelled.
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            if self._count:
+                raise RuntimeError("TimerWheel is already in use by another event loop")
+            self._loop = loop
+            self._origin = loop.time()
+        now = (loop.time() - self._origin) / self.tick
+        if not self._count:
+            # The wheel doesn't tick while it's empty; catch up.
+            self._current = int(now)
+        expires = max(math.ceil(now + delay / self.tick), self._current + 1)
+        timer = Timer(self, expires, callback, args)
+        self._insert(timer)
+        self._count += 1
+        if self._handle is None:
+            self._schedule_tick()
+        return timer
+
+    def _insert(self, timer: Timer) -> None:
+        expires = max(timer.expires, self._current)
+        ticks = expires - self._current
+        level = 0
+        span = SLOTS
+        while ticks >= span and level < LEVELS - 1:
+            level += 1
+            span *= SLOTS
+        if ticks >= span:
+            # Too far away for the wheel; park it in the last slot of the top
+            # level, which is moved down before the top level turns again.
+            expires = self._current + span - span // SLOTS
+        slot = self._levels[level][(expires // (span // SLOTS)) % SLOTS]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _schedule_tick(self) -> None:
+        when = self._origin + (self._current + 1) * self.tick
+        self._handle = self._loop.call_at(when, self._on_tick)
+
+    def _cascade(self) -> None:
+        """Move the timers in the current slot of each level above 0 that has
+        come around down to the levels below.
+        """
+        span = SLOTS ** (LEVELS - 1)
+        for level in range(LEVELS - 1, 0, -1):
+            if self._current % span == 0:
+                slot = self._levels[level][(self._current // span) % SLOTS]
+                timers = list(slot)
+                slot.clear()
+                for timer in timers:
+                    self._insert(timer)
+            span //= SLOTS
+
+    def _on_tick(self) -> None:
+        self._handle = None
+        target = int((self._loop.time() - self._origin) / self.tick)
+        due = []
+        while self._current < target and self._count > len(due):
+            self._current += 1
+            self._cascade()
+            slot = self._levels[0][self._current % SLOTS]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self._current = max(self._current, target)
+        for timer in due:
+            timer._slot = None
+        self._count -= len(due)
+        for timer in due:
+            try:
+                timer.callback(*timer.args)
+            except Exception as exc:
+                l.error(f"Error in timer callback {timer.callback!r}: {type(exc).__name__}: {exc}")
+        if self._count and self._handle is None:
+            self._schedule_tick()
+
+
+def configure(*, tick: Optional[float] = None) -> TimerWheel:
+    """Replace the shared timer wheel with one with the given tick. Timers
+    already scheduled on the old wheel still fire.
+    """
+    global _WHEEL
+    _WHEEL = TimerWheel(tick) if tick else TimerWheel()
+    return _WHEEL
+
+
+def get_timer_wheel() -> TimerWheel:
+    if _WHEEL is None:
+        configure()
+    return _WHEEL
+
+
+def call_later(delay: float, callback: Callable, *args) -> Timer:
+    """Schedule a callback on the shared timer wheel (see
+    TimerWheel.call_later()).
+    """
+    return get_timer_wheel().call_later(delay, callback, *args)
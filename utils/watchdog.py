@@ -0,0 +1,127 @@
+from collections import deque
+from datetime import datetime
+from typing import Optional
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from . import l
+from .stats import Histogram
+
+
+STACK_SAMPLE_DEPTH = 12
+
+
+class Stall:
+    """A period during which the event loop was blocked.
+    Attributes:
+    - started -- UNIX timestamp at which the stall was detected
+    - duration -- total length of the stall in seconds (None while ongoing)
+    - task -- name and coroutine of the task that was running
+    - commands -- names of the commands that were in flight
+    - stack -- formatted stack sample of the event loop thread
+    - latency_before -- heartbeat ACK latency (bot.latency) when detected
+    - latency_after -- heartbeat ACK latency shortly after recovering
+    """
+
+    __slots__ = ('started', 'duration', 'task', 'commands', 'stack', 'latency_before', 'latency_after')
+
+    def __init__(self, task: str, commands: list, stack: str, latency: float):
+        self.started = time.time()
+        self.duration = None
+        self.task = task
+        self.commands = commands
+        self.stack = stack
+        self.latency_before = latency
+        self.latency_after = None
+
+    def __str__(self):
+        when = datetime.utcfromtimestamp(self.started).strftime('%H:%M:%S')
+        duration = 'ongoing' if self.duration is None else f"{self.duration * 1000:.0f} ms"
+        commands = ', '.join(self.commands) or 'no command'
+        return f"{when} UTC, {duration}, in {self.task} ({commands})"
+
+
+class Watchdog:
+    """Measure event loop lag and sample the loop thread's stack whenever it is
+    blocked for longer than a threshold.
+    A task on the event loop wakes up every `interval` seconds and records how
+    late it was. A separate thread notices when that task hasn't woken up for
+    `threshold` seconds; since the loop itself is blocked at that point, the
+    thread is what takes the stack sample.
+    """
+
+    def __init__(self, bot, *, threshold: float = 0.25, interval: float = 0.05, history: int = 20):
+        self.bot = bot
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = Histogram()
+        self.max_lag = 0.0
+        self.stalls = deque(maxlen=history)
+        self._beat = time.perf_counter()
+        self._stall: Optional[Stall] = None
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_event_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._task = self._loop.create_task(self._tick())
+        threading.Thread(target=self._watch, name='watchdog', daemon=True).start()
+        l.info(f"Watching event loop for stalls longer than {self.threshold * 1000:.0f} ms")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick(self):
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._beat = now = time.perf_counter()
+            lag = max(0.0, now - before - self.interval)
+            self.lag.record(lag)
+            self.max_lag = max(self.max_lag, lag)
+            stall = self._stall
+            if stall is not None:
+                self._stall = None
+                stall.duration = lag + self.interval
+                self._loop.call_later(5, self._record_latency_after, stall)
+                l.warning(
+                    f"Event loop stalled for {stall.duration * 1000:.0f} ms in {stall.task} "
+                    f"(commands: {', '.join(stall.commands) or 'none'}; heartbeat latency "
+                    f"{stall.latency_before * 1000:.0f} ms)\n{stall.stack}"
+                )
+
+    def _record_latency_after(self, stall: Stall):
+        stall.latency_after = self.bot.latency
+
+    def _watch(self):
+        while self.running:
+            time.sleep(self.interval)
+            if self._stall is None and time.perf_counter() - self._beat > self.threshold:
+                self._stall = self._sample()
+                self.stalls.append(self._stall)
+
+    def _sample(self) -> Stall:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame, STACK_SAMPLE_DEPTH)) if frame else ''
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            task_name = 'a callback'
+        else:
+            task_name = f"{task.get_name()} ({task.get_coro().__qualname__})"
+        stats = getattr(self.bot, 'stats', None)
+        commands = list(stats.in_flight.values()) if stats else []
+        return Stall(task_name, commands, stack, self.bot.latency)